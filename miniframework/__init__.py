@@ -1,6 +1,20 @@
-from miniframework.algo import CurveGenerate, RandomPointGenerate
+from miniframework.algo import CurveGenerate, RandomPointGenerate, PointSampler
+from miniframework.async_instance import AsyncInstance
+from miniframework.async_task_scheduler import AsyncTaskScheduler
+from miniframework.change_detector import ChangeDetector
+from miniframework.cron import CronSchedule
+from miniframework.debug_recorder import DebugRecorder
+from miniframework.frame import Frame, FrameStream, region_union, scale_region, scale_result
 from miniframework.instance import Instance
+from miniframework.location_cache import LocationCache
+from miniframework.matcher import MatchReport, match_templates
+from miniframework.metrics import Metrics, Histogram
 from miniframework.task import Task, TaskStatus, TaskProxy, BeforeTaskProxy, AfterTaskProxy
 from miniframework.task_queue import TaskQueue
 from miniframework.task_scheduler import TaskScheduler, TaskSchedulerStatus
-from miniframework.template import Template, ImageTemplate, MultiColorsTemplate, ImageColorTemplate
+from miniframework.multi_device_scheduler import MultiDeviceScheduler, Device
+from miniframework.pipeline import Pipeline
+from miniframework.screen_classifier import Screen, ScreenClassifier
+from miniframework.template import Template, ImageTemplate, MultiColorsTemplate, ImageColorTemplate, TemplateStore, \
+    template_store, PyramidMatcher, match_multi_colors
+from miniframework.template_pack import TemplatePack, build_template_pack, load_template_pack
@@ -1,39 +1,248 @@
-import random
+import threading
+from collections import OrderedDict
+from statistics import NormalDist
 
 import numpy as np
 
 
+# 缓动函数，将均匀的时间进度映射为曲线参数，决定滑动过程中的速度变化
+EASINGS = {
+    "linear": lambda t: t,
+    "ease_in": lambda t: t * t,
+    "ease_out": lambda t: 1 - (1 - t) ** 2,
+    "ease_in_out": lambda t: t * t * (3 - 2 * t),
+}
+
+# 标准正态分布逆累积分布函数的有理近似(Acklam)系数,相对误差小于1.2e-9,从高次到低次排列
+_PPF_A = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02, 1.383577518672690e+02,
+          -3.066479806614716e+01, 2.506628277459239e+00)
+_PPF_B = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02, 6.680131188771972e+01,
+          -1.328068155288572e+01, 1.0)
+_PPF_C = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00, -2.549732539343734e+00,
+          4.374664141464968e+00, 2.938163982698783e+00)
+_PPF_D = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00, 3.754408661907416e+00, 1.0)
+_PPF_TAIL = 0.02425  # 累积概率低于该值或高于1减该值时使用尾部的近似
+
+
+def _horner(coefficients: tuple, x: np.ndarray) -> np.ndarray:
+    y = coefficients[0] * x + coefficients[1]
+    for coefficient in coefficients[2:]:
+        y *= x
+        y += coefficient
+    return y
+
+
+def _normal_ppf(p: np.ndarray) -> np.ndarray:
+    """向量化的标准正态分布逆累积分布函数
+
+    Args:
+        p (np.array): (0, 1)内的累积概率
+
+    Returns:
+        np.array: 对应的标准正态分布分位数
+    """
+    p = np.asarray(p, dtype=np.float64)
+    q = p - 0.5
+    r = q * q
+    x = _horner(_PPF_A, r) * q / _horner(_PPF_B, r)
+    tail = np.abs(q) > 0.5 - _PPF_TAIL
+    if tail.any():
+        p_tail = p[tail]
+        t = np.sqrt(-2 * np.log(np.minimum(p_tail, 1 - p_tail)))
+        x[tail] = np.copysign(_horner(_PPF_C, t) / _horner(_PPF_D, t), p_tail - 0.5)
+    return x
+
+
+
 class CurveGenerate:
+    touch_rate = 60  # 目标触控事件频率,单位为Hz,决定曲线的点数
 
     @staticmethod
     def bezier_curve(startX, startY, endX, endY, duration):
-        def bezier(screenPoint, offset):
-            p0, p1, p2, p3 = screenPoint
-            cx = 3 * (p1['x'] - p0['x'])
-            bx = 3 * (p2['x'] - p1['x']) - cx
-            ax = p3['x'] - p0['x'] - cx - bx
-            cy = 3 * (p1['y'] - p0['y'])
-            by = 3 * (p2['y'] - p1['y']) - cy
-            ay = p3['y'] - p0['y'] - cy - by
-            t = np.arange(0, 1, 0.08)  # 使用 numpy 的 arange 函数生成浮点数步长的范围
-            tSquared = t * t
-            tCubed = tSquared * t
-            x = ax * tCubed + bx * tSquared + cx * t + p0['x']
-            y = ay * tCubed + by * tSquared + cy * t + p0['y']
-            return [(int(px), int(py)) for px, py in zip(x, y)]
-
-        def smlMove(qx, qy, zx, zy):
-            slidingPath = []
-            point = [
-                {'x': qx, 'y': qy},
-                {'x': random.randint(qx - 100, qx + 100), 'y': random.randint(qy, qy + 50)},
-                {'x': random.randint(zx - 100, zx + 100), 'y': random.randint(zy, zy + 50)},
-                {'x': zx, 'y': zy}
-            ]
-            slidingPath.extend(bezier(point, 0.08))
-            return slidingPath
-
-        return smlMove(startX, startY, endX, endY)
+        """生成起点到终点的随机三阶贝塞尔曲线
+
+        Args:
+            startX (int): 起始点X坐标
+            startY (int): 起始点Y坐标
+            endX (int): 结束点X坐标
+            endY (int): 结束点Y坐标
+            duration (int): 滑动持续时间,单位为ms
+
+        Returns:
+            points (np.array): int32数组,形状为(点数, 2)
+        """
+        return CurveGenerate.bezier_curves([(startX, startY)], [(endX, endY)], duration)[0]
+
+    @staticmethod
+    def bezier_curves(starts, ends, duration, touch_rate: float = None, easing="ease_in_out", rng=None):
+        """一次生成多条随机三阶贝塞尔曲线，可用于预先生成滑动轨迹库
+
+        点数由滑动持续时间与触控事件频率决定，各点在时间上均匀分布，速度变化由缓动函数体现在点的间距上
+
+        Args:
+            starts (list): 起始点列表[(x, y), ...]
+            ends (list): 结束点列表[(x, y), ...]，与starts一一对应
+            duration (int): 滑动持续时间,单位为ms
+            touch_rate (float, optional): 触控事件频率,单位为Hz. Defaults to None,即CurveGenerate.touch_rate.
+            easing (str | Callable, optional): EASINGS中的缓动函数名或作用于numpy数组的函数. Defaults to "ease_in_out".
+            rng (PointSampler | np.random.Generator, optional): 采样器或随机数生成器，采样器在其锁内生成随机数，
+                多个线程共用时应传入采样器. Defaults to None,即进程级共享的采样器.
+
+        Returns:
+            curves (np.array): int32数组,形状为(曲线数, 点数, 2)
+        """
+        rng = _default_sampler if rng is None else rng
+        starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+        ends = np.asarray(ends, dtype=np.float64).reshape(-1, 2)
+        count = max(2, round(duration / 1000 * (touch_rate or CurveGenerate.touch_rate)) + 1)
+        t = EASINGS[easing](np.linspace(0, 1, count)) if isinstance(easing, str) else easing(np.linspace(0, 1, count))
+        if isinstance(rng, PointSampler):
+            offsets = rng.control_offsets(len(starts))
+        else:
+            offsets = _control_offsets(rng, len(starts))
+        controls = np.stack([starts, starts + offsets[:, 0], ends + offsets[:, 1], ends], axis=1)  # (曲线数, 4, 2)
+        basis = np.stack([(1 - t) ** 3, 3 * (1 - t) ** 2 * t, 3 * (1 - t) * t ** 2, t ** 3], axis=1)  # (点数, 4)
+        return np.rint(np.einsum("nk,mkd->mnd", basis, controls)).astype(np.int32)
+
+
+def _control_offsets(rng: np.random.Generator, count: int) -> np.ndarray:
+    # 控制点: 起点/终点附近的随机偏移,x偏移[-100, 100],y偏移[0, 50]
+    return np.stack([rng.integers(-100, 101, (count, 2)), rng.integers(0, 51, (count, 2))], axis=-1)
+
+
+class PointSampler:
+    """随机点击点与点击时长采样器
+
+    使用独立的np.random.Generator，可通过seed复现；按区域批量生成截断正态分布的点击点与点击时长并缓存，
+    点击时只从缓存中取出，不进行逐个采样。np.random.Generator不是线程安全的，采样器的所有随机数均在锁内生成
+    """
+
+    def __init__(self, seed: int = None, batch_size: int = 256, max_regions: int = 64) -> None:
+        """初始化采样器
+
+        Args:
+            seed (int, optional): 随机数种子. Defaults to None,即不可复现.
+            batch_size (int, optional): 每次批量生成的数量. Defaults to 256.
+            max_regions (int, optional): 缓存点击点的最大区域数,超过时淘汰最久未使用的区域. Defaults to 64.
+        """
+        self.rng = np.random.default_rng(seed)
+        self.batch_size = batch_size
+        self.max_regions = max_regions
+        self._points: OrderedDict[tuple, list] = OrderedDict()  # 区域 -> 预先生成的点击点
+        self._durations: list[int] = []
+        self._lock = threading.RLock()
+
+    def truncated_normal(self, mean: float, std: float, low: float, high: float, size: int) -> np.ndarray:
+        """批量生成四舍五入后落在[low, high]内的正态分布整数，使用向量化的逆累积分布函数采样，不进行拒绝采样
+
+        连续区间[low - 0.5, high + 0.5]的累积概率之间均匀采样后取逆累积分布函数；区间位于上尾部时按均值镜像到下尾部计算，
+        保证远离均值的区间的精度，区间的概率低于浮点数精度时返回离均值最近的边界
+
+        Args:
+            mean (float): 均值
+            std (float): 标准差
+            low (float): 下界
+            high (float): 上界
+            size (int): 数量
+
+        Returns:
+            np.array: int64数组
+        """
+        nearest = np.full(size, round(np.clip(mean, low, high)), dtype=np.int64)
+        if std <= 0:
+            return nearest
+        lower, upper = low - 0.5, high + 0.5
+        mirrored = lower > mean  # 上尾部的区间镜像到下尾部
+        if mirrored:
+            lower, upper = 2 * mean - upper, 2 * mean - lower
+        distribution = NormalDist(mean, std)
+        p_lower, p_upper = distribution.cdf(lower), distribution.cdf(upper)
+        if p_upper - p_lower <= 1e-15:
+            return nearest
+        with self._lock:
+            uniforms = self.rng.uniform(p_lower, p_upper, size)
+        uniforms = np.clip(uniforms, max(p_lower, 1e-300), min(p_upper, 1 - 1e-16))
+        samples = mean + std * _normal_ppf(uniforms)
+        if mirrored:
+            samples = 2 * mean - samples
+        return np.clip(np.rint(samples), low, high).astype(np.int64)
+
+    def normal_points(self, region, size: int) -> np.ndarray:
+        """批量生成区域内的正态分布点，中心为区域中心，标准差为区域宽高的1/6
+
+        Args:
+            region (list): [xMin, yMin, xMax, yMax]
+            size (int): 数量
+
+        Returns:
+            np.array: 形状为(size, 2)的int64数组
+        """
+        x_min, y_min, x_max, y_max = region
+        w, h = x_max - x_min, y_max - y_min
+        xs = self.truncated_normal(x_min + w / 2, w / 6, x_min, x_max, size)
+        ys = self.truncated_normal(y_min + h / 2, h / 6, y_min, y_max, size)
+        return np.stack([xs, ys], axis=1)
+
+    def control_offsets(self, count: int) -> np.ndarray:
+        """批量生成贝塞尔曲线控制点相对起点/终点的随机偏移，x偏移[-100, 100],y偏移[0, 50]
+
+        Args:
+            count (int): 曲线数量
+
+        Returns:
+            np.array: 形状为(count, 2, 2)的int64数组,[:, 0]为第一个控制点相对起点的偏移,[:, 1]为第二个控制点相对终点的偏移
+        """
+        with self._lock:
+            return _control_offsets(self.rng, count)
+
+    def click_durations(self, size: int) -> np.ndarray:
+        """批量生成点击时长，约0.4%为200~350ms的长按，其余为80~120ms
+
+        Args:
+            size (int): 数量
+
+        Returns:
+            np.array: 点击时长数组,单位为ms
+        """
+        with self._lock:
+            long_press = np.rint(self.rng.normal(0, 30, size)) > 80
+            return np.where(long_press, self.rng.integers(200, 351, size), self.rng.integers(80, 121, size))
+
+    def point(self, region) -> tuple[int, int]:
+        """从区域的缓存中取出一个点击点，缓存用完时批量生成
+
+        Args:
+            region (list): [xMin, yMin, xMax, yMax]
+
+        Returns:
+            point (tuple): (x,y)
+        """
+        key = tuple(region)
+        with self._lock:
+            points = self._points.get(key)
+            if not points:
+                points = self.normal_points(key, self.batch_size).tolist()
+                points.reverse()
+                self._points[key] = points
+                if len(self._points) > self.max_regions:
+                    self._points.popitem(last=False)
+            self._points.move_to_end(key)
+            x, y = points.pop()
+        return x, y
+
+    def duration(self) -> int:
+        """从缓存中取出一个点击时长
+
+        Returns:
+            int: 点击时长,单位为ms
+        """
+        with self._lock:
+            if not self._durations:
+                self._durations = self.click_durations(self.batch_size).tolist()
+            return self._durations.pop()
+
+
+_default_sampler = PointSampler()
 
 
 class RandomPointGenerate:
@@ -48,14 +257,4 @@ class RandomPointGenerate:
         Returns:
             point (tuple): (x,y)
         """
-        xMin, yMin, xMax, yMax = region
-        w = xMax - xMin
-        h = yMax - yMin
-        centerX = xMin + w / 2
-        centerY = yMin + h / 2
-        while True:
-            x = round(np.random.normal(centerX, w / 6))
-            y = round(np.random.normal(centerY, h / 6))
-            if xMin <= x <= xMax and yMin <= y <= yMax:
-                break
-        return x, y
+        return _default_sampler.point(region)
@@ -0,0 +1,91 @@
+import asyncio
+import functools
+from concurrent.futures import Executor
+
+from miniframework.algo import RandomPointGenerate, CurveGenerate
+from miniframework.frame import Frame
+from miniframework.instance import Instance
+from miniframework.matcher import MatchReport
+from miniframework.template import Template
+
+
+class AsyncInstance:
+    """Instance的asyncio版本，阻塞的设备IO在线程池中执行，模板匹配使用Instance的匹配线程池
+
+    方法在线程池中调用Instance的同名方法，耗时统计与调试日志与Instance一致
+
+    一个事件循环可以同时驱动多台设备，而不需要每台设备一个线程
+    """
+
+    def __init__(self, instance: Instance, io_executor: Executor = None) -> None:
+        """
+        :param instance: 被包装的设备实例
+        :param io_executor: 执行设备IO的线程池,默认使用事件循环的默认线程池
+        """
+        self.instance = instance
+        self._io_executor = io_executor
+
+    async def _io(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io_executor, functools.partial(func, *args, **kwargs))
+
+    async def screenshot(self):
+        """获取设备的屏幕截图，返回OpenCV格式的图片"""
+        return await self._io(self.instance.screenshot)
+
+    async def frame(self, max_age: int = None) -> Frame:
+        """获取当前屏幕帧，参见Instance.frame"""
+        return await self._io(self.instance.frame, max_age)
+
+    async def find(self, template: Template):
+        """在设备屏幕上查找模板
+
+        Args:
+            template (Template): 模板对象
+
+        Returns:
+            result: 是否找到匹配的模板
+        """
+        return await self._io(self.instance.find, template)
+
+    async def find_all(self, templates: list[Template]) -> MatchReport:
+        """在同一帧截图上匹配所有模板，参见Instance.find_all"""
+        return await self._io(self.instance.find_all, templates)
+
+    async def find_any(self, templates: list[Template]) -> MatchReport:
+        """在同一帧截图上按优先级顺序匹配模板，参见Instance.find_any"""
+        return await self._io(self.instance.find_any, templates)
+
+    async def click(self, x: int, y: int, duration: int = 100):
+        await self._io(self.instance.click, x, y, duration)
+
+    async def swipe(self, points: list[tuple[int]], duration: int = 300):
+        await self._io(self.instance.swipe, points, duration)
+
+    async def range_random_click(self, result: tuple | list, duration=None,
+                                 random_point_generate_algo=RandomPointGenerate.normal_distribution):
+        """在指定范围内生成随机点击点并点击，参见Instance.range_random_click"""
+        await self._io(self.instance.range_random_click, result, duration, random_point_generate_algo)
+
+    async def curve_swipe(self, start_x, start_y, end_x, end_y, duration, curve_generate_algo=CurveGenerate.bezier_curve):
+        """执行曲线滑动操作，参见Instance.curve_swipe"""
+        await self._io(self.instance.curve_swipe, start_x, start_y, end_x, end_y, duration, curve_generate_algo)
+
+    async def find_and_click(self, template: Template, result: tuple | list = None, duration=None,
+                             random_point_generate_algo=None):
+        """查找模板并在找到时执行点击操作
+
+        Args:
+            template (Template): 模板对象
+            result (tuple | list): 点击区域的坐标，可以是(x, y)或(x1, y1, x2, y2)
+            duration (int): 点击持续时间，默认为None，即随机生成
+            random_point_generate_algo: 随机点生成算法，默认为None
+
+        Returns:
+            result: 是否找到匹配的模板
+        """
+        found = await self.find(template)
+        if found:
+            await self.range_random_click(result or found, duration,
+                                          random_point_generate_algo or RandomPointGenerate.normal_distribution)
+        return found
@@ -0,0 +1,128 @@
+import asyncio
+import inspect
+from concurrent.futures import Executor
+from typing import Optional
+
+from loguru import logger
+
+from miniframework.task import Task, TaskProxy
+from miniframework.task_queue import TaskQueue
+from miniframework.task_scheduler import SLEEP_TIME, TaskSchedulerStatus
+
+
+class AsyncTaskScheduler:
+    """asyncio任务调度器，在事件循环中执行任务队列中的任务
+
+    execute为协程函数的任务直接在事件循环中await，普通任务在线程池中执行；
+    多个调度器可以运行在同一个事件循环中，分别驱动多台设备
+    """
+
+    def __init__(self, sleep_time: int = SLEEP_TIME, executor: Executor = None):
+        """
+        :param sleep_time:任务执行间隔时间,单位为ms
+        :param executor:执行普通任务的线程池,默认使用事件循环的默认线程池
+        """
+        self._task_queue: Optional[TaskQueue] = None
+        self._status = TaskSchedulerStatus.PENDING
+        self._sleep_time = sleep_time / 1000
+        self._executor = executor
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None  # 新任务加入或调度器状态变化时设置
+        self._interrupt: Optional[asyncio.Event] = None  # pause/stop时设置,打断任务间隔等待
+
+    @property
+    def task_queue(self) -> TaskQueue:
+        return self._task_queue
+
+    @task_queue.setter
+    def task_queue(self, task_queue: TaskQueue):
+        self._task_queue = task_queue
+
+    @property
+    def status(self) -> TaskSchedulerStatus:
+        return self._status
+
+    def __str__(self) -> str:
+        return f"AsyncTaskScheduler(status={self._status}, task_queue={self._task_queue})"
+
+    async def _run(self):
+        """任务调度器协程运行的内部方法，队列为空时等待新任务或延迟任务到期"""
+        while self._status == TaskSchedulerStatus.RUNNING:
+            self._wakeup.clear()
+            next_task, next_due = await self._queue_call(self._poll)
+            if next_task:
+                logger.debug(f"Executing task: {next_task}")
+                await self._execute(next_task)
+                await self._queue_call(self._task_queue.on_executed, next_task)
+                if self._sleep_time > 0:
+                    try:
+                        await asyncio.wait_for(self._interrupt.wait(), self._sleep_time)
+                    except asyncio.TimeoutError:
+                        pass
+            else:
+                logger.debug("Task queue is empty,Waiting for new tasks")
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), next_due)
+                except asyncio.TimeoutError:
+                    pass
+
+    def _poll(self) -> tuple[Optional[Task | TaskProxy], Optional[float]]:
+        """获取下一个任务，没有任务时同时获取下一个延迟任务到期的时间"""
+        next_task = self._task_queue.next_task
+        return next_task, None if next_task else self._task_queue.next_due()
+
+    async def _queue_call(self, func, *args):
+        """在线程池中调用任务队列的方法，队列的锁与任务的reset可能阻塞，不在事件循环中执行"""
+        return await self._loop.run_in_executor(self._executor, func, *args)
+
+    async def _execute(self, task: Task | TaskProxy):
+        if inspect.iscoroutinefunction(task.execute):
+            await task.execute()
+            return
+        result = await self._loop.run_in_executor(self._executor, task.execute)
+        # 代理任务包装协程任务时,execute返回被包装任务的协程
+        if inspect.isawaitable(result):
+            await result
+
+    def _notify(self):
+        """队列监听函数，可能在其他线程中调用"""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def start(self):
+        """启动任务调度器，需在事件循环中调用"""
+        if self._task_queue is None:
+            raise ValueError("Task queue must be set before starting the scheduler.")
+        if self._status == TaskSchedulerStatus.RUNNING:
+            raise RuntimeError("Scheduler is already running.")
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._interrupt = asyncio.Event()
+        self._status = TaskSchedulerStatus.RUNNING
+        self._task_queue.add_listener(self._notify)
+        self._runner = self._loop.create_task(self._run())
+        logger.debug("AsyncTaskScheduler started.")
+
+    async def stop(self):
+        """停止任务调度器"""
+        if self._status == TaskSchedulerStatus.PENDING:
+            return
+        await self._halt(TaskSchedulerStatus.PENDING)
+        await self._queue_call(self._task_queue.reset_all_tasks)  # 重置所有任务状态
+        logger.debug("AsyncTaskScheduler stopped.")
+
+    async def pause(self):
+        if self._status != TaskSchedulerStatus.RUNNING:
+            return
+        await self._halt(TaskSchedulerStatus.PAUSED)
+        logger.debug("AsyncTaskScheduler paused.")
+
+    async def _halt(self, status: TaskSchedulerStatus):
+        self._status = status
+        self._task_queue.remove_listener(self._notify)
+        self._interrupt.set()
+        self._wakeup.set()
+        if self._runner:
+            await self._runner
+            self._runner = None
@@ -0,0 +1,439 @@
+"""离线性能测试，使用回放截图的FakeDevice代替真实设备
+
+python -m miniframework.benchmark --frames recorded/ --latency 20 -o result.json
+python -m miniframework.benchmark --baseline result.json  # 与之前的结果比较,吞吐量下降超过阈值时返回1
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from typing import Callable
+
+import cv2
+import numpy as np
+from loguru import logger
+from minicv import Images
+
+from miniframework.frame import Frame
+from miniframework.instance import Instance
+from miniframework.metrics import Histogram, Metrics
+from miniframework.task import Task, TaskStatus
+from miniframework.task_queue import TaskQueue
+from miniframework.task_scheduler import TaskScheduler
+from miniframework.template import IMAGE_EXTENSIONS, ImageTemplate, ImageColorTemplate, MultiColorsTemplate, \
+    PyramidMatcher, Template
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SCENARIOS: dict[str, Callable] = {}
+
+
+def scenario(func):
+    """注册测试场景"""
+    SCENARIOS[func.__name__] = func
+    return func
+
+
+class FakeDevice:
+    """回放截图的本地设备，代替MiniDevice用于离线测试
+
+    截图按顺序循环返回录制的截图，截图与触控操作可设置模拟延迟，触控操作只做记录
+    """
+
+    def __init__(self, frames_dir: str = None, frames: list = None, latency: float = 0, touch_latency: float = 0,
+                 size: tuple[int, int] = (720, 1280), seed: int = 0) -> None:
+        """初始化回放设备
+
+        Args:
+            frames_dir (str, optional): 录制的截图目录，支持图片文件与.npy原始数组. Defaults to None.
+            frames (list, optional): OpenCV格式的截图列表. Defaults to None.
+            latency (float, optional): 截图的模拟延迟,单位为ms. Defaults to 0.
+            touch_latency (float, optional): 点击、滑动的模拟延迟,单位为ms. Defaults to 0.
+            size (tuple[int, int], optional): 没有提供截图时生成的合成截图大小(高, 宽). Defaults to (720, 1280).
+            seed (int, optional): 合成截图的随机数种子. Defaults to 0.
+        """
+        self._raw: list[bytes] = []
+        if frames_dir is not None:
+            self._raw.extend(self._load_dir(frames_dir))
+        for frame in frames or []:
+            self._raw.append(cv2.imencode(".png", frame)[1].tobytes())
+        if not self._raw:
+            self._raw.append(cv2.imencode(".png", synthetic_frame(size[0], size[1], seed))[1].tobytes())
+        self.latency = latency / 1000
+        self.touch_latency = touch_latency / 1000
+        self.touches: list[tuple] = []
+        self._index = 0
+        self._lock = threading.Lock()
+
+    @property
+    def frame_count(self) -> int:
+        return len(self._raw)
+
+    def screenshot_raw(self) -> bytes:
+        with self._lock:
+            raw = self._raw[self._index % len(self._raw)]
+            self._index += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+        return raw
+
+    def save_screenshot(self, path: str):
+        with open(path, "wb") as f:
+            f.write(self._raw[(self._index - 1) % len(self._raw)])
+
+    def click(self, x: int, y: int, duration: int):
+        if self.touch_latency > 0:
+            time.sleep(self.touch_latency)
+        self.touches.append(("click", x, y, duration))
+
+    def swipe(self, points: list, duration: int):
+        if self.touch_latency > 0:
+            time.sleep(self.touch_latency)
+        self.touches.append(("swipe", points, duration))
+
+    @staticmethod
+    def _load_dir(frames_dir: str) -> list[bytes]:
+        raw = []
+        for file in sorted(os.listdir(frames_dir)):
+            path = os.path.join(frames_dir, file)
+            if file.lower().endswith(IMAGE_EXTENSIONS):
+                with open(path, "rb") as f:
+                    raw.append(f.read())
+            elif file.lower().endswith(".npy"):
+                raw.append(cv2.imencode(".png", np.load(path))[1].tobytes())
+        return raw
+
+
+def synthetic_frame(height: int = 720, width: int = 1280, seed: int = 0):
+    """生成类似游戏界面的合成截图：纯色背景上随机分布带文字的色块
+
+    Returns:
+        图像 (np.array): OpenCV格式的图像
+    """
+    rng = np.random.default_rng(seed)
+    image = np.full((height, width, 3), 40, dtype=np.uint8)
+    for i in range(height * width // 4000):
+        x, y = int(rng.integers(0, width - 20)), int(rng.integers(0, height - 20))
+        w, h = int(rng.integers(20, 200)), int(rng.integers(20, 80))
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        cv2.rectangle(image, (x, y), (x + w, y + h), color, -1)
+        cv2.putText(image, f"B{i}", (x + 4, y + 18), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+    return image
+
+
+def synthetic_templates(frame, count: int = 30, seed: int = 0, absent_ratio: float = 0.5) -> list[Template]:
+    """从截图中截取合成模板，依次为ImageTemplate、ImageColorTemplate与MultiColorsTemplate
+
+    Args:
+        frame (np.array): 截图
+        count (int, optional): 模板数量. Defaults to 30.
+        seed (int, optional): 随机数种子. Defaults to 0.
+        absent_ratio (float, optional): 截图中不存在的模板比例,通过反色或改变颜色生成. Defaults to 0.5.
+
+    Returns:
+        list[Template]: 模板列表
+    """
+    rng = np.random.default_rng(seed)
+    height, width = frame.shape[:2]
+    templates = []
+    for i in range(count):
+        w, h = int(rng.integers(40, 160)), int(rng.integers(30, 100))
+        x, y = int(rng.integers(0, width - w)), int(rng.integers(0, height - h))
+        crop = frame[y:y + h, x:x + w].copy()
+        absent = rng.random() < absent_ratio
+        kind = i % 3
+        region = None if rng.random() < 0.5 else [max(0, x - 150), max(0, y - 100), x + w + 150, y + h + 100]
+        if kind == 2:
+            colors = [(int(dx), int(dy), _hex(crop[dy, dx]))
+                      for dx, dy in zip(rng.integers(0, w, 4), rng.integers(0, h, 4))]
+            first_color = _hex(255 - crop[0, 0] if absent else crop[0, 0])
+            templates.append(MultiColorsTemplate(first_color, [(dx, dy, c) for dx, dy, c in colors],
+                                                 f"multi_colors_{i}", region))
+            continue
+        if absent:
+            crop = 255 - crop
+        template = (ImageTemplate if kind == 0 else ImageColorTemplate)(f"synthetic_{i}.png", region=region)
+        template.template = crop
+        templates.append(template)
+    return templates
+
+
+def _hex(bgr) -> str:
+    b, g, r = (int(v) for v in bgr)
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+class _CountTask(Task):
+    """执行指定次数后完成的空任务"""
+
+    def __init__(self, times: int = 1) -> None:
+        super().__init__()
+        self._times = times
+        self._remaining = times
+        self._status = TaskStatus.PENDING
+
+    @staticmethod
+    def name() -> str:
+        return "CountTask"
+
+    @property
+    def status(self) -> TaskStatus:
+        return self._status
+
+    def __str__(self) -> str:
+        return f"CountTask({self._remaining}/{self._times})"
+
+    def task(self):
+        self._remaining -= 1
+
+    def execute(self):
+        self.task()
+        if self._remaining <= 0:
+            self._status = TaskStatus.COMPLETED
+
+    def reset(self):
+        self._remaining = self._times
+        self._status = TaskStatus.PENDING
+
+
+def _peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024  # macOS单位为字节,Linux为KB
+
+
+def _measure(name: str, ops: int, func: Callable[[], object]) -> dict:
+    """重复执行func并统计吞吐量、耗时分位数与峰值内存"""
+    histogram = Histogram(reservoir_size=ops)
+    start_ns = time.perf_counter_ns()
+    for _ in range(ops):
+        op_start = time.perf_counter_ns()
+        func()
+        histogram.observe(time.perf_counter_ns() - op_start)
+    return _result(name, ops, time.perf_counter_ns() - start_ns, histogram)
+
+
+def _result(name: str, ops: int, elapsed_ns: int, histogram: Histogram = None) -> dict:
+    result = {"scenario": name, "ops": ops, "seconds": elapsed_ns / 1e9,
+              "ops_per_sec": ops / (elapsed_ns / 1e9) if elapsed_ns else 0.0}
+    if histogram is not None:
+        p50, p95, p99 = histogram.percentiles(0.5, 0.95, 0.99)
+        result.update({"p50_ms": p50 / 1e6, "p95_ms": p95 / 1e6, "p99_ms": p99 / 1e6,
+                       "max_ms": histogram.max_ns / 1e6})
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+@scenario
+def decode(device: FakeDevice, templates: list[Template], iterations: int) -> list[dict]:
+    """截图数据解码"""
+    raw = device.screenshot_raw()
+    return [_measure("decode", iterations, lambda: Images.bytes2opencv(raw))]
+
+
+@scenario
+def match(device: FakeDevice, templates: list[Template], iterations: int) -> list[dict]:
+    """按模板类型统计单个模板在同一帧上的匹配"""
+    image = Images.bytes2opencv(device.screenshot_raw())
+    results = []
+    for template_type in (ImageTemplate, ImageColorTemplate, MultiColorsTemplate):
+        group = [template for template in templates if type(template) is template_type]
+        if not group:
+            continue
+        index = iter(range(sys.maxsize))
+        results.append(_measure(f"match.{template_type.__name__}", iterations,
+                                lambda: group[next(index) % len(group)].match_frame(Frame(image))))
+    return results
+
+
+@scenario
+def pyramid(device: FakeDevice, templates: list[Template], iterations: int) -> list[dict]:
+    """全图匹配单个图像模板，分别统计模板存在与不存在时Images.findImage与PyramidMatcher(默认与early_reject)的耗时"""
+    image = Images.bytes2opencv(device.screenshot_raw())
+    rng = np.random.default_rng(0)
+    height, width = image.shape[:2]
+    crops = []
+    for _ in range(10):
+        w, h = int(rng.integers(60, 160)), int(rng.integers(40, 100))
+        x, y = int(rng.integers(0, width - w)), int(rng.integers(0, height - h))
+        crops.append(image[y:y + h, x:x + w].copy())
+    results = []
+    for case, group in (("present", crops), ("absent", [255 - crop for crop in crops])):
+        index = iter(range(sys.maxsize))
+        results.append(_measure(f"pyramid.findImage.{case}", iterations,
+                                lambda: Images.findImage(image, group[next(index) % len(group)], 0.9)))
+        for name, matcher in (("default", PyramidMatcher()), ("early_reject", PyramidMatcher(early_reject=True))):
+            pyramid_templates = []
+            for i, crop in enumerate(group):
+                template = ImageTemplate(f"pyramid_{case}_{i}.png")
+                template.template = crop
+                template.matcher = matcher
+                pyramid_templates.append(template)
+            index = iter(range(sys.maxsize))
+            results.append(_measure(f"pyramid.{name}.{case}", iterations,
+                                    lambda: pyramid_templates[next(index) % len(pyramid_templates)]
+                                    .match_frame(Frame(image))))
+    return results
+
+
+@scenario
+def find(device: FakeDevice, templates: list[Template], iterations: int) -> list[dict]:
+    """Instance.find(截图+解码+匹配)与同一帧上的Instance.find_all"""
+    instance = Instance(device=device, metrics=Metrics())
+    index = iter(range(sys.maxsize))
+    return [_measure("find", iterations, lambda: instance.find(templates[next(index) % len(templates)])),
+            _measure("find_all", max(1, iterations // 10), lambda: instance.find_all(templates))]
+
+
+@scenario
+def task_queue(device: FakeDevice, templates: list[Template], iterations: int) -> list[dict]:
+    """TaskQueue添加任务与按优先级取出任务"""
+    count = iterations * 10
+    queue = TaskQueue()
+    tasks = [_CountTask() for _ in range(count)]
+    start_ns = time.perf_counter_ns()
+    for i, task in enumerate(tasks):
+        queue.add_task(task, priority=i % 10)
+    add = _result("task_queue.add_task", count, time.perf_counter_ns() - start_ns)
+
+    def next_task():
+        queue.next_task.execute()
+
+    return [add, _measure("task_queue.next_task", count, next_task)]
+
+
+@scenario
+def scheduler(device: FakeDevice, templates: list[Template], iterations: int) -> list[dict]:
+    """TaskScheduler分派大量任务，分别统计串行与并发模式"""
+    results = []
+    for workers in (1, 4):
+        count = iterations * 10
+        queue = TaskQueue()
+        tasks = [_CountTask() for _ in range(count)]
+        for i, task in enumerate(tasks):
+            if workers > 1:
+                task.resources = (f"device:{i % workers}",)
+            queue.add_task(task, priority=i % 10)
+        done = threading.Event()
+        queue.add_task(_DoneTask(done), priority=-1)  # 优先级最低,所有任务完成后执行
+        task_scheduler = TaskScheduler(workers=workers)
+        task_scheduler.task_queue = queue
+        start_ns = time.perf_counter_ns()
+        task_scheduler.start()
+        done.wait()
+        elapsed_ns = time.perf_counter_ns() - start_ns
+        task_scheduler.stop()
+        results.append(_result(f"scheduler.workers_{workers}", count, elapsed_ns))
+    return results
+
+
+class _DoneTask(_CountTask):
+    def __init__(self, done: threading.Event) -> None:
+        super().__init__()
+        self._done = done
+        self.resources = ("device:0",)
+
+    def execute(self):
+        super().execute()
+        self._done.set()
+
+
+def run_benchmarks(scenarios: list[str] = None, frames_dir: str = None, latency: float = 0,
+                   iterations: int = 100, template_count: int = 30, seed: int = 0) -> dict:
+    """运行测试场景
+
+    Args:
+        scenarios (list[str], optional): 场景名称列表. Defaults to None,即所有场景.
+        frames_dir (str, optional): 录制的截图目录. Defaults to None,即使用合成截图.
+        latency (float, optional): 截图的模拟延迟,单位为ms. Defaults to 0.
+        iterations (int, optional): 每个场景的操作次数. Defaults to 100.
+        template_count (int, optional): 合成模板数量. Defaults to 30.
+        seed (int, optional): 随机数种子. Defaults to 0.
+
+    Returns:
+        dict: 测试环境与各场景的结果
+    """
+    device = FakeDevice(frames_dir, latency=latency, seed=seed)
+    templates = synthetic_templates(Images.bytes2opencv(device.screenshot_raw()), template_count, seed)
+    results = []
+    for name in scenarios or list(SCENARIOS):
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario: {name}, available: {list(SCENARIOS)}")
+        results.extend(SCENARIOS[name](device, templates, iterations))
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {"frames_dir": frames_dir, "frame_count": device.frame_count, "latency_ms": latency,
+                   "iterations": iterations, "template_count": template_count, "seed": seed},
+        "timestamp": time.time(),
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float = 0.2) -> list[dict]:
+    """比较两次测试结果的吞吐量
+
+    Args:
+        current (dict): 本次结果
+        baseline (dict): 基准结果
+        tolerance (float, optional): 允许的吞吐量下降比例. Defaults to 0.2.
+
+    Returns:
+        list[dict]: 吞吐量下降超过tolerance的场景
+    """
+    baseline_results = {result["scenario"]: result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        base = baseline_results.get(result["scenario"])
+        if base is None or not base["ops_per_sec"]:
+            continue
+        ratio = result["ops_per_sec"] / base["ops_per_sec"]
+        if ratio < 1 - tolerance:
+            regressions.append({"scenario": result["scenario"], "ops_per_sec": result["ops_per_sec"],
+                                "baseline_ops_per_sec": base["ops_per_sec"], "ratio": ratio})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="miniframework离线性能测试")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="测试场景,可重复,默认全部")
+    parser.add_argument("--frames", help="录制的截图目录(图片或.npy),默认使用合成截图")
+    parser.add_argument("--latency", type=float, default=0, help="截图的模拟延迟,单位为ms")
+    parser.add_argument("--iterations", type=int, default=100, help="每个场景的操作次数")
+    parser.add_argument("--templates", type=int, default=30, help="合成模板数量")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+    parser.add_argument("-o", "--output", help="结果JSON的输出路径,默认输出到标准输出")
+    parser.add_argument("--baseline", help="基准结果JSON,吞吐量下降超过--tolerance时返回1")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许的吞吐量下降比例")
+    args = parser.parse_args()
+
+    logger.remove()  # 调试日志会影响耗时统计
+    logger.add(sys.stderr, level="WARNING")
+    report = run_benchmarks(args.scenario, args.frames, args.latency, args.iterations, args.templates, args.seed)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            report["regressions"] = compare(report, json.load(f), args.tolerance)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    if report.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
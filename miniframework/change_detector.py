@@ -0,0 +1,91 @@
+from threading import Lock
+from weakref import WeakKeyDictionary
+
+import cv2
+import numpy as np
+
+from miniframework.frame import Frame
+from miniframework.template import Template, MultiColorsTemplate
+
+
+class ChangeDetector:
+    """帧变化检测器，通过区域缩略图签名判断屏幕区域是否变化，区域未变化时复用上一次的匹配结果
+
+    缩略图的每个像素是区域内一个网格的平均灰度，网格边长不超过cell，因此签名的大小随区域变化。
+    检测盲区: 变化的面积与灰度差的乘积小于tolerance * cell * cell(默认约512)时，网格的平均灰度变化不超过tolerance，
+    视为未变化，如默认设置下灰度差小于20的5x5像素的变化
+    """
+
+    def __init__(self, size: int = 16, tolerance: int = 2, cell: int | None = 16) -> None:
+        """初始化帧变化检测器
+
+        Args:
+            size (int, optional): 区域缩略图的最小边长. Defaults to 16.
+            tolerance (int, optional): 缩略图灰度值允许的最大差值. Defaults to 2.
+            cell (int | None, optional): 缩略图每个像素对应的网格的最大边长,单位为像素. Defaults to 16,
+                None表示缩略图固定为size x size，用于比较不同区域的签名(如ScreenClassifier)
+        """
+        self.size = size
+        self.tolerance = tolerance
+        self.cell = cell
+        self._results: WeakKeyDictionary[Template, tuple] = WeakKeyDictionary()  # template -> (签名, 结果)
+        self._lock = Lock()
+
+    def signature(self, frame: Frame, region: list | None = None):
+        """计算帧区域的签名(缩小后的灰度图)
+
+        Args:
+            frame (Frame): 屏幕帧
+            region (list | None, optional): [xMin, yMin, xMax, yMax]. Defaults to None,即全图.
+
+        Returns:
+            签名 (np.array):
+        """
+        gray = frame.gray(region)
+        if self.cell is None:
+            size = (self.size, self.size)
+        else:
+            height, width = gray.shape[:2]
+            size = (max(self.size, -(-width // self.cell)), max(self.size, -(-height // self.cell)))
+        return cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+
+    def changed(self, signature, other) -> bool:
+        """比较两个签名，判断区域是否变化"""
+        if signature.shape != other.shape:
+            return True
+        return int(np.abs(signature.astype(np.int16) - other).max()) > self.tolerance
+
+    def match(self, template: Template, frame: Frame):
+        """匹配模板，模板区域自上一次匹配以来未变化时直接返回上一次的结果
+
+        Args:
+            template (Template): 模板对象
+            frame (Frame): 屏幕帧
+
+        Returns:
+            匹配结果
+        """
+        signature = self.signature(frame, self.watch_region(template))
+        with self._lock:
+            cached = self._results.get(template)
+        if cached is not None and not self.changed(cached[0], signature):
+            return cached[1]
+        result = template.match_frame(frame)
+        with self._lock:
+            self._results[template] = (signature, result)
+        return result
+
+    def reset(self):
+        """清空缓存的匹配结果"""
+        with self._lock:
+            self._results.clear()
+
+    @staticmethod
+    def watch_region(template: Template) -> list | None:
+        """模板匹配结果所依赖的区域，多点颜色模板的区域需要包含所有偏移点"""
+        region = getattr(template, "region", None)
+        if region is None or not isinstance(template, MultiColorsTemplate):
+            return region
+        dxs = [color[0] for color in template.colors] + [0]
+        dys = [color[1] for color in template.colors] + [0]
+        return [region[0] + min(dxs), region[1] + min(dys), region[2] + max(dxs), region[3] + max(dys)]
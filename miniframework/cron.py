@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+# 字段的取值范围: 分 时 日 月 周
+_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+class CronSchedule:
+    """cron表达式，格式为"分 时 日 月 周"，支持*、*/n、a-b、a-b/n和逗号分隔的列表，周的0和7均表示周日"""
+
+    def __init__(self, expression: str) -> None:
+        """初始化cron表达式
+
+        Args:
+            expression (str): cron表达式，如"*/5 * * * *"表示每5分钟
+
+        Raises:
+            ValueError: 表达式格式错误
+        """
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression must have 5 fields, got {expression!r}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self._parse(field, low, high) for field, (low, high) in zip(fields, _FIELDS))
+        self.weekdays = {day % 7 for day in weekdays}
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def __str__(self) -> str:
+        return self.expression
+
+    def next(self, after: datetime) -> datetime:
+        """计算晚于指定时间的下一个触发时间
+
+        Args:
+            after (datetime): 起始时间
+
+        Returns:
+            datetime: 下一个触发时间
+        """
+        t = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = t + timedelta(days=366 * 5)
+        while t < limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._match_day(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f"Cron expression {self.expression!r} never matches")
+
+    def _match_day(self, t: datetime) -> bool:
+        day_match = t.day in self.days
+        weekday_match = (t.weekday() + 1) % 7 in self.weekdays
+        # 与cron一致: 日和周都有限制时满足其一即可
+        if self._any_day or self._any_weekday:
+            return day_match and weekday_match
+        return day_match or weekday_match
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int) -> set[int]:
+        values = set()
+        for part in field.split(","):
+            step = 1
+            if "/" in part:
+                part, step_text = part.split("/", 1)
+                step = int(step_text)
+                if step <= 0:
+                    raise ValueError(f"Invalid cron step: {field!r}")
+            if part == "*":
+                start, end = low, high
+            elif "-" in part:
+                start, end = (int(v) for v in part.split("-", 1))
+            else:
+                start = int(part)
+                end = high if step > 1 else start
+            if start < low or end > high or start > end:
+                raise ValueError(f"Cron field {field!r} out of range {low}-{high}")
+            values.update(range(start, end + 1, step))
+        return values
@@ -0,0 +1,227 @@
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+from loguru import logger
+
+
+class DebugRecorder:
+    """调试结果记录器，使用有界环形缓冲区保存find的匹配结果，并可异步写入磁盘以便回放
+
+    内存中的图像按对象计算字节数，find_all在同一帧上的多条记录共享同一张截图时只计算一次
+    """
+
+    MODES = ("full", "crop", "thumbnail")
+
+    def __init__(self, max_items: int = 100, max_bytes: int = 64 * 1024 * 1024, mode: str = "full",
+                 thumbnail_width: int = 320, jpeg_quality: int = 80, spill_path: str = None,
+                 spill_queue_size: int = 256, crop_margin: int = 32) -> None:
+        """初始化调试结果记录器
+
+        Args:
+            max_items (int, optional): 内存中保存的最大记录数. Defaults to 100.
+            max_bytes (int, optional): 内存中保存的最大图像字节数. Defaults to 64MB.
+            mode (str, optional): 图像保存方式. Defaults to "full".
+                - "full": 完整截图
+                - "crop": 只保存匹配区域，匹配结果为点(x, y)时保存点周围crop_margin的窗口，不是区域或点时保存缩小到thumbnail_width的截图
+                - "thumbnail": JPEG压缩的缩略图
+            thumbnail_width (int, optional): 缩略图宽度. Defaults to 320.
+            jpeg_quality (int, optional): 缩略图的JPEG质量. Defaults to 80.
+            spill_path (str, optional): 写入磁盘的文件路径前缀，生成<spill_path>.bin与<spill_path>.idx.
+                Defaults to None,即不写入磁盘.
+            spill_queue_size (int, optional): 等待写入磁盘的最大记录数，超出时丢弃记录. Defaults to 256.
+            crop_margin (int, optional): "crop"模式下点结果周围保存的窗口半径,单位为像素. Defaults to 32.
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"mode must be one of {self.MODES}, got {mode}")
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.thumbnail_width = thumbnail_width
+        self.jpeg_quality = jpeg_quality
+        self.spill_path = spill_path
+        self.crop_margin = crop_margin
+        self.dropped = 0  # 因写入队列已满而丢弃的记录数
+        self._records: deque[dict] = deque()
+        self._bytes = 0
+        self._refs: dict[int, int] = {}  # 图像对象的id -> 引用该图像的记录数
+        self._lock = threading.Lock()
+        self._spill_queue: queue.Queue | None = None
+        self._spill_thread: threading.Thread | None = None
+        if spill_path:
+            self._spill_queue = queue.Queue(spill_queue_size)
+            self._spill_thread = threading.Thread(target=self._spill, args=(self._spill_queue,), name="DebugRecorder", daemon=True)
+            self._spill_thread.start()
+
+    @property
+    def records(self) -> list[dict]:
+        """内存中保存的记录，按时间从旧到新排列"""
+        with self._lock:
+            return list(self._records)
+
+    @property
+    def total_bytes(self) -> int:
+        """内存中保存的图像字节数"""
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __str__(self) -> str:
+        return f"DebugRecorder({len(self._records)} records, {self._bytes} bytes, mode={self.mode})"
+
+    def record(self, template, result, screenshot):
+        """记录一次匹配结果
+
+        Args:
+            template (Template): 模板对象
+            result: 匹配结果
+            screenshot (): 匹配使用的截图
+        """
+        image = self._compact(screenshot, result)
+        item = {
+            "template": template,
+            "result": result,
+            "screenshot": image,
+            "timestamp": time.time(),
+        }
+        with self._lock:
+            self._records.append(item)
+            self._retain(image)
+            while self._records and (len(self._records) > self.max_items or self._bytes > self.max_bytes):
+                self._release(self._records.popleft()["screenshot"])
+        spill_queue = self._spill_queue
+        if spill_queue is not None:
+            try:
+                spill_queue.put_nowait(item)
+            except queue.Full:
+                self.dropped += 1
+
+    def clear(self):
+        """清空内存中的记录"""
+        with self._lock:
+            self._records.clear()
+            self._refs.clear()
+            self._bytes = 0
+
+    def close(self):
+        """等待所有记录写入磁盘并停止写入线程，之后的记录只保存在内存中"""
+        thread, self._spill_thread = self._spill_thread, None
+        if thread is not None:
+            spill_queue, self._spill_queue = self._spill_queue, None
+            spill_queue.put(None)
+            thread.join()
+
+    @staticmethod
+    def decode(image):
+        """将记录中的图像解码为OpenCV格式，缩略图为JPEG编码的数据"""
+        if image.ndim == 1:
+            return cv2.imdecode(image, cv2.IMREAD_COLOR)
+        return image
+
+    @staticmethod
+    def replay(spill_path: str):
+        """按写入顺序回放磁盘中的记录
+
+        Args:
+            spill_path (str): 写入磁盘的文件路径前缀
+
+        Yields:
+            dict: {"template": 模板描述, "result": 匹配结果, "screenshot": 图像, "timestamp": 时间戳}
+        """
+        with open(f"{spill_path}.idx", "r", encoding="utf-8") as index, open(f"{spill_path}.bin", "rb") as data:
+            for line in index:
+                entry = json.loads(line)
+                data.seek(entry["offset"])
+                buffer = np.frombuffer(data.read(entry["length"]), dtype=np.uint8)
+                yield {
+                    "template": entry["template"],
+                    "result": entry["result"],
+                    "screenshot": cv2.imdecode(buffer, cv2.IMREAD_COLOR),
+                    "timestamp": entry["timestamp"],
+                }
+
+    def _retain(self, image):
+        key = id(image)
+        count = self._refs.get(key, 0)
+        if count == 0:
+            self._bytes += image.nbytes
+        self._refs[key] = count + 1
+
+    def _release(self, image):
+        key = id(image)
+        count = self._refs.pop(key) - 1
+        if count:
+            self._refs[key] = count
+        else:
+            self._bytes -= image.nbytes
+
+    def _compact(self, screenshot, result):
+        if self.mode == "crop":
+            region = self._crop_region(result)
+            if region is None:
+                return self._downscale(screenshot)
+            x_min, y_min, x_max, y_max = region
+            return screenshot[max(0, y_min):max(0, y_max), max(0, x_min):max(0, x_max)].copy()
+        if self.mode == "thumbnail":
+            return cv2.imencode(".jpg", self._downscale(screenshot), [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])[1]
+        return screenshot
+
+    def _crop_region(self, result) -> list | None:
+        """匹配结果对应的保存区域，区域结果为其本身，点结果为点周围crop_margin的窗口"""
+        if not isinstance(result, (list, tuple, np.ndarray)):
+            return None
+        if len(result) == 4:
+            return [int(v) for v in result]
+        if len(result) == 2:
+            x, y = (int(v) for v in result)
+            return [x - self.crop_margin, y - self.crop_margin, x + self.crop_margin + 1, y + self.crop_margin + 1]
+        return None
+
+    def _downscale(self, screenshot):
+        height, width = screenshot.shape[:2]
+        if width > self.thumbnail_width:
+            size = (self.thumbnail_width, max(1, round(height * self.thumbnail_width / width)))
+            screenshot = cv2.resize(screenshot, size, interpolation=cv2.INTER_AREA)
+        return screenshot
+
+    def _spill(self, spill_queue: queue.Queue):
+        """写入线程运行的内部方法，数据文件只追加写入，索引文件每行记录一条数据的位置"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.spill_path)), exist_ok=True)
+        with open(f"{self.spill_path}.bin", "ab") as data, open(f"{self.spill_path}.idx", "a", encoding="utf-8") as index:
+            while True:
+                item = spill_queue.get()
+                if item is None:
+                    return
+                try:
+                    image = item["screenshot"]
+                    buffer = image if image.ndim == 1 else cv2.imencode(".png", image)[1]
+                    offset = data.tell()
+                    data.write(buffer.tobytes())
+                    data.flush()
+                    index.write(json.dumps({
+                        "offset": offset,
+                        "length": int(buffer.nbytes),
+                        "template": str(item["template"]),
+                        "result": _jsonable(item["result"]),
+                        "timestamp": item["timestamp"],
+                    }, ensure_ascii=False) + "\n")
+                    index.flush()
+                except Exception as e:
+                    logger.error(f"Failed to spill debug record: {e}")
+
+
+def _jsonable(result):
+    if isinstance(result, (list, tuple)):
+        return [_jsonable(v) for v in result]
+    if isinstance(result, np.generic):
+        return result.item()
+    return result
@@ -0,0 +1,379 @@
+import math
+import threading
+import time
+from collections import deque
+from threading import Condition, Lock
+from typing import Callable
+
+import cv2
+import numpy as np
+from loguru import logger
+from minicv import Images
+
+
+def region_union(regions: list) -> list | None:
+    """计算多个区域的并集外接矩形
+
+    Args:
+        regions (list): 区域列表，每个区域为[xMin, yMin, xMax, yMax]，None表示全图
+
+    Returns:
+        region (list | None): 并集外接矩形，任一区域为None时返回None
+    """
+    if not regions or any(region is None for region in regions):
+        return None
+    return [min(r[0] for r in regions), min(r[1] for r in regions),
+            max(r[2] for r in regions), max(r[3] for r in regions)]
+
+
+def scale_region(region: list | None, sx: float, sy: float) -> list | None:
+    """按比例缩放区域
+
+    Args:
+        region (list | None): [xMin, yMin, xMax, yMax]，None表示全图
+        sx (float): 横向缩放比例
+        sy (float): 纵向缩放比例
+
+    Returns:
+        region (list | None): 缩放后的区域，坐标向外取整
+    """
+    if region is None:
+        return None
+    x_min, y_min, x_max, y_max = region
+    return [math.floor(x_min * sx), math.floor(y_min * sy), math.ceil(x_max * sx), math.ceil(y_max * sy)]
+
+
+def scale_result(result, sx: float, sy: float):
+    """按比例缩放匹配结果，匹配区域[xMin, yMin, xMax, yMax]与匹配点(x, y)按坐标缩放，其他结果原样返回
+
+    Args:
+        result: 匹配结果
+        sx (float): 横向缩放比例
+        sy (float): 纵向缩放比例
+
+    Returns:
+        缩放后的匹配结果
+    """
+    if isinstance(result, (list, tuple)) and len(result) in (2, 4) \
+            and all(isinstance(v, (int, float, np.integer, np.floating)) for v in result):
+        scaled = [round(v * (sx if i % 2 == 0 else sy)) for i, v in enumerate(result)]
+        return type(result)(scaled)
+    return result
+
+
+class Frame:
+    """屏幕帧，保存一次截图解码后的图像及其采集时间"""
+
+    def __init__(self, image, timestamp: float = None, seq: int = 0) -> None:
+        """初始化屏幕帧
+
+        Args:
+            image (): OpenCV格式的图像
+            timestamp (float, optional): 采集时间(time.monotonic). Defaults to None,即当前时间.
+            seq (int, optional): 帧序号. Defaults to 0.
+        """
+        self.image = image
+        self.timestamp = time.monotonic() if timestamp is None else timestamp
+        self.seq = seq
+        self._roi: list | None = None
+        self._gray_views: list[tuple[list, object]] = []  # [(区域, 灰度图)]
+        self._pyramids: dict[tuple, list] = {}  # 区域 -> 灰度图像金字塔
+        self._color_masks: dict[tuple, list[tuple[list, object]]] = {}  # 颜色范围 -> [(区域, 掩码)]
+        self._resized: dict[tuple, Frame] = {}  # (宽, 高) -> 缩放后的帧
+        self._lock = Lock()
+
+    @property
+    def age(self) -> float:
+        """帧的年龄，单位为秒"""
+        return time.monotonic() - self.timestamp
+
+    @property
+    def width(self) -> int:
+        return self.image.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.image.shape[0]
+
+    def is_fresh(self, max_age: float | None) -> bool:
+        """判断帧是否仍在有效期内
+
+        Args:
+            max_age (float | None): 最大年龄，单位为秒，None表示永不过期
+
+        Returns:
+            bool: 是否有效
+        """
+        return max_age is None or self.age <= max_age
+
+    def clip(self, region: list | None) -> list:
+        """将区域裁剪到帧的范围内
+
+        Args:
+            region (list | None): [xMin, yMin, xMax, yMax]，None表示全图
+
+        Returns:
+            region (list): 裁剪后的区域
+        """
+        if region is None:
+            return [0, 0, self.width, self.height]
+        x_min, y_min, x_max, y_max = region
+        return [max(0, x_min), max(0, y_min), min(self.width, x_max), min(self.height, y_max)]
+
+    def focus(self, regions: list):
+        """设置感兴趣区域为多个区域的并集，之后的灰度转换只处理该区域
+
+        Args:
+            regions (list): 区域列表，None表示全图
+        """
+        self._roi = self.clip(region_union(regions))
+
+    def crop(self, region: list | None):
+        """获取区域的图像视图(不复制数据)
+
+        Args:
+            region (list | None): [xMin, yMin, xMax, yMax]，None表示全图
+
+        Returns:
+            图像视图 (np.array):
+        """
+        x_min, y_min, x_max, y_max = self.clip(region)
+        return self.image[y_min:y_max, x_min:x_max]
+
+    def gray(self, region: list | None = None):
+        """获取区域的灰度图像视图，同一区域的灰度转换只进行一次
+
+        Args:
+            region (list | None, optional): [xMin, yMin, xMax, yMax]. Defaults to None,即全图.
+
+        Returns:
+            灰度图像视图 (np.array):
+        """
+        clipped = self.clip(region)
+        x_min, y_min, x_max, y_max = clipped
+        with self._lock:
+            for area, gray in self._gray_views:
+                if self._contains(area, clipped):
+                    break
+            else:
+                area = self._roi if self._roi is not None and self._contains(self._roi, clipped) else clipped
+                gray = Images.grayscale(self.crop(area))
+                self._gray_views.append((area, gray))
+        return gray[y_min - area[1]:y_max - area[1], x_min - area[0]:x_max - area[0]]
+
+    def pyramid(self, region: list | None, levels: int) -> list:
+        """获取区域的灰度图像金字塔，同一区域的金字塔只构建一次，供多个模板共享
+
+        Args:
+            region (list | None): [xMin, yMin, xMax, yMax]，None表示全图
+            levels (int): 金字塔层数(不含原图)
+
+        Returns:
+            list: [区域灰度图, 第1层, ..., 第levels层]
+        """
+        key = tuple(self.clip(region))
+        gray = self.gray(region)
+        with self._lock:
+            pyramid = self._pyramids.setdefault(key, [gray])
+            while len(pyramid) <= levels:
+                pyramid.append(cv2.pyrDown(pyramid[-1]))
+            return pyramid[:levels + 1]
+
+    def color_mask(self, lower, upper, region: list | None = None):
+        """获取区域内颜色在[lower, upper]范围内的掩码视图，同一颜色范围的掩码只计算一次，供多个多点颜色模板共享
+
+        Args:
+            lower (np.array): BGR颜色下界
+            upper (np.array): BGR颜色上界
+            region (list | None, optional): [xMin, yMin, xMax, yMax]. Defaults to None,即全图.
+
+        Returns:
+            掩码视图 (np.array): 颜色在范围内的像素为255
+        """
+        clipped = self.clip(region)
+        x_min, y_min, x_max, y_max = clipped
+        key = (tuple(int(v) for v in lower), tuple(int(v) for v in upper))
+        with self._lock:
+            masks = self._color_masks.setdefault(key, [])
+            for area, mask in masks:
+                if self._contains(area, clipped):
+                    break
+            else:
+                area = clipped
+                mask = cv2.inRange(self.crop(area), lower, upper)
+                masks.append((area, mask))
+        return mask[y_min - area[1]:y_max - area[1], x_min - area[0]:x_max - area[0]]
+
+    def resized(self, size: tuple[int, int]) -> "Frame":
+        """获取缩放到指定分辨率的帧，同一分辨率只缩放一次，缩放后的帧保留采集时间与帧序号
+
+        Args:
+            size (tuple[int, int]): (宽, 高)
+
+        Returns:
+            Frame: 缩放后的帧，分辨率相同时返回帧本身
+        """
+        size = (int(size[0]), int(size[1]))
+        if size == (self.width, self.height):
+            return self
+        with self._lock:
+            frame = self._resized.get(size)
+            if frame is None:
+                interpolation = cv2.INTER_AREA if size[0] < self.width else cv2.INTER_LINEAR
+                frame = Frame(cv2.resize(self.image, size, interpolation=interpolation), self.timestamp, self.seq)
+                self._resized[size] = frame
+        return frame
+
+    @staticmethod
+    def _contains(area: list, region: list) -> bool:
+        return area[0] <= region[0] and area[1] <= region[1] and region[2] <= area[2] and region[3] <= area[3]
+
+    def __str__(self) -> str:
+        return f"Frame(seq={self.seq}, shape={getattr(self.image, 'shape', None)}, age={self.age:.3f}s)"
+
+
+class FrameStream:
+    """后台连续截图线程，将解码后的帧写入环形缓冲区，使截图与匹配并行进行"""
+
+    def __init__(self, capture: Callable[[], bytes], fps: float = 30, buffer_size: int = 3,
+                 backpressure: bool = True, decode: Callable = Images.bytes2opencv, max_failures: int = 10,
+                 max_backoff: float = 2.0) -> None:
+        """初始化截图流
+
+        Args:
+            capture (Callable[[], bytes]): 获取原始截图数据的函数
+            fps (float, optional): 最大截图帧率. Defaults to 30.
+            buffer_size (int, optional): 环形缓冲区大小. Defaults to 3.
+            backpressure (bool, optional): 最新帧未被读取时暂停截图,避免无人使用的截图和解码. Defaults to True.
+            decode (Callable, optional): 原始截图数据的解码函数. Defaults to Images.bytes2opencv.
+            max_failures (int, optional): 连续截图或解码失败的次数上限,达到后停止截图流,0表示不限制. Defaults to 10.
+            max_backoff (float, optional): 失败后重试间隔的上限,重试间隔从截图间隔开始按2倍增长,单位为秒. Defaults to 2.0.
+        """
+        self._capture = capture
+        self._decode = decode
+        self._interval = 1 / fps if fps > 0 else 0
+        self._backpressure = backpressure
+        self._buffer: deque[Frame] = deque(maxlen=buffer_size)
+        self._cond = Condition()
+        self._seq = 0
+        self._consumed_seq = 0
+        self._running = False
+        self._thread: threading.Thread | None = None
+        self._max_failures = max_failures
+        self._max_backoff = max_backoff
+        self.failures = 0  # 连续失败的次数
+        self.error: Exception | None = None  # 因连续失败停止时的最后一个异常
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    @property
+    def frames(self) -> list[Frame]:
+        """环形缓冲区中的帧，按采集时间从旧到新排列"""
+        with self._cond:
+            return list(self._buffer)
+
+    def __str__(self) -> str:
+        return f"FrameStream(running={self._running}, seq={self._seq}, buffer={len(self._buffer)})"
+
+    def start(self):
+        """启动截图线程"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self.failures = 0
+            self.error = None
+        self._thread = threading.Thread(target=self._run, name="FrameStream", daemon=True)
+        self._thread.start()
+        logger.debug("FrameStream started.")
+
+    def stop(self):
+        """停止截图线程，截图线程因连续失败已自行停止时同样等待其退出"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        if thread is not threading.current_thread():
+            thread.join()
+        logger.debug("FrameStream stopped.")
+
+    def latest(self, after: float = None, max_age: float = None, timeout: float = None) -> Frame:
+        """获取最新的帧
+
+        Args:
+            after (float, optional): 只接受在该时间(time.monotonic)之后开始采集的帧. Defaults to None.
+            max_age (float, optional): 只接受年龄不超过该值的帧,单位为秒. Defaults to None.
+            timeout (float, optional): 等待超时时间,单位为秒. Defaults to None,即一直等待.
+
+        Raises:
+            TimeoutError: 超时前没有满足条件的帧
+            RuntimeError: 截图流未运行，或因连续截图失败而停止(异常的__cause__为最后一次失败的异常)
+
+        Returns:
+            Frame: 最新的帧
+        """
+        now = time.monotonic()
+        deadline = None if timeout is None else now + timeout
+        if max_age is not None:
+            after = max(after or 0.0, now - max_age)
+        with self._cond:
+            while True:
+                frame = self._buffer[-1] if self._buffer else None
+                if frame is not None:
+                    # 过期的帧同样视为已读取,解除截图线程的背压
+                    self._consumed_seq = max(self._consumed_seq, frame.seq)
+                    self._cond.notify_all()
+                    if after is None or frame.timestamp >= after:
+                        return frame
+                if not self._running:
+                    if self.error is not None:
+                        raise RuntimeError(f"FrameStream stopped after {self.failures} consecutive capture failures."
+                                           ) from self.error
+                    raise RuntimeError("FrameStream is not running.")
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("No frame captured in time.")
+                self._cond.wait(remaining)
+
+    def _run(self):
+        """截图线程运行的内部方法"""
+        while True:
+            with self._cond:
+                while self._running and self._backpressure and self._seq > self._consumed_seq:
+                    self._cond.wait()
+                if not self._running:
+                    return
+            start_time = time.monotonic()
+            try:
+                image = self._decode(self._capture())
+            except Exception as e:
+                image = None
+                error = e
+            with self._cond:
+                if image is not None:
+                    self.failures = 0
+                    self._seq += 1
+                    self._buffer.append(Frame(image, start_time, self._seq))
+                    self._cond.notify_all()
+                    next_time = start_time + self._interval
+                else:
+                    self.failures += 1
+                    if self._max_failures and self.failures >= self._max_failures:
+                        logger.error(f"FrameStream stopped after {self.failures} consecutive failures: {error}")
+                        self.error = error
+                        self._running = False
+                        self._cond.notify_all()  # 唤醒等待帧的latest,抛出异常
+                        return
+                    # 连续失败时按指数退避重试,只在第一次失败时记录错误日志
+                    backoff = min(self._max_backoff, max(self._interval, 0.05) * 2 ** (self.failures - 1))
+                    if self.failures == 1:
+                        logger.error(f"FrameStream capture failed: {error}, retrying with backoff")
+                    else:
+                        logger.debug(f"FrameStream capture failed {self.failures} times: {error}")
+                    next_time = start_time + backoff
+                while self._running and time.monotonic() < next_time:
+                    self._cond.wait(next_time - time.monotonic())
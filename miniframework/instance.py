@@ -1,30 +1,44 @@
 import functools
-import random
+import threading
 import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import contextmanager
 
 import numpy as np
 from loguru import logger
 from minicv import Images
 from minidevice import MiniDevice
 
-from miniframework.algo import RandomPointGenerate, CurveGenerate
+from miniframework.algo import RandomPointGenerate, CurveGenerate, PointSampler
+from miniframework.change_detector import ChangeDetector
+from miniframework.debug_recorder import DebugRecorder
+from miniframework.frame import Frame, FrameStream, scale_result
+from miniframework.matcher import MatchReport, match_templates
+from miniframework.metrics import Metrics, metrics as default_metrics
+from miniframework.pipeline import Pipeline
+from miniframework.screen_classifier import Screen, ScreenClassifier
 from miniframework.template import Template
 
 
-def _performance_test(func):
-    """装饰器：测量函数执行时间"""
+def _instrument(func):
+    """装饰器：记录方法耗时，启用metrics时写入耗时直方图，debug模式下打印耗时"""
+    name = func.__name__
 
     @functools.wraps(func)
     def wrapper(self, *args, **kwargs):
-        if self.debug:
-            start_time = time.time()
+        if self.metrics.enabled:
+            with self.metrics.span(name) as span:
+                result = func(self, *args, **kwargs)
+            elapsed_ns = span.elapsed_ns
+        elif self.debug:
+            start_ns = time.perf_counter_ns()
             result = func(self, *args, **kwargs)
-            end_time = time.time()
-            elapsed_time = end_time - start_time
-            logger.debug(f"Function {func.__name__} executed in {elapsed_time:.6f} seconds")
-            return result
+            elapsed_ns = time.perf_counter_ns() - start_ns
         else:
             return func(self, *args, **kwargs)
+        if self.debug:
+            logger.debug(f"Function {name} executed in {elapsed_ns / 1e9:.6f} seconds")
+        return result
 
     return wrapper
 
@@ -32,25 +46,195 @@ def _performance_test(func):
 class Instance:
     debug = False
 
-    def __init__(self, serial=None, screenshot_method=None, touch_method=None, screenshot_timeout=30, debug=False):
-        self.__device = MiniDevice(serial, screenshot_method, touch_method, screenshot_timeout)
-        self.__current_screenshot = self.screenshot()
+    def __init__(self, serial=None, screenshot_method=None, touch_method=None, screenshot_timeout=30, debug=False,
+                 frame_max_age: int = 0, match_workers: int = 0, change_detection: bool = False,
+                 debug_recorder: DebugRecorder = None, metrics: Metrics = None, seed: int = None,
+                 device: MiniDevice = None, reference_resolution: tuple[int, int] = None,
+                 resolution_mode: str = "template"):
+        """
+        :param frame_max_age: 帧缓存有效期,单位为ms,在有效期内的find复用同一帧截图,0表示每次find都重新截图
+        :param match_workers: 模板匹配线程池的线程数,find_any/find_all在其中并行匹配,0表示在调用线程中匹配
+        :param change_detection: 是否启用帧变化检测,模板区域未变化时直接返回上一次的匹配结果
+        :param debug_recorder: debug模式下记录find结果的记录器,默认保存最近100条完整截图
+        :param metrics: 性能指标收集器,默认使用进程级共享的miniframework.metrics.metrics
+        :param seed: 随机点击点、点击时长与滑动曲线的随机数种子,用于复现测试,默认不可复现
+        :param device: 已创建的设备对象,需提供screenshot_raw/save_screenshot/click/swipe,
+            传入时忽略serial等设备连接参数,如benchmark中的FakeDevice
+        :param reference_resolution: 模板制作时的屏幕分辨率(宽, 高),设置后模板可在其他分辨率的设备上使用,默认None即不缩放
+        :param resolution_mode: "template"将模板(图像、区域、多点颜色偏移)按设备分辨率缩放,每个模板只缩放一次;
+            "frame"将截图缩放到模板制作分辨率后匹配,匹配结果均转换回设备坐标
+        """
+        if resolution_mode not in ("template", "frame"):
+            raise ValueError(f"Unsupported resolution mode: {resolution_mode}")
+        self.metrics = metrics if metrics is not None else default_metrics
+        self.__device = device if device is not None else MiniDevice(serial, screenshot_method, touch_method,
+                                                                     screenshot_timeout)
+        self._screenshot_timeout = screenshot_timeout
+        self._frame_lock = threading.RLock()
+        self._frame: Frame | None = None
+        self._frame_max_age = frame_max_age / 1000
+        self._snapshot_scopes = threading.local()
+        self._stream: FrameStream | None = None
+        self._stream_max_age: float | None = None
+        self._last_touch = 0.0
+        self._match_executor = ThreadPoolExecutor(match_workers) if match_workers > 0 else None
+        self._owned_executor = self._match_executor  # 实例创建的线程池,close时关闭
+        self._change_detector = ChangeDetector() if change_detection else None
         self.debug = debug
-        self.debug_result_list = []
-
-    @_performance_test
+        self.debug_recorder = debug_recorder if debug_recorder is not None else DebugRecorder()
+        self.sampler = PointSampler(seed)
+        self.reference_resolution = reference_resolution
+        self.resolution_mode = resolution_mode
+
+    @property
+    def match_executor(self) -> Executor | None:
+        """模板匹配使用的线程池，多个Instance可以共享同一个线程池以限制CPU并发"""
+        return self._match_executor
+
+    @match_executor.setter
+    def match_executor(self, executor: Executor | None):
+        self._match_executor = executor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """释放实例的资源：停止后台截图，等待调试记录写入磁盘并停止写入线程，关闭实例创建的模板匹配线程池"""
+        self.stop_stream()
+        self.debug_recorder.close()
+        executor, self._owned_executor = self._owned_executor, None
+        if executor is not None:
+            if self._match_executor is executor:
+                self._match_executor = None
+            executor.shutdown(wait=True)
+
+    @property
+    def debug_result_list(self) -> list[dict]:
+        """debug模式下记录的find结果"""
+        return self.debug_recorder.records
+
+    @_instrument
     def screenshot(self):
-        """获取设备的屏幕截图，返回OpenCV格式的图片"""
-        raw = self.__device.screenshot_raw()
-        data = Images.bytes2opencv(raw)
+        """获取设备的屏幕截图，返回OpenCV格式的图片
+
+        帧的时间戳为开始采集的时间；与FrameStream.latest(after=...)相同，采集期间发生了触控的截图不能反映触控后的屏幕，不会缓存为当前帧
+        """
+        start_time = time.monotonic()
+        data = self.decode(self.capture_raw())
+        with self._frame_lock:
+            if start_time >= self._last_touch:
+                self._frame = Frame(data, start_time)
         return data
 
-    @_performance_test
+    def capture_raw(self) -> bytes:
+        """获取未解码的原始截图数据，与decode配合可将截图与解码放在不同的线程中执行"""
+        with self.metrics.span("capture"):
+            return self.__device.screenshot_raw()
+
+    def decode(self, raw: bytes):
+        """将原始截图数据解码为OpenCV格式的图片"""
+        with self.metrics.span("decode"):
+            return Images.bytes2opencv(raw)
+
+    @property
+    def last_touch(self) -> float:
+        """最后一次点击或滑动的时间(time.monotonic)，在此之前开始采集的帧不能反映触控后的屏幕"""
+        return self._last_touch
+
+    def frame(self, max_age: int = None) -> Frame:
+        """获取当前屏幕帧，帧在有效期内时直接复用，否则重新截图
+
+        Args:
+            max_age (int, optional): 帧的最大年龄,单位为ms. Defaults to None,
+                即使用snapshot作用域或frame_max_age的设置
+
+        Returns:
+            Frame: 屏幕帧
+        """
+        max_age = self._current_max_age() if max_age is None else max_age / 1000
+        with self._frame_lock:
+            frame = self._frame
+            if frame is None or not frame.is_fresh(max_age):
+                if self._stream is not None:
+                    frame = self._stream.latest(self._last_touch, self._stream_max_age, self._screenshot_timeout)
+                    self._frame = frame
+                else:
+                    while True:
+                        self.screenshot()
+                        frame = self._frame
+                        # 截图期间其他线程进行了触控时截图不会被缓存,重新截图
+                        if frame is not None and frame.timestamp >= self._last_touch:
+                            break
+            return frame
+
+    def start_stream(self, fps: float = 30, buffer_size: int = 3, backpressure: bool = True, max_age: int = 200,
+                     max_failures: int = 10):
+        """启动后台连续截图，之后的find直接使用最新的帧，无需等待截图
+
+        Args:
+            fps (float, optional): 最大截图帧率. Defaults to 30.
+            buffer_size (int, optional): 环形缓冲区大小. Defaults to 3.
+            backpressure (bool, optional): 最新帧未被读取时暂停截图. Defaults to True.
+            max_age (int, optional): 可使用的帧的最大年龄,单位为ms. Defaults to 200.
+            max_failures (int, optional): 连续截图失败的次数上限,达到后停止截图流,之后的find抛出RuntimeError. Defaults to 10.
+        """
+        if self._stream is not None:
+            return
+        self._stream_max_age = None if max_age is None else max_age / 1000
+        self._stream = FrameStream(self.capture_raw, fps, buffer_size, backpressure, self.decode, max_failures)
+        self._stream.start()
+
+    def stop_stream(self):
+        """停止后台连续截图"""
+        stream, self._stream = self._stream, None
+        if stream is not None:
+            stream.stop()
+
+    @contextmanager
+    def snapshot(self, max_age: int = None):
+        """帧快照作用域，作用域内的find/find_and_click复用同一帧截图，触控操作后自动重新截图
+
+        Args:
+            max_age (int, optional): 帧的最大年龄,单位为ms. Defaults to None,即作用域内永不过期
+
+        Yields:
+            Frame: 进入作用域时采集的屏幕帧
+        """
+        scopes = self._scopes()
+        scopes.append(None if max_age is None else max_age / 1000)
+        try:
+            yield self.frame(0)
+        finally:
+            scopes.pop()
+
+    def invalidate_frame(self):
+        """使缓存的屏幕帧失效"""
+        with self._frame_lock:
+            self._frame = None
+
+    def _touched(self):
+        # 触控之后开始采集的帧才能反映触控后的屏幕
+        self._last_touch = time.monotonic()
+        self.invalidate_frame()
+
+    def _scopes(self) -> list:
+        if not hasattr(self._snapshot_scopes, "stack"):
+            self._snapshot_scopes.stack = []
+        return self._snapshot_scopes.stack
+
+    def _current_max_age(self) -> float | None:
+        scopes = self._scopes()
+        return scopes[-1] if scopes else self._frame_max_age
+
+    @_instrument
     def save_screenshot(self, path: str = './screenshot.png'):
         """将屏幕截图保存到指定路径"""
         self.__device.save_screenshot(path)
 
-    @_performance_test
+    @_instrument
     def find(self, template: Template):
         """在设备屏幕上查找模板
 
@@ -60,19 +244,149 @@ class Instance:
         Returns:
             result: 是否找到匹配的模板
         """
-        screenshot = self.screenshot()
-        result = template.match(screenshot)
+        return self.find_in_frame(self.frame(), template)
+
+    def find_in_frame(self, frame: Frame, template: Template):
+        """在指定的屏幕帧上查找模板，不进行截图
+
+        Args:
+            frame (Frame): 屏幕帧
+            template (Template): 模板对象
+
+        Returns:
+            result: 是否找到匹配的模板
+        """
+        if self._match_executor is not None:
+            result = self._match_executor.submit(self._match, template, frame).result()
+        else:
+            result = self._match(template, frame)
         logger.debug("Find Template:{} Result: {}".format(template, result))
         if self.debug and result:
-            self.debug_result_list.append(
-                {
-                    "template": template,
-                    "result": result,
-                    "screenshot": screenshot
-                })
+            self.debug_recorder.record(template, result, frame.image)
         return result
 
-    @_performance_test
+    @_instrument
+    def find_all(self, templates: list[Template]) -> MatchReport:
+        """在同一帧截图上匹配所有模板
+
+        Args:
+            templates (list[Template]): 模板列表，顺序即优先级
+
+        Returns:
+            MatchReport: 批量匹配结果，包含每个模板的结果与耗时
+        """
+        return self.find_all_in_frame(self.frame(), templates)
+
+    @_instrument
+    def find_any(self, templates: list[Template]) -> MatchReport:
+        """在同一帧截图上按优先级顺序匹配模板，第一个模板匹配成功后立即返回
+
+        Args:
+            templates (list[Template]): 模板列表，顺序即优先级
+
+        Returns:
+            MatchReport: 批量匹配结果，hit为第一个匹配成功的模板
+        """
+        return self.find_all_in_frame(self.frame(), templates, first=True)
+
+    def find_all_in_frame(self, frame: Frame, templates: list[Template], first: bool = False) -> MatchReport:
+        """在指定的屏幕帧上批量匹配模板，不进行截图
+
+        Args:
+            frame (Frame): 屏幕帧
+            templates (list[Template]): 模板列表，顺序即优先级
+            first (bool, optional): 是否在第一个模板匹配成功后立即返回. Defaults to False.
+
+        Returns:
+            MatchReport: 批量匹配结果
+        """
+        resolved = [self.resolve(template, frame) for template in templates]
+        regions = [getattr(template, "region", None) for template, _, _ in resolved]
+        # "frame"模式下区域为模板制作分辨率的坐标，应聚焦实际匹配使用的缩放后的帧
+        focus_frame = resolved[0][1] if resolved else frame
+        report = match_templates(frame, templates, self._match_executor, first, self._match, regions, focus_frame)
+        logger.debug("Find Templates Result: {}".format(report))
+        if self.debug:
+            for template, result in report.hits.items():
+                self.debug_recorder.record(template, result, frame.image)
+        return report
+
+    def _match(self, template: Template, frame: Frame):
+        with self.metrics.span("match", str(template)):
+            template, frame, scale = self.resolve(template, frame)
+            if self._change_detector is not None:
+                result = self._change_detector.match(template, frame)
+            else:
+                result = template.match_frame(frame)
+            return result if scale is None else scale_result(result, *scale)
+
+    def resolve(self, template: Template, frame: Frame) -> tuple[Template, Frame, tuple[float, float] | None]:
+        """按reference_resolution与resolution_mode获取实际匹配使用的模板与帧
+
+        Args:
+            template (Template): 模板对象
+            frame (Frame): 设备分辨率的屏幕帧
+
+        Returns:
+            tuple: (模板, 帧, 匹配结果转换回设备坐标的缩放比例(sx, sy),无需转换时为None)
+        """
+        if self.reference_resolution is None:
+            return template, frame, None
+        sx, sy = self._resolution_scale(frame)
+        if self.resolution_mode == "template":
+            return template.scaled(sx, sy), frame, None
+        return template, frame.resized(self.reference_resolution), (sx, sy)
+
+    def classify(self, classifier: ScreenClassifier, max_age: int = None) -> Screen | None:
+        """识别当前屏幕所处的界面，探针与确认模板按reference_resolution缩放
+
+        Args:
+            classifier (ScreenClassifier): 界面识别器
+            max_age (int, optional): 帧的最大年龄,单位为ms. Defaults to None,即使用frame的设置.
+
+        Returns:
+            Screen: 识别的界面，未识别时返回None
+        """
+        return classifier.classify(self.frame(max_age), self._match)
+
+    def _resolution_scale(self, frame: Frame) -> tuple[float, float]:
+        """设备分辨率相对模板制作分辨率的缩放比例"""
+        width, height = self.reference_resolution
+        return frame.width / width, frame.height / height
+
+    def prepare_templates(self, templates: list[Template]):
+        """按当前设备分辨率预先缩放模板，避免第一次匹配时缩放，仅在resolution_mode为"template"时有效
+
+        Args:
+            templates (list[Template]): 模板列表
+        """
+        if self.reference_resolution is None or self.resolution_mode != "template":
+            return
+        sx, sy = self._resolution_scale(self.frame())
+        for template in templates:
+            template.scaled(sx, sy)
+
+    def wait_for_change(self, region: list = None, timeout: float = 10, interval: int = 100) -> bool:
+        """等待屏幕区域发生变化
+
+        Args:
+            region (list, optional): 监视的区域[xMin, yMin, xMax, yMax]. Defaults to None,即全屏.
+            timeout (float, optional): 超时时间,单位为秒. Defaults to 10.
+            interval (int, optional): 截图间隔,单位为ms. Defaults to 100.
+
+        Returns:
+            bool: 超时前区域是否发生变化
+        """
+        detector = self._change_detector or ChangeDetector()
+        baseline = detector.signature(self.frame(), region)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(min(interval / 1000, max(0.0, deadline - time.monotonic())))
+            if detector.changed(baseline, detector.signature(self.frame(0), region)):
+                return True
+        return False
+
+    @_instrument
     def find_and_operate(self, template: Template, operate, operate_params: dict = None):
         """查找模板并在找到时执行操作
 
@@ -91,7 +405,7 @@ class Instance:
             operate(**operate_params)
         return result
 
-    @_performance_test
+    @_instrument
     def range_random_click(self, result: tuple | list, duration=None,
                            random_point_generate_algo=RandomPointGenerate.normal_distribution):
         """在指定范围内生成随机点击点并点击
@@ -108,15 +422,17 @@ class Instance:
         if len(result) == 2:
             x, y = result
         elif len(result) == 4:
-            x, y = random_point_generate_algo(result)
+            if random_point_generate_algo is RandomPointGenerate.normal_distribution:
+                x, y = self.sampler.point(result)
+            else:
+                x, y = random_point_generate_algo(result)
         else:
             raise ValueError(f"{result} is No Correct Value")
         if duration is None:
-            randomI = round(np.random.normal(0, 30))
-            duration = random.randint(200, 350) if randomI > 80 else random.randint(80, 120)
+            duration = self.sampler.duration()
         self.click(x, y, duration)
 
-    @_performance_test
+    @_instrument
     def curve_swipe(self, start_x, start_y, end_x, end_y, duration, curve_generate_algo=CurveGenerate.bezier_curve):
         """执行曲线滑动操作
 
@@ -125,16 +441,20 @@ class Instance:
             start_y (int): 起始点Y坐标
             end_x (int): 结束点X坐标
             end_y (int): 结束点Y坐标
-            duration (int): 滑动持续时间
+            duration (int): 滑动持续时间，单位为ms，曲线按CurveGenerate.touch_rate生成相应的点数
             curve_generate_algo: 曲线生成算法，默认为CurveGenerate.bezier_curve
 
         Returns:
             None
         """
-        points = curve_generate_algo(start_x, start_y, end_x, end_y, duration)
+        if curve_generate_algo is CurveGenerate.bezier_curve:
+            points = CurveGenerate.bezier_curves([(start_x, start_y)], [(end_x, end_y)], duration,
+                                                 rng=self.sampler)[0]
+        else:
+            points = curve_generate_algo(start_x, start_y, end_x, end_y, duration)
         self.swipe(points, duration)
 
-    @_performance_test
+    @_instrument
     def find_and_click(self, template: Template, result: tuple | list = None, duration=None,
                        random_point_generate_algo=None):
         """查找模板并在找到时执行点击操作
@@ -157,13 +477,33 @@ class Instance:
             clickParams["duration"] = duration
         return self.find_and_operate(template, self.range_random_click, clickParams)
 
-    @_performance_test
+    def pipeline(self, templates: list[Template], action=None, queue_size: int = 1, settle: int = 0,
+                 first: bool = True) -> Pipeline:
+        """创建流水线式的查找并操作，截图、解码、匹配与操作在各自的线程中重叠执行
+
+        Args:
+            templates (list[Template]): 模板列表，顺序即优先级
+            action (optional): 操作函数action(template, result),返回False时停止. Defaults to None,即在匹配区域内随机点击.
+            queue_size (int, optional): 阶段之间队列的大小. Defaults to 1.
+            settle (int, optional): 触控后等待屏幕响应的时间,单位为ms. Defaults to 0.
+            first (bool, optional): 是否按优先级顺序只匹配到第一个成功的模板. Defaults to True.
+
+        Returns:
+            Pipeline: 未启动的流水线,通过run/start/stop或with语句运行
+        """
+        return Pipeline(self, templates, action, queue_size, settle, first)
+
+    @_instrument
     def click(self, x: int, y: int, duration: int = 100):
         self.__device.click(x, y, duration)
+        self._touched()
 
-    @_performance_test
-    def swipe(self, points: list[tuple[int]], duration: int = 300):
+    @_instrument
+    def swipe(self, points: list[tuple[int]] | np.ndarray, duration: int = 300):
+        if isinstance(points, np.ndarray):
+            points = points.tolist()
         self.__device.swipe(points, duration)
+        self._touched()
 
 
 if __name__ == '__main__':
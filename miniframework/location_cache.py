@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+from threading import Lock
+from typing import Callable
+
+VERSION = 2
+_KEY_PARAMS = ("region", "threshold", "level", "color_threshold")  # 影响匹配结果的模板参数
+
+
+class LocationCache:
+    """模板匹配位置缓存，按模板与屏幕分辨率记录最近的匹配位置
+
+    匹配时先在最近的匹配位置附近的小窗口内搜索，未找到时再搜索完整的匹配区域。缓存可以保存到JSON文件，
+    重启后从第一次匹配开始即可使用之前记录的位置
+    """
+
+    def __init__(self, path: str = None, max_locations: int = 4, margin: int = 8) -> None:
+        """初始化匹配位置缓存，path对应的文件存在时加载其中的位置
+
+        Args:
+            path (str, optional): 缓存文件的路径. Defaults to None,即不保存到磁盘.
+            max_locations (int, optional): 每个模板在每种分辨率下保存的最近匹配位置数. Defaults to 4.
+            margin (int, optional): 搜索窗口在匹配位置四周扩展的像素数. Defaults to 8.
+        """
+        self.path = path
+        self.max_locations = max_locations
+        self.margin = margin
+        self.hits = 0  # 在窗口内找到的次数
+        self.misses = 0  # 窗口内未找到,回退到完整搜索的次数
+        self._locations: dict[str, list[tuple]] = {}  # 键 -> 最近的匹配位置,从新到旧
+        self._dirty = False
+        self._lock = Lock()
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def __str__(self) -> str:
+        return f"LocationCache({len(self._locations)} keys, hits={self.hits}, misses={self.misses})"
+
+    def match(self, template, frame, search: Callable[[object, list | None], object]):
+        """先在最近的匹配位置附近搜索，未找到时在模板的完整区域内搜索，并记录匹配位置
+
+        Args:
+            template (Template): 模板
+            frame (Frame): 屏幕帧
+            search (Callable[[Frame, list | None], object]): 在指定区域内搜索的函数search(frame, region)
+
+        Returns:
+            匹配结果
+        """
+        key = self._key(template, frame)
+        with self._lock:
+            locations = list(self._locations.get(key, ()))
+        for location in locations:
+            window = self._window(location, frame.clip(template.region))
+            if window is None:
+                continue
+            result = search(frame, window)
+            if result:
+                with self._lock:
+                    self.hits += 1
+                self.record(key, result)
+                return result
+        if locations:
+            with self._lock:
+                self.misses += 1
+        result = search(frame, template.region)
+        if result:
+            self.record(key, result)
+        return result
+
+    def record(self, key: str, result):
+        """记录匹配位置，已有的位置移动到最前
+
+        Args:
+            key (str): 缓存的键
+            result (list | tuple): 匹配区域[xMin, yMin, xMax, yMax]或匹配点(x, y)
+        """
+        location = tuple(int(v) for v in result)
+        with self._lock:
+            locations = self._locations.setdefault(key, [])
+            if locations and locations[0] == location:
+                return
+            if location in locations:
+                locations.remove(location)
+            locations.insert(0, location)
+            del locations[self.max_locations:]
+            self._dirty = True
+
+    def locations(self, template, frame) -> list[tuple]:
+        """模板在帧的分辨率下最近的匹配位置，从新到旧排列"""
+        with self._lock:
+            return list(self._locations.get(self._key(template, frame), ()))
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._locations.clear()
+            self._dirty = True
+
+    def save(self, path: str = None):
+        """将缓存写入JSON文件，先写入临时文件再替换，避免中断时损坏缓存文件
+
+        Args:
+            path (str, optional): 缓存文件的路径. Defaults to None,即初始化时的path.
+        """
+        path = path or self.path
+        if path is None:
+            raise ValueError("LocationCache has no path to save to.")
+        with self._lock:
+            data = {"version": VERSION, "locations": {key: [list(location) for location in locations]
+                                                      for key, locations in self._locations.items()}}
+            self._dirty = False
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str = None):
+        """从JSON文件加载缓存，版本不一致时忽略文件内容
+
+        Args:
+            path (str, optional): 缓存文件的路径. Defaults to None,即初始化时的path.
+        """
+        with open(path or self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != VERSION:
+            return
+        with self._lock:
+            for key, locations in data.get("locations", {}).items():
+                self._locations[key] = [tuple(location) for location in locations][:self.max_locations]
+
+    def save_if_dirty(self):
+        """缓存有变化且设置了path时写入文件"""
+        if self._dirty and self.path is not None:
+            self.save()
+
+    def _window(self, location: tuple, region: list) -> list | None:
+        """匹配位置四周扩展margin后与匹配区域的交集"""
+        if len(location) == 2:
+            location = (location[0], location[1], location[0] + 1, location[1] + 1)
+        x_min, y_min, x_max, y_max = location
+        window = [max(region[0], x_min - self.margin), max(region[1], y_min - self.margin),
+                  min(region[2], x_max + self.margin), min(region[3], y_max + self.margin)]
+        return window if window[0] < window[2] and window[1] < window[3] else None
+
+    @classmethod
+    def _key(cls, template, frame) -> str:
+        """缓存的键，由模板类型、模板标识、影响匹配结果的参数与帧的分辨率组成，重启后保持不变"""
+        params = {name: getattr(template, name) for name in _KEY_PARAMS if hasattr(template, name)}
+        params = json.dumps(params, sort_keys=True, default=str, separators=(",", ":"))
+        return f"{type(template).__name__}:{cls._identity(template)}|{params}@{frame.width}x{frame.height}"
+
+    @staticmethod
+    def _identity(template) -> str:
+        if hasattr(template, "colors") and hasattr(template, "first_color"):
+            return f"{template.first_color}{template.colors}"
+        image = getattr(template, "_template", None)
+        if image is None:
+            return getattr(template, "template_path", None) or str(template)
+        # 手动设置的模板图像按内容区分,摘要按图像对象缓存在模板上
+        cached = template.__dict__.get("_location_digest")
+        if cached is None or cached[0] is not image:
+            digest = hashlib.sha1(image.tobytes()).hexdigest()[:16]
+            cached = template.__dict__["_location_digest"] = (image, f"sha1:{digest}")
+        return cached[1]
@@ -0,0 +1,87 @@
+import time
+from concurrent.futures import Executor
+from typing import Callable
+
+from miniframework.frame import Frame
+from miniframework.template import Template
+
+
+class MatchReport(dict):
+    """批量匹配结果，键为模板，值为匹配结果，并记录每个模板的匹配耗时"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.timings: dict[Template, float] = {}  # 模板匹配耗时,单位为秒
+        self.hit: Template | None = None  # 按优先级顺序第一个匹配成功的模板
+
+    @property
+    def result(self):
+        """第一个匹配成功的模板的结果"""
+        return self[self.hit] if self.hit is not None else None
+
+    @property
+    def hits(self) -> dict:
+        """所有匹配成功的模板及其结果"""
+        return {template: result for template, result in self.items() if result}
+
+    def __bool__(self) -> bool:
+        return self.hit is not None
+
+    def __str__(self) -> str:
+        items = [f"{template}: {result} ({self.timings[template] * 1000:.2f}ms)" for template, result in self.items()]
+        return f"MatchReport(hit={self.hit}, [{', '.join(items)}])"
+
+
+def _match_frame(template: Template, frame: Frame):
+    return template.match_frame(frame)
+
+
+def _timed_match(template: Template, frame: Frame, match):
+    start_time = time.perf_counter()
+    result = match(template, frame)
+    return result, time.perf_counter() - start_time
+
+
+def match_templates(frame: Frame, templates: list[Template], executor: Executor = None,
+                    first: bool = False, match: Callable[[Template, Frame], object] = None,
+                    regions: list = None, focus_frame: Frame = None) -> MatchReport:
+    """在同一帧上批量匹配模板，灰度转换只处理所有模板匹配区域的并集
+
+    Args:
+        frame (Frame): 屏幕帧，也可以是OpenCV格式的图像
+        templates (list[Template]): 模板列表，顺序即优先级
+        executor (Executor, optional): 并行匹配使用的线程池. Defaults to None,即串行匹配.
+        first (bool, optional): 是否在按优先级顺序第一个模板匹配成功后立即返回. Defaults to False.
+        match (Callable, optional): 单个模板的匹配函数match(template, frame). Defaults to None,即template.match_frame.
+        regions (list, optional): 灰度转换的区域列表,match会缩放模板时应传入实际的匹配区域. Defaults to None,即各模板的region.
+        focus_frame (Frame, optional): 实际进行匹配的帧,match会缩放帧时应传入缩放后的帧. Defaults to None,即frame.
+
+    Returns:
+        MatchReport: 批量匹配结果
+    """
+    if not isinstance(frame, Frame):
+        frame = Frame(frame)
+    if regions is None:
+        regions = [getattr(template, "region", None) for template in templates]
+    (focus_frame or frame).focus(regions)
+    match = match or _match_frame
+    report = MatchReport()
+    if executor is None:
+        for template in templates:
+            report[template], report.timings[template] = _timed_match(template, frame, match)
+            if report[template] and report.hit is None:
+                report.hit = template
+                if first:
+                    break
+        return report
+
+    futures = [(template, executor.submit(_timed_match, template, frame, match)) for template in templates]
+    for index, (template, future) in enumerate(futures):
+        report[template], report.timings[template] = future.result()
+        if report[template] and report.hit is None:
+            report.hit = template
+            if first:
+                for _, pending in futures[index + 1:]:
+                    pending.cancel()
+                break
+    return report
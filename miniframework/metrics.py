@@ -0,0 +1,210 @@
+import os
+import threading
+import time
+from collections import deque
+
+
+class Histogram:
+    """耗时直方图，保存最近的采样用于计算分位数，并累计总次数与总耗时"""
+
+    def __init__(self, reservoir_size: int = 2048) -> None:
+        self._samples: deque[int] = deque(maxlen=reservoir_size)  # 最近的耗时采样,单位为ns
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_ns = 0
+        self.self_ns = 0  # 扣除嵌套子操作后的耗时
+        self.max_ns = 0
+
+    def observe(self, elapsed_ns: int, self_ns: int = None):
+        """记录一次耗时
+
+        Args:
+            elapsed_ns (int): 耗时,单位为ns
+            self_ns (int, optional): 扣除嵌套子操作后的耗时,单位为ns. Defaults to None,即等于elapsed_ns.
+        """
+        with self._lock:
+            self._samples.append(elapsed_ns)
+            self.count += 1
+            self.total_ns += elapsed_ns
+            self.self_ns += elapsed_ns if self_ns is None else self_ns
+            self.max_ns = max(self.max_ns, elapsed_ns)
+
+    def percentiles(self, *quantiles: float) -> list[int]:
+        """计算最近采样的分位数
+
+        Args:
+            quantiles (float): 分位数,范围为0~1
+
+        Returns:
+            list[int]: 各分位数对应的耗时,单位为ns
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return [0 for _ in quantiles]
+        return [samples[min(len(samples) - 1, int(q * len(samples)))] for q in quantiles]
+
+    def snapshot(self) -> dict:
+        """导出统计数据，耗时单位为ms"""
+        p50, p95, p99 = self.percentiles(0.5, 0.95, 0.99)
+        return {
+            "count": self.count,
+            "total_ms": self.total_ns / 1e6,
+            "self_ms": self.self_ns / 1e6,
+            "p50_ms": p50 / 1e6,
+            "p95_ms": p95 / 1e6,
+            "p99_ms": p99 / 1e6,
+            "max_ms": self.max_ns / 1e6,
+        }
+
+
+class Span:
+    """一次计时的操作，支持嵌套，子操作的耗时会从父操作的自身耗时中扣除"""
+
+    __slots__ = ("_metrics", "name", "label", "start_ns", "elapsed_ns", "_child_ns")
+
+    def __init__(self, metrics: "Metrics", name: str, label: str = None) -> None:
+        self._metrics = metrics
+        self.name = name
+        self.label = label
+        self.start_ns = 0
+        self.elapsed_ns = 0
+        self._child_ns = 0
+
+    def __enter__(self) -> "Span":
+        self._metrics._stack().append(self)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.elapsed_ns = time.perf_counter_ns() - self.start_ns
+        stack = self._metrics._stack()
+        stack.pop()
+        if stack:
+            stack[-1]._child_ns += self.elapsed_ns
+        self._metrics.observe(self.name, self.elapsed_ns, self.elapsed_ns - self._child_ns, self.label)
+
+
+class _NullSpan:
+    """关闭时使用的空操作"""
+
+    __slots__ = ()
+    elapsed_ns = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Metrics:
+    """性能指标收集器，按操作名称统计耗时直方图，关闭时几乎没有开销"""
+
+    def __init__(self, enabled: bool = False, reservoir_size: int = 2048) -> None:
+        """初始化性能指标收集器
+
+        Args:
+            enabled (bool, optional): 是否启用. Defaults to False.
+            reservoir_size (int, optional): 每个操作保存的最近采样数,用于计算分位数. Defaults to 2048.
+        """
+        self.enabled = enabled
+        self.reservoir_size = reservoir_size
+        self._histograms: dict[tuple[str, str | None], Histogram] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def span(self, name: str, label: str = None) -> Span:
+        """创建一次计时的操作
+
+        Args:
+            name (str): 操作名称，如screenshot、decode、match、click、swipe
+            label (str, optional): 操作标签，如模板描述. Defaults to None.
+
+        Returns:
+            Span: 使用with语句计时，关闭时返回空操作
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, label)
+
+    def observe(self, name: str, elapsed_ns: int, self_ns: int = None, label: str = None):
+        """直接记录一次耗时
+
+        Args:
+            name (str): 操作名称
+            elapsed_ns (int): 耗时,单位为ns
+            self_ns (int, optional): 扣除嵌套子操作后的耗时,单位为ns. Defaults to None.
+            label (str, optional): 操作标签. Defaults to None.
+        """
+        key = (name, label)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(self.reservoir_size))
+        histogram.observe(elapsed_ns, self_ns)
+
+    def snapshot(self) -> dict:
+        """导出所有操作的统计数据
+
+        Returns:
+            dict: {操作名称: 统计数据}，带标签的操作名称为"name[label]"
+        """
+        with self._lock:
+            items = list(self._histograms.items())
+        return {(f"{name}[{label}]" if label is not None else name): histogram.snapshot()
+                for (name, label), histogram in items}
+
+    def reset(self):
+        """清空所有统计数据"""
+        with self._lock:
+            self._histograms.clear()
+
+    def to_prometheus(self, prefix: str = "miniframework") -> str:
+        """导出Prometheus文本格式的统计数据"""
+        with self._lock:
+            items = sorted(self._histograms.items(), key=lambda item: (item[0][0], item[0][1] or ""))
+        lines = [
+            f"# HELP {prefix}_operation_seconds Operation latency in seconds.",
+            f"# TYPE {prefix}_operation_seconds summary",
+        ]
+        for (name, label), histogram in items:
+            labels = f'operation="{_escape(name)}"' + (f',label="{_escape(label)}"' if label is not None else "")
+            for quantile, value in zip((0.5, 0.95, 0.99), histogram.percentiles(0.5, 0.95, 0.99)):
+                lines.append(f'{prefix}_operation_seconds{{{labels},quantile="{quantile}"}} {value / 1e9:.9f}')
+            lines.append(f"{prefix}_operation_seconds_sum{{{labels}}} {histogram.total_ns / 1e9:.9f}")
+            lines.append(f"{prefix}_operation_seconds_count{{{labels}}} {histogram.count}")
+        lines.append(f"# HELP {prefix}_operation_self_seconds_total Operation latency excluding nested operations.")
+        lines.append(f"# TYPE {prefix}_operation_self_seconds_total counter")
+        for (name, label), histogram in items:
+            labels = f'operation="{_escape(name)}"' + (f',label="{_escape(label)}"' if label is not None else "")
+            lines.append(f"{prefix}_operation_self_seconds_total{{{labels}}} {histogram.self_ns / 1e9:.9f}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str, prefix: str = "miniframework"):
+        """将Prometheus文本格式的统计数据写入文件，可供node_exporter的textfile collector读取
+
+        Args:
+            path (str): 文件路径
+            prefix (str, optional): 指标名称前缀. Defaults to "miniframework".
+        """
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as fp:
+            fp.write(self.to_prometheus(prefix))
+        os.replace(temp_path, path)
+
+    def _stack(self) -> list[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = Metrics()  # 进程级共享的性能指标收集器，默认关闭
@@ -0,0 +1,206 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from loguru import logger
+
+from miniframework.instance import Instance
+from miniframework.task import Task, TaskProxy
+from miniframework.task_queue import TaskQueue
+from miniframework.task_scheduler import TaskSchedulerStatus
+
+
+class Device:
+    """多设备调度器中的一台设备，包含设备实例与独立的任务队列"""
+
+    def __init__(self, name: str, instance: Instance, task_queue: TaskQueue) -> None:
+        self.name = name
+        self.instance = instance
+        self.task_queue = task_queue
+        self.running_task: Optional[Task | TaskProxy] = None  # 正在执行的任务,同一设备的任务串行执行,在调度器的锁内修改
+        self.removed = False
+
+    @property
+    def busy(self) -> bool:
+        return self.running_task is not None
+
+    def __str__(self) -> str:
+        return f"Device({self.name}, running={self.running_task}, task_queue={self.task_queue})"
+
+
+class MultiDeviceScheduler:
+    """多设备任务调度器，一个进程通过线程池驱动多个Instance
+
+    每台设备拥有独立的任务队列，同一设备的任务串行执行；设备IO(截图、触控)在IO线程池中执行，
+    模板匹配统一提交到按CPU核数设置大小的共享匹配线程池，避免每台设备一个线程争抢GIL。
+    设备之间按轮询顺序分派任务，保证公平。
+    """
+
+    def __init__(self, io_workers: int = None, match_workers: int = None) -> None:
+        """
+        :param io_workers: 执行任务(设备IO)的线程数,默认为32
+        :param match_workers: 共享模板匹配线程池的线程数,默认为CPU核数
+        """
+        self._io_workers = io_workers or 32
+        self.match_executor = ThreadPoolExecutor(match_workers or os.cpu_count() or 1,
+                                                 thread_name_prefix="MatchWorker")
+        self._devices: dict[str, Device] = {}
+        self._condition = threading.Condition()
+        self._dirty = False  # 调度器等待期间是否有新的任务或设备变化
+        self._cursor = 0  # 轮询分派的起始位置
+        self._status = TaskSchedulerStatus.PENDING
+        self._io_executor: Optional[ThreadPoolExecutor] = None
+        self._dispatch_thread: Optional[threading.Thread] = None
+
+    @property
+    def status(self) -> TaskSchedulerStatus:
+        return self._status
+
+    @property
+    def devices(self) -> dict[str, Device]:
+        with self._condition:
+            return dict(self._devices)
+
+    def __str__(self) -> str:
+        return f"MultiDeviceScheduler(status={self._status}, devices={list(self.devices)})"
+
+    def add_device(self, name: str, instance: Instance, task_queue: TaskQueue = None) -> TaskQueue:
+        """添加设备，可在调度器运行时调用
+
+        Args:
+            name (str): 设备名称
+            instance (Instance): 设备实例，其模板匹配将使用共享的匹配线程池
+            task_queue (TaskQueue, optional): 设备的任务队列. Defaults to None,即新建任务队列.
+
+        Returns:
+            TaskQueue: 设备的任务队列
+        """
+        task_queue = task_queue if task_queue is not None else TaskQueue()
+        instance.match_executor = self.match_executor
+        with self._condition:
+            if name in self._devices:
+                raise ValueError(f"Device {name} already exists.")
+            self._devices[name] = Device(name, instance, task_queue)
+        task_queue.add_listener(self._notify)
+        self._notify()
+        logger.debug(f"Device {name} added.")
+        return task_queue
+
+    def remove_device(self, name: str) -> Optional[Device]:
+        """移除设备，可在调度器运行时调用，正在执行的任务会执行完当前一次
+
+        Args:
+            name (str): 设备名称
+
+        Returns:
+            Device: 被移除的设备
+        """
+        with self._condition:
+            device = self._devices.pop(name, None)
+            if device is None:
+                return None
+            device.removed = True
+        device.task_queue.remove_listener(self._notify)
+        if device.instance.match_executor is self.match_executor:
+            device.instance.match_executor = None
+        self._notify()
+        logger.debug(f"Device {name} removed.")
+        return device
+
+    def start(self):
+        """启动调度器"""
+        if self._status == TaskSchedulerStatus.RUNNING:
+            raise RuntimeError("Scheduler is already running.")
+        self._status = TaskSchedulerStatus.RUNNING
+        self._io_executor = ThreadPoolExecutor(self._io_workers, thread_name_prefix="DeviceWorker")
+        self._dispatch_thread = threading.Thread(target=self._run, name="MultiDeviceScheduler")
+        self._dispatch_thread.start()
+        logger.debug("MultiDeviceScheduler started.")
+
+    def stop(self):
+        """停止调度器，等待正在执行的任务结束并重置所有任务"""
+        if self._status == TaskSchedulerStatus.PENDING:
+            return
+        self._status = TaskSchedulerStatus.PENDING
+        self._notify()
+        if self._dispatch_thread:
+            self._dispatch_thread.join()
+        if self._io_executor:
+            self._io_executor.shutdown(wait=True)
+        for device in self.devices.values():
+            device.task_queue.reset_all_tasks()
+        logger.debug("MultiDeviceScheduler stopped.")
+
+    def shutdown(self):
+        """停止调度器并关闭共享的匹配线程池"""
+        self.stop()
+        for device in self.devices.values():
+            device.instance.match_executor = None
+        self.match_executor.shutdown(wait=True)
+
+    def _notify(self):
+        with self._condition:
+            self._dirty = True
+            self._condition.notify_all()
+
+    def _run(self):
+        """分派线程运行的内部方法，按轮询顺序为空闲的设备分派任务，没有可分派的任务时阻塞等待"""
+        while self._status == TaskSchedulerStatus.RUNNING:
+            with self._condition:
+                self._dirty = False
+                devices = list(self._devices.values())
+            if devices:
+                self._cursor = (self._cursor + 1) % len(devices)
+                devices = devices[self._cursor:] + devices[:self._cursor]
+            dispatched = False
+            timeout = None  # 距离下一个延迟任务到期的时间
+            for device in devices:
+                task = self._claim(device)
+                if task is None:
+                    if not device.busy and not device.removed:
+                        next_due = device.task_queue.next_due()
+                        if next_due is not None:
+                            timeout = next_due if timeout is None else min(timeout, next_due)
+                    continue
+                try:
+                    self._io_executor.submit(self._execute, device, task)
+                except RuntimeError as e:
+                    logger.error(f"Failed to dispatch task {task} on {device.name}: {e}")
+                    self._release(device)
+                    continue
+                dispatched = True
+            with self._condition:
+                if not dispatched and not self._dirty and self._status == TaskSchedulerStatus.RUNNING:
+                    self._condition.wait(timeout)
+
+    def _claim(self, device: Device) -> Optional[Task | TaskProxy]:
+        """在锁内检查设备是否空闲并标记其正在执行的任务，保证同一设备同时只分派一个任务
+
+        Returns:
+            Task: 分派给设备的任务，设备忙碌、已移除或没有可执行的任务时返回None
+        """
+        with self._condition:
+            if device.busy or device.removed:
+                return None
+            task = device.task_queue.next_task
+            if task is not None:
+                device.running_task = task
+            return task
+
+    def _release(self, device: Device):
+        """清除设备正在执行的任务并唤醒分派线程"""
+        with self._condition:
+            device.running_task = None
+            self._dirty = True
+            self._condition.notify_all()
+
+    def _execute(self, device: Device, task: Task | TaskProxy):
+        try:
+            logger.debug(f"Executing task on {device.name}: {task}")
+            task.execute()
+            device.task_queue.on_executed(task)
+        except Exception as e:
+            logger.error(f"Task {task} on {device.name} failed: {e}")
+        finally:
+            self._release(device)
@@ -0,0 +1,235 @@
+import queue
+import threading
+import time
+from typing import Callable
+
+from loguru import logger
+
+from miniframework.frame import Frame
+from miniframework.matcher import MatchReport
+from miniframework.template import Template
+
+_STOP = object()  # 各阶段之间传递的停止标记
+_MAX_BACKOFF = 2.0  # 截图连续失败时重试间隔的上限,单位为秒
+
+
+class Pipeline:
+    """流水线式的查找并操作：截图、解码、匹配、操作四个阶段在各自的线程中执行，阶段之间通过有界队列传递，
+    匹配第N帧的同时截取第N+1帧，并执行第N-1帧的点击
+
+    一致性规则: 匹配成功后到对应的操作执行完成之前，匹配阶段丢弃所有帧；操作执行完成后，
+    在最后一次触控(加settle)之前开始采集的帧均视为过期帧，不会被匹配或用于操作
+    """
+
+    def __init__(self, instance, templates: list[Template], action: Callable[[Template, object], object] = None,
+                 queue_size: int = 1, settle: int = 0, first: bool = True) -> None:
+        """初始化流水线
+
+        Args:
+            instance (Instance): 执行截图与操作的实例
+            templates (list[Template]): 模板列表，顺序即优先级
+            action (Callable[[Template, object], object], optional): 操作函数action(template, result)，
+                返回False时停止流水线. Defaults to None,即在匹配区域内随机点击.
+            queue_size (int, optional): 阶段之间队列的大小. Defaults to 1.
+            settle (int, optional): 触控后等待屏幕响应的时间,单位为ms,在此之前开始采集的帧同样视为过期帧. Defaults to 0.
+            first (bool, optional): 是否按优先级顺序只匹配到第一个成功的模板. Defaults to True.
+        """
+        self.instance = instance
+        self.templates = templates
+        self.action = action if action is not None else self._click
+        self.settle = settle / 1000
+        self.first = first
+        self.stats = {"captured": 0, "decoded": 0, "matched": 0, "stale": 0, "actions": 0, "errors": 0}
+        self._queue_size = queue_size
+        self._queues: list[queue.Queue] = []
+        self._threads: list[threading.Thread] = []
+        self._cond = threading.Condition()
+        self._running = False
+        self._action_pending = False  # 匹配成功但操作尚未完成
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def __str__(self) -> str:
+        return f"Pipeline(running={self._running}, {self.stats})"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        """启动流水线"""
+        with self._cond:
+            if self._running:
+                return
+        self._join()  # 操作函数返回False停止后,等待上一次运行的线程退出
+        with self._cond:
+            self._running = True
+            self._action_pending = False
+        self._queues = [queue.Queue(self._queue_size) for _ in range(3)]
+        stages = [("capture", self._capture_stage), ("decode", self._decode_stage),
+                  ("match", self._match_stage), ("act", self._act_stage)]
+        self._threads = [threading.Thread(target=target, name=f"Pipeline-{name}", daemon=True)
+                         for name, target in stages]
+        for thread in self._threads:
+            thread.start()
+        logger.debug("Pipeline started.")
+
+    def stop(self):
+        """停止流水线，等待各阶段的线程退出"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._join():
+            logger.debug("Pipeline stopped.")
+
+    def _join(self) -> bool:
+        """等待仍在运行的阶段线程退出，操作函数返回False时_running已为False，但线程可能仍在运行"""
+        threads, self._threads = self._threads, []
+        for thread in threads:
+            if thread.is_alive() and thread is not threading.current_thread():
+                thread.join()
+        return bool(threads)
+
+    def run(self, max_actions: int = None, timeout: float = None) -> int:
+        """启动流水线，执行指定次数的操作或超时后停止
+
+        Args:
+            max_actions (int, optional): 最大操作次数. Defaults to None,即不限制.
+            timeout (float, optional): 超时时间,单位为秒. Defaults to None,即一直运行到操作函数返回False.
+
+        Returns:
+            int: 执行的操作次数
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self.start()
+        try:
+            with self._cond:
+                while self._running and (max_actions is None or self.stats["actions"] < max_actions):
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+        finally:
+            self.stop()
+        return self.stats["actions"]
+
+    def _click(self, template: Template, result):
+        self.instance.range_random_click(result)
+
+    def _stale(self, timestamp: float) -> bool:
+        # 在最后一次触控之前开始采集的帧不能反映触控后的屏幕
+        return timestamp < self.instance.last_touch + self.settle
+
+    def _count(self, key: str):
+        with self._cond:
+            self.stats[key] += 1
+
+    def _put(self, index: int, item) -> bool:
+        """放入下一阶段的队列，队列已满时等待(背压)，流水线停止时返回False"""
+        while self._running:
+            try:
+                self._queues[index].put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, index: int):
+        while True:
+            try:
+                return self._queues[index].get(timeout=0.05)
+            except queue.Empty:
+                if not self._running:
+                    return _STOP
+
+    def _capture_stage(self):
+        backoff = 0.0
+        while self._running:
+            with self._cond:
+                # 等待操作完成,操作之前开始的截图必然是过期帧
+                while self._running and self._action_pending:
+                    self._cond.wait()
+            start_time = time.monotonic()
+            try:
+                raw = self.instance.capture_raw()
+            except Exception as e:
+                backoff = min(_MAX_BACKOFF, backoff * 2 or 0.05)
+                logger.error(f"Pipeline capture failed: {e}, retrying in {backoff:.2f}s")
+                self._count("errors")
+                with self._cond:
+                    self._cond.wait_for(lambda: not self._running, backoff)
+                continue
+            backoff = 0.0
+            self._count("captured")
+            if not self._put(0, (start_time, raw)):
+                break
+        self._put_stop(0)
+
+    def _decode_stage(self):
+        while (item := self._get(0)) is not _STOP:
+            start_time, raw = item
+            if self._stale(start_time):
+                self._count("stale")
+                continue
+            try:
+                frame = Frame(self.instance.decode(raw), start_time)
+            except Exception as e:
+                logger.error(f"Pipeline decode failed: {e}")
+                self._count("errors")
+                continue
+            self._count("decoded")
+            if not self._put(1, frame):
+                break
+        self._put_stop(1)
+
+    def _match_stage(self):
+        while (frame := self._get(1)) is not _STOP:
+            if self._action_pending or self._stale(frame.timestamp):
+                self._count("stale")
+                continue
+            try:
+                report: MatchReport = self.instance.find_all_in_frame(frame, self.templates, self.first)
+            except Exception as e:
+                logger.error(f"Pipeline match failed: {e}")
+                self._count("errors")
+                continue
+            self._count("matched")
+            if report:
+                with self._cond:
+                    self._action_pending = True
+                    self._cond.notify_all()
+                if not self._put(2, (frame, report)):
+                    break
+        self._put_stop(2)
+
+    def _act_stage(self):
+        while (item := self._get(2)) is not _STOP:
+            frame, report = item
+            try:
+                # 操作之前再次检查,期间可能有其他线程进行了触控
+                if self._stale(frame.timestamp):
+                    self._count("stale")
+                    continue
+                if self.action(report.hit, report.result) is False:
+                    with self._cond:
+                        self._running = False
+                self._count("actions")
+            except Exception as e:
+                logger.error(f"Pipeline action failed: {e}")
+                self._count("errors")
+            finally:
+                with self._cond:
+                    self._action_pending = False
+                    self._cond.notify_all()
+
+    def _put_stop(self, index: int):
+        # 流水线停止后下游阶段通过_get的超时退出,这里只尽量传递停止标记
+        try:
+            self._queues[index].put_nowait(_STOP)
+        except queue.Full:
+            pass
@@ -0,0 +1,172 @@
+from collections import defaultdict
+from threading import Lock
+from typing import Callable
+
+import numpy as np
+
+from miniframework.change_detector import ChangeDetector
+from miniframework.frame import Frame
+from miniframework.template import Template
+
+
+def _match_frame(template: Template, frame: Frame):
+    return template.match_frame(frame)
+
+
+class Screen:
+    """一个已知界面，由廉价的探针模板(如MultiColorsTemplate)、昂贵的确认模板(如ImageTemplate)与可选的参考截图组成"""
+
+    def __init__(self, name: str, confirm: Template | list[Template] = None, probes: list[Template] = None,
+                 reference=None) -> None:
+        """初始化界面
+
+        Args:
+            name (str): 界面名称
+            confirm (Template | list[Template], optional): 确认模板，全部匹配成功才认为处于该界面. Defaults to None.
+            probes (list[Template], optional): 探针模板，任一匹配失败即排除该界面. Defaults to None.
+            reference (np.array | Frame, optional): 该界面的参考截图，用于按缩略图签名筛选候选界面. Defaults to None.
+        """
+        if confirm is None and not probes:
+            raise ValueError(f"Screen {name} needs at least one probe or confirm template.")
+        self.name = name
+        self.confirm: list[Template] = [] if confirm is None else confirm if isinstance(confirm, list) else [confirm]
+        self.probes: list[Template] = list(probes or [])
+        self.reference = reference
+        self.hits = 0
+        self._probe_stats: dict[Template, list[int]] = {probe: [0, 0] for probe in self.probes}  # [执行次数, 排除次数]
+
+    def __str__(self) -> str:
+        return f"Screen({self.name}, hits={self.hits})"
+
+    def ordered_probes(self) -> list[Template]:
+        """按排除率从高到低排序的探针，最可能排除该界面的探针先执行"""
+        return sorted(self.probes, key=lambda probe: -self._rejection_rate(probe))
+
+    def _rejection_rate(self, probe: Template) -> float:
+        runs, rejections = self._probe_stats[probe]
+        return (rejections + 1) / (runs + 2)  # 拉普拉斯平滑,未执行过的探针排序居中
+
+    def _record_probe(self, probe: Template, rejected: bool):
+        stats = self._probe_stats[probe]
+        stats[0] += 1
+        stats[1] += rejected
+
+
+class ScreenClassifier:
+    """界面识别器，在同一帧上识别当前处于哪个已知界面
+
+    候选界面的顺序: 有参考截图的界面按缩略图签名的差异从小到大排列(差异超过max_distance的界面直接排除)，
+    其余界面按上一个界面之后出现的次数(状态转移)与累计识别次数排列；每个候选先执行探针，探针全部通过后才执行确认模板，
+    第一个确认成功的界面即为结果。各界面探针的顺序按排除率学习，越常排除界面的探针越先执行
+    """
+
+    def __init__(self, screens: list[Screen] = None, signature_size: int = 16, max_distance: float = 40) -> None:
+        """初始化界面识别器
+
+        Args:
+            screens (list[Screen], optional): 已知界面. Defaults to None.
+            signature_size (int, optional): 缩略图签名的边长. Defaults to 16.
+            max_distance (float, optional): 缩略图签名平均灰度差的上限，超过时排除该界面，None表示只用于排序. Defaults to 40.
+        """
+        self.max_distance = max_distance
+        self._detector = ChangeDetector(signature_size, cell=None)
+        self._screens: dict[str, Screen] = {}
+        self._references: np.ndarray | None = None  # 有参考截图的界面的签名,形状为(界面数, size*size)
+        self._reference_names: list[str] = []
+        self._transitions: dict[str | None, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.current: Screen | None = None  # 上一次识别的界面
+        self._lock = Lock()
+        for screen in screens or []:
+            self.add_screen(screen)
+
+    @property
+    def screens(self) -> dict[str, Screen]:
+        return dict(self._screens)
+
+    def __str__(self) -> str:
+        return f"ScreenClassifier({len(self._screens)} screens, current={self.current and self.current.name})"
+
+    def add_screen(self, screen: Screen):
+        """添加界面，同名界面会被替换"""
+        with self._lock:
+            self._screens[screen.name] = screen
+            self._rebuild_index()
+
+    def remove_screen(self, name: str):
+        """移除界面"""
+        with self._lock:
+            if self._screens.pop(name, None) is not None:
+                self._rebuild_index()
+
+    def classify(self, frame: Frame, match: Callable[[Template, Frame], object] = None) -> Screen | None:
+        """识别帧所处的界面，设备分辨率与模板制作分辨率不同时应通过Instance.classify调用
+
+        Args:
+            frame (Frame): 屏幕帧，也可以是OpenCV格式的图像
+            match (Callable, optional): 单个模板的匹配函数match(template, frame)，如Instance按分辨率缩放模板的匹配.
+                Defaults to None,即template.match_frame.
+
+        Returns:
+            Screen: 识别的界面，未识别时返回None
+        """
+        if not isinstance(frame, Frame):
+            frame = Frame(frame)
+        match = match or _match_frame
+        for screen in self.candidates(frame):
+            if self._check(screen, frame, match):
+                self._record(screen)
+                return screen
+        self._record(None)
+        return None
+
+    def candidates(self, frame: Frame) -> list[Screen]:
+        """按可能性从高到低排列的候选界面
+
+        Args:
+            frame (Frame): 屏幕帧
+
+        Returns:
+            list[Screen]: 候选界面
+        """
+        with self._lock:
+            screens = dict(self._screens)
+            references, reference_names = self._references, self._reference_names
+            previous = self.current.name if self.current is not None else None
+            transitions = dict(self._transitions.get(previous, {}))
+        ranked = []
+        if references is not None:
+            signature = self._signature(frame)
+            distances = np.abs(references - signature).mean(axis=1)
+            for index in np.argsort(distances, kind="stable"):
+                if self.max_distance is not None and distances[index] > self.max_distance:
+                    break
+                ranked.append(screens[reference_names[index]])
+        others = [screen for screen in screens.values() if screen.reference is None]
+        others.sort(key=lambda screen: (-transitions.get(screen.name, 0), -screen.hits))
+        return ranked + others
+
+    def _check(self, screen: Screen, frame: Frame, match: Callable[[Template, Frame], object]) -> bool:
+        for probe in screen.ordered_probes():
+            rejected = not match(probe, frame)
+            with self._lock:
+                screen._record_probe(probe, rejected)
+            if rejected:
+                return False
+        return all(match(template, frame) for template in screen.confirm)
+
+    def _record(self, screen: Screen | None):
+        with self._lock:
+            previous = self.current.name if self.current is not None else None
+            if screen is not None:
+                screen.hits += 1
+                self._transitions[previous][screen.name] += 1
+            self.current = screen
+
+    def _signature(self, image) -> np.ndarray:
+        frame = image if isinstance(image, Frame) else Frame(image)
+        return self._detector.signature(frame).astype(np.float32).ravel()
+
+    def _rebuild_index(self):
+        screens = [screen for screen in self._screens.values() if screen.reference is not None]
+        self._reference_names = [screen.name for screen in screens]
+        self._references = np.stack([self._signature(screen.reference) for screen in screens]) if screens else None
@@ -10,6 +10,8 @@ class TaskStatus(Enum):
 
 
 class Task(ABC):
+    cooldown: float = 0  # 执行一次后仍未完成时,再次执行前的冷却时间,单位为秒
+    resources: tuple[str, ...] = ("device",)  # 任务占用的资源,并发调度时占用相同资源的任务不会同时执行
 
     def __init__(self):
         self._uuid = uuid4()
@@ -56,6 +58,8 @@ class TaskProxy(Task):
         super().__init__()
         self._task = task
         self._status: TaskStatus = TaskStatus.PENDING
+        self._cooldown: float | None = None
+        self._resources: tuple[str, ...] | None = None
 
     @property
     def status(self) -> TaskStatus:
@@ -65,6 +69,22 @@ class TaskProxy(Task):
             return TaskStatus.COMPLETED
         return TaskStatus.PENDING
 
+    @property
+    def cooldown(self) -> float:
+        return self._cooldown if self._cooldown is not None else self._task.cooldown
+
+    @cooldown.setter
+    def cooldown(self, cooldown: float):
+        self._cooldown = cooldown
+
+    @property
+    def resources(self) -> tuple[str, ...]:
+        return self._resources if self._resources is not None else self._task.resources
+
+    @resources.setter
+    def resources(self, resources: tuple[str, ...]):
+        self._resources = tuple(resources)
+
     @property
     def proxy_status(self) -> TaskStatus:
         return self._status
@@ -105,9 +125,9 @@ class BeforeTaskProxy(TaskProxy):
 
     def execute(self):
         if self.proxy_status != TaskStatus.COMPLETED:
-            self.task()
+            return self.task()
         else:
-            self._task.execute()
+            return self._task.execute()
 
     @staticmethod
     @abstractmethod
@@ -138,9 +158,9 @@ class AfterTaskProxy(TaskProxy):
 
     def execute(self):
         if self._task.status == TaskStatus.COMPLETED:
-            self.task()
+            return self.task()
         else:
-            self._task.execute()
+            return self._task.execute()
 
     @staticmethod
     @abstractmethod
@@ -1,60 +1,407 @@
-from threading import Lock
-from typing import List, Optional, Tuple
+import heapq
+import itertools
+import random
+import time
+from datetime import datetime
+from threading import Condition, Lock
+from typing import Callable, List, Optional, Tuple
 
+from loguru import logger
+
+from miniframework.cron import CronSchedule
 from miniframework.task import Task, TaskStatus, TaskProxy, BeforeTaskProxy
 
+# 条目所在的位置,_RESETTING为等待在锁之外重置的已完成周期任务
+_READY, _DELAYED, _COMPLETED, _REMOVED, _RESETTING = range(5)
+_RECHECK_INTERVAL = 1.0  # 存在已完成任务时等待的最长时间,用于发现被直接调用task.reset()的任务,单位为秒
+
+
+class _Entry:
+    """队列中的任务条目，堆中保存(排序键, 代数, 条目)，代数与条目不一致的堆元素视为已失效(惰性删除)"""
+
+    __slots__ = ("priority", "seq", "task", "location", "generation", "due", "every", "cron", "jitter")
+
+    def __init__(self, priority: int, seq: int, task: Task | TaskProxy, every: float = None,
+                 cron: CronSchedule = None, jitter: float = 0) -> None:
+        self.priority = priority
+        self.seq = seq
+        self.task = task
+        self.location = _READY
+        self.generation = 0
+        self.due = 0.0  # 延迟任务的到期时间(time.monotonic)
+        self.every = every
+        self.cron = cron
+        self.jitter = jitter
+
+    @property
+    def recurring(self) -> bool:
+        return self.every is not None or self.cron is not None
+
+    def next_due(self) -> float:
+        """周期任务的下一次到期时间(time.monotonic)"""
+        if self.cron is not None:
+            now = datetime.now()
+            delay = (self.cron.next(now) - now).total_seconds()
+        else:
+            delay = self.every
+        return time.monotonic() + delay + _jitter(self.jitter)
+
+
+def _jitter(jitter: float) -> float:
+    return random.uniform(0, jitter) if jitter > 0 else 0.0
+
+
+def _monotonic(run_at: datetime | float) -> float:
+    """将时间点(datetime或time.time时间戳)转换为time.monotonic时间"""
+    timestamp = run_at.timestamp() if isinstance(run_at, datetime) else run_at
+    return time.monotonic() + (timestamp - time.time())
+
 
 class TaskQueue:
     def __init__(self):
-        self._task_queue: List[Tuple[int, Task | TaskProxy]] = []  # 优先队列
+        self._ready: list = []  # 可执行任务的优先队列(堆),优先级高的在前,同优先级先进先出
+        self._delayed: list = []  # 未到期任务的到期时间堆,未到期的任务不参与next_task的扫描
+        self._entries: dict[str, _Entry] = {}  # uuid -> 条目
+        self._completed: dict[str, _Entry] = {}  # 已完成的任务,不再参与next_task的扫描,没有可执行任务时检查是否已被重置
+        self._resetting: list[_Entry] = []  # 已完成的周期任务,在锁之外重置后重新计时
+        self._counter = itertools.count()
+        self._stale = 0  # 堆中已失效但尚未弹出的元素数
         self._lock = Lock()  # 用于线程安全
+        self._condition = Condition(self._lock)  # 新任务加入或任务重置时通知等待的调度器
         self._current_task: Optional[Task | TaskProxy] = None
+        self._listeners: list[Callable[[], None]] = []
 
     @property
     def queue(self) -> List[Tuple[int, Task | TaskProxy]]:
-        return self._task_queue
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda e: (-e.priority, e.seq))
+        return [(entry.priority, entry.task) for entry in entries]
 
     @property
     def next_task(self) -> Optional[Task | TaskProxy]:
-        for _, task in self._task_queue:
-            if task.status != TaskStatus.COMPLETED:
+        with self._lock:
+            task = self._peek()
+            if task is not None:
                 if self._current_task != task and isinstance(self._current_task, BeforeTaskProxy):
-                    with self._lock:
-                        self._current_task.reset_proxy_task()
+                    self._current_task.reset_proxy_task()
                 self._current_task = task
-                return task
-        return None
+        self._rearm()
+        return task
+
+    def ready_tasks(self, limit: int = None) -> List[Task | TaskProxy]:
+        """按优先级顺序返回可执行的任务，供并发调度使用
+
+        按堆的结构有序遍历，返回limit个任务只需访问O(limit)个堆元素，不对整个堆排序；遍历到的失效元素较多时压缩堆
+
+        Args:
+            limit (int, optional): 最多返回的任务数. Defaults to None,即所有可执行的任务.
+
+        Returns:
+            List[Task | TaskProxy]: 可执行的任务,优先级高的在前,同优先级先进先出
+        """
+        with self._lock:
+            self._peek()
+            tasks = []
+            stale = 0
+            frontier = [(self._ready[0], 0)] if self._ready else []  # 待访问的堆元素及其下标,堆顶最小
+            while frontier and (limit is None or len(tasks) < limit):
+                (_, _, generation, entry), index = heapq.heappop(frontier)
+                for child in (2 * index + 1, 2 * index + 2):
+                    if child < len(self._ready):
+                        heapq.heappush(frontier, (self._ready[child], child))
+                if generation != entry.generation or entry.location != _READY:
+                    stale += 1
+                elif entry.task.status == TaskStatus.COMPLETED:
+                    self._move(entry, _COMPLETED)
+                    self._retire(entry)
+                else:
+                    tasks.append(entry.task)
+            if stale:
+                self._maybe_compact()
+        self._rearm()
+        return tasks
+
+    def __len__(self) -> int:
+        return len(self._entries)
 
     def __str__(self) -> str:
-        tasks = [str(task) for _, task in self._task_queue]
+        tasks = [str(task) for _, task in self.queue]
         return f"TaskQueue({len(tasks)} tasks: {tasks})"
 
-    def add_task(self, task: Task, priority: int = 0):
+    def add_task(self, task: Task, priority: int = 0, run_at: datetime | float = None, every: float = None,
+                 cron: str = None, jitter: float = 0):
+        """添加任务
+
+        Args:
+            task (Task): 任务
+            priority (int, optional): 优先级，数值越大越先执行. Defaults to 0.
+            run_at (datetime | float, optional): 首次执行时间，datetime或time.time()时间戳. Defaults to None,即立即执行.
+            every (float, optional): 周期任务的执行间隔，任务完成后重置并在间隔后再次执行，单位为秒. Defaults to None.
+            cron (str, optional): 周期任务的cron表达式，如"*/5 * * * *". Defaults to None.
+            jitter (float, optional): 每次到期时间随机推迟的最大时长，单位为秒. Defaults to 0.
+        """
+        schedule = CronSchedule(cron) if cron is not None else None
         with self._lock:
-            self._task_queue.append((priority, task))
-            self._sort_task_queue()
+            if task.uuid in self._entries:
+                self._discard(task.uuid)
+            entry = _Entry(priority, next(self._counter), task, every, schedule, jitter)
+            self._entries[task.uuid] = entry
+            if run_at is not None:
+                self._delay(entry, _monotonic(run_at) + _jitter(jitter))
+            elif schedule is not None:
+                self._delay(entry, entry.next_due())
+            else:
+                self._push_ready(entry)
+            self._condition.notify_all()
+        self._notify_listeners()
 
     def remove_task(self, task_uuid: str):
         with self._lock:
-            self._task_queue = [t for t in self._task_queue if t[1].uuid != task_uuid]
+            self._discard(task_uuid)
 
     def remove_all_tasks(self):
         with self._lock:
-            self._task_queue.clear()
+            for entry in self._entries.values():
+                entry.location = _REMOVED
+            self._ready.clear()
+            self._delayed.clear()
+            self._entries.clear()
+            self._completed.clear()
+            self._resetting.clear()
+            self._stale = 0
 
     def reset_task(self, task_uuid: str):
+        """重置任务，已完成的任务立即重新参与调度
+
+        直接调用task.reset()的任务在队列没有可执行任务时才会被发现，等待中的调度器最迟在_RECHECK_INTERVAL后重新调度
+        """
+        with self._lock:
+            entry = self._entries.get(task_uuid)
+        if entry is None:
+            return
+        # 在锁之外重置,任务的reset可能调用队列的方法
+        entry.task.reset()
         with self._lock:
-            for _, task in self._task_queue:
-                if task.uuid == task_uuid:
-                    task.reset()
+            self._restore(entry)
+            self._condition.notify_all()
+        self._notify_listeners()
 
     def reset_all_tasks(self):
         with self._lock:
-            for _, task in self._task_queue:
-                try:
-                    task.reset()
-                except Exception as e:
-                    print(f"Failed to reset task {task.uuid}: {e}")
+            entries = list(self._entries.items())
+        for task_uuid, entry in entries:
+            try:
+                entry.task.reset()
+            except Exception as e:
+                print(f"Failed to reset task {task_uuid}: {e}")
+        with self._lock:
+            for _, entry in entries:
+                self._restore(entry)
+            self._condition.notify_all()
+        self._notify_listeners()
+
+    def defer(self, task_uuid: str, delay: float):
+        """推迟任务，到期前任务不会被next_task返回
+
+        Args:
+            task_uuid (str): 任务uuid
+            delay (float): 推迟时长，单位为秒
+        """
+        with self._lock:
+            entry = self._entries.get(task_uuid)
+            if entry is not None and entry.location in (_READY, _DELAYED):
+                self._delay(entry, time.monotonic() + delay + _jitter(entry.jitter))
+                self._condition.notify_all()
+        self._notify_listeners()
+
+    def on_executed(self, task: Task | TaskProxy):
+        """调度器执行任务一次后调用，未完成且设置了cooldown的任务在cooldown后才会再次执行
+
+        Args:
+            task (Task | TaskProxy): 刚执行过的任务
+        """
+        cooldown = getattr(task, "cooldown", 0) or 0
+        if cooldown > 0 and task.status != TaskStatus.COMPLETED:
+            self.defer(task.uuid, cooldown)
+
+    def next_due(self) -> Optional[float]:
+        """距离下一个延迟任务到期的时间
+
+        Returns:
+            float: 单位为秒，没有延迟任务时返回None
+        """
+        with self._lock:
+            return self._next_due()
+
+    def wait_for_task(self, timeout: float = None, interrupt: Callable[[], bool] = None) -> bool:
+        """阻塞等待队列中出现可执行的任务，延迟任务到期时自动唤醒
+
+        Args:
+            timeout (float, optional): 超时时间,单位为秒. Defaults to None,即一直等待.
+            interrupt (Callable[[], bool], optional): 返回True时停止等待,在wake()通知时检查. Defaults to None.
+
+        Returns:
+            bool: 队列中是否有可执行的任务(或interrupt返回True)
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._condition:
+                found = self._peek() is not None or (interrupt is not None and interrupt())
+                if not found and not self._resetting:
+                    wait = self._next_due()
+                    if self._completed:
+                        wait = _RECHECK_INTERVAL if wait is None else min(wait, _RECHECK_INTERVAL)
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            return False
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._condition.wait(wait)
+                    continue
+            self._rearm()
+            if found:
+                return True
+
+    def wake(self):
+        """唤醒所有等待任务的线程"""
+        with self._condition:
+            self._condition.notify_all()
+        self._notify_listeners()
+
+    def add_listener(self, listener: Callable[[], None]):
+        """添加监听函数，新任务加入或任务重置时在队列锁之外调用
+
+        Args:
+            listener (Callable[[], None]): 监听函数
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[], None]):
+        """移除监听函数"""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _notify_listeners(self):
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener()
+
+    def _peek(self) -> Optional[Task | TaskProxy]:
+        """返回优先级最高的可执行任务，顺带将到期的延迟任务移入优先队列，并弹出失效和已完成的条目"""
+        self._promote()
+        while True:
+            while self._ready:
+                _, _, generation, entry = self._ready[0]
+                if generation != entry.generation or entry.location != _READY:
+                    heapq.heappop(self._ready)
+                    self._stale -= 1
+                elif entry.task.status == TaskStatus.COMPLETED:
+                    heapq.heappop(self._ready)
+                    entry.generation += 1
+                    self._retire(entry)
+                else:
+                    return entry.task
+            if not self._recheck_completed():
+                return None
+
+    def _retire(self, entry: _Entry):
+        """处理已移出优先队列的已完成条目，周期任务由_rearm在锁之外重置"""
+        if entry.recurring:
+            entry.location = _RESETTING
+            self._resetting.append(entry)
+        else:
+            entry.location = _COMPLETED
+            self._completed[entry.task.uuid] = entry
+
+    def _recheck_completed(self) -> bool:
+        """将已被直接调用task.reset()重置的已完成任务放回优先队列，返回是否有任务放回"""
+        restored = [entry for entry in self._completed.values() if entry.task.status != TaskStatus.COMPLETED]
+        for entry in restored:
+            self._restore(entry)
+        return bool(restored)
+
+    def _rearm(self):
+        """在锁之外重置已完成的周期任务并在下一个周期到期，任务的reset可能调用队列的方法"""
+        if not self._resetting:
+            return
+        with self._lock:
+            entries, self._resetting = self._resetting, []
+        for entry in entries:
+            try:
+                entry.task.reset()
+            except Exception as e:
+                # 重置失败的任务仍在下一个周期到期,到期时仍为已完成状态则再次重置
+                logger.error(f"Failed to reset recurring task {entry.task}: {e}")
+        with self._lock:
+            for entry in entries:
+                if entry.location == _RESETTING:
+                    self._delay(entry, entry.next_due())
+            self._condition.notify_all()
+        self._notify_listeners()
+
+    def _promote(self):
+        now = time.monotonic()
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, generation, entry = heapq.heappop(self._delayed)
+            if generation != entry.generation or entry.location != _DELAYED:
+                self._stale -= 1
+                continue
+            self._push_ready(entry)
+
+    def _next_due(self) -> Optional[float]:
+        while self._delayed:
+            due, _, generation, entry = self._delayed[0]
+            if generation == entry.generation and entry.location == _DELAYED:
+                return max(0.0, due - time.monotonic())
+            heapq.heappop(self._delayed)
+            self._stale -= 1
+        return None
+
+    def _move(self, entry: _Entry, location: int):
+        """修改条目的位置，仍留在堆中的旧元素因代数不一致而失效"""
+        if entry.location in (_READY, _DELAYED):
+            self._stale += 1
+        entry.generation += 1
+        entry.location = location
+
+    def _push_ready(self, entry: _Entry):
+        entry.generation += 1
+        entry.location = _READY
+        heapq.heappush(self._ready, (-entry.priority, entry.seq, entry.generation, entry))
+
+    def _delay(self, entry: _Entry, due: float):
+        self._move(entry, _DELAYED)
+        entry.due = due
+        heapq.heappush(self._delayed, (due, entry.seq, entry.generation, entry))
+
+    def _discard(self, task_uuid: str):
+        """惰性删除，堆中的元素在到达堆顶时才被弹出"""
+        entry = self._entries.pop(task_uuid, None)
+        if entry is None:
+            return
+        self._completed.pop(task_uuid, None)
+        self._move(entry, _REMOVED)
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        """失效元素超过堆中元素的一半时压缩堆"""
+        if self._stale > (len(self._ready) + len(self._delayed)) // 2:
+            self._compact()
+
+    def _compact(self):
+        self._ready = [item for item in self._ready if item[2] == item[3].generation and item[3].location == _READY]
+        self._delayed = [item for item in self._delayed
+                         if item[2] == item[3].generation and item[3].location == _DELAYED]
+        heapq.heapify(self._ready)
+        heapq.heapify(self._delayed)
+        self._stale = 0
 
-    def _sort_task_queue(self, reserve=True):
-        self._task_queue.sort(key=lambda x: x[0], reverse=reserve)
+    def _restore(self, entry: _Entry) -> bool:
+        """将重置后的已完成任务放回优先队列，返回是否放回"""
+        if self._completed.pop(entry.task.uuid, None) is None:
+            return False
+        self._push_ready(entry)
+        return True
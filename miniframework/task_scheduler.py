@@ -1,10 +1,11 @@
 import threading
-import time
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum, auto
 from typing import Optional
 
 from loguru import logger
 
+from miniframework.task import Task, TaskProxy, BeforeTaskProxy
 from miniframework.task_queue import TaskQueue
 
 SLEEP_TIME = 0
@@ -18,14 +19,29 @@ class TaskSchedulerStatus(Enum):
 
 
 class TaskScheduler:
-    def __init__(self, sleep_time: int = SLEEP_TIME):
+    """任务调度器
+
+    默认在一个线程中按优先级串行执行任务；workers大于1时按Task.resources并发执行任务，
+    占用相同资源(如"device:<serial>")的任务串行执行，不占用相同资源的任务在线程池中同时执行
+    """
+
+    def __init__(self, sleep_time: int = SLEEP_TIME, workers: int = 1):
         """
         :param sleep_time:任务执行间隔时间,单位为ms
+        :param workers:并发执行任务的线程数,默认为1,即串行执行
         """
         self._task_queue: Optional[TaskQueue] = None
         self._work_thread: Optional[threading.Thread] = None
         self._status = TaskSchedulerStatus.PENDING
         self._sleep_time = sleep_time / 1000
+        self._interrupt = threading.Event()  # pause/stop时设置,打断任务间隔等待
+        self._workers = max(1, workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._condition = threading.Condition()
+        self._dirty = False  # 分派线程等待期间是否有新的任务或任务结束
+        self._running: dict[str, Task | TaskProxy] = {}  # 正在执行的任务 uuid -> 任务
+        self._held: set[str] = set()  # 正在执行的任务占用的资源
+        self._last_tasks: dict[str, Task | TaskProxy] = {}  # 每个资源上最近执行的任务
 
     @property
     def task_queue(self) -> TaskQueue:
@@ -43,15 +59,104 @@ class TaskScheduler:
         return f"TaskScheduler(status={self._status}, task_queue={self._task_queue})"
 
     def _run(self):
-        """任务调度器线程运行的内部方法"""
+        """任务调度器线程运行的内部方法，队列为空时阻塞等待新任务或延迟任务到期，而不是轮询"""
         while self.status == TaskSchedulerStatus.RUNNING:
-            next_task = self._task_queue.next_task if self._task_queue else None
+            next_task = self._task_queue.next_task
             if next_task:
                 logger.debug(f"Executing task: {next_task}")
                 next_task.execute()
+                self._task_queue.on_executed(next_task)
+                if self._sleep_time > 0:
+                    self._interrupt.wait(self._sleep_time)
             else:
-                logger.debug(f"Task queue is empty,Waiting {self._sleep_time} seconds")
-            time.sleep(self._sleep_time)
+                logger.debug("Task queue is empty,Waiting for new tasks")
+                self._task_queue.wait_for_task(interrupt=self._interrupted)
+
+    def _run_concurrent(self):
+        """并发模式下分派线程运行的内部方法
+
+        按优先级扫描可执行的任务，为资源空闲的任务分派工作线程；因资源冲突未能执行的任务会预留其资源，
+        避免低优先级任务抢先占用。没有可分派的任务时阻塞等待任务结束、新任务加入或延迟任务到期
+        """
+        while self._status == TaskSchedulerStatus.RUNNING:
+            with self._condition:
+                self._dirty = False
+            dispatched = full = False
+            reserved: set[str] = set()
+            # 分页扫描: 先取少量优先级最高的任务,全部因执行中或资源冲突跳过时才取更多
+            limit, scanned = self._workers * 2, 0
+            while not full:
+                tasks = self._task_queue.ready_tasks(limit)
+                for task in tasks[scanned:]:
+                    with self._condition:
+                        if len(self._running) >= self._workers:
+                            full = True
+                            break
+                        if task.uuid in self._running:
+                            continue
+                        resources = set(task.resources)
+                        if resources & (self._held | reserved):
+                            reserved |= resources
+                            continue
+                        self._acquire(task, resources)
+                    self._executor.submit(self._execute, task, resources)
+                    dispatched = True
+                if len(tasks) < limit:
+                    break
+                limit, scanned = limit * 2, len(tasks)
+            with self._condition:
+                if not dispatched and not self._dirty and self._status == TaskSchedulerStatus.RUNNING:
+                    self._condition.wait(self._task_queue.next_due())
+
+    def _acquire(self, task: Task | TaskProxy, resources: set[str]):
+        self._running[task.uuid] = task
+        self._held |= resources
+        for resource in resources:
+            last_task = self._last_tasks.get(resource)
+            # 与串行模式一致: 同一资源上切换到其他任务时,重置被打断的前置任务
+            if last_task is not None and last_task is not task and isinstance(last_task, BeforeTaskProxy) \
+                    and last_task.uuid not in self._running:
+                last_task.reset_proxy_task()
+            self._last_tasks[resource] = task
+
+    def _execute(self, task: Task | TaskProxy, resources: set[str]):
+        try:
+            logger.debug(f"Executing task: {task}")
+            task.execute()
+            self._task_queue.on_executed(task)
+            if self._sleep_time > 0:
+                self._interrupt.wait(self._sleep_time)
+        except Exception as e:
+            logger.error(f"Task {task} failed: {e}")
+        finally:
+            with self._condition:
+                self._running.pop(task.uuid, None)
+                self._held -= resources
+            self._notify()
+
+    def _notify(self):
+        with self._condition:
+            self._dirty = True
+            self._condition.notify_all()
+
+    def _interrupted(self) -> bool:
+        return self._status != TaskSchedulerStatus.RUNNING
+
+    def _wake(self):
+        """打断调度器线程的等待，使pause/stop立即生效"""
+        self._interrupt.set()
+        self._notify()
+        if self._task_queue:
+            self._task_queue.wake()
+
+    def _join(self):
+        if self._work_thread:
+            self._work_thread.join()
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._workers > 1:
+            self._task_queue.remove_listener(self._notify)
 
     def start(self):
         """启动任务调度器"""
@@ -60,7 +165,13 @@ class TaskScheduler:
         if self._status == TaskSchedulerStatus.RUNNING:
             raise RuntimeError("Scheduler is already running.")
         self._status = TaskSchedulerStatus.RUNNING
-        self._work_thread = threading.Thread(target=self._run)
+        self._interrupt.clear()
+        if self._workers > 1:
+            self._executor = ThreadPoolExecutor(self._workers, thread_name_prefix="TaskWorker")
+            self._task_queue.add_listener(self._notify)
+            self._work_thread = threading.Thread(target=self._run_concurrent)
+        else:
+            self._work_thread = threading.Thread(target=self._run)
         self._work_thread.start()
         logger.debug("TaskScheduler started.")
 
@@ -69,8 +180,8 @@ class TaskScheduler:
         if self.status == TaskSchedulerStatus.PENDING:
             return
         self._status = TaskSchedulerStatus.PENDING
-        if self._work_thread:
-            self._work_thread.join()
+        self._wake()
+        self._join()
         self._task_queue.reset_all_tasks()  # 重置所有任务状态
         logger.debug("TaskScheduler stopped.")
 
@@ -78,7 +189,7 @@ class TaskScheduler:
         if self.status != TaskSchedulerStatus.RUNNING:
             return
         self._status = TaskSchedulerStatus.PAUSED
-        if self._work_thread:
-            self._work_thread.join()
+        self._wake()
+        self._join()
         logger.debug("TaskScheduler paused.")
 
@@ -1,13 +1,328 @@
 #!/usr/bin/python
 # -*- coding: UTF-8 -*-
+import copy
+import os
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from threading import RLock
 
+import cv2
+import numpy as np
 from minicv import Images
+from minicv.Images import select_pyramid_level
+
+from miniframework.frame import Frame, scale_region
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+class TemplateStore:
+    """进程级模板图像缓存，按路径缓存解码后的模板图像及其灰度图、金字塔变体，按总字节数进行LRU淘汰"""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024) -> None:
+        """初始化模板图像缓存
+
+        Args:
+            max_bytes (int, optional): 缓存的最大字节数. Defaults to 256MB.
+        """
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, dict] = OrderedDict()  # path -> {variant: image}
+        self._pinned: dict[str, dict] = {}  # 外部注册的图像(如模板包的内存映射),不计入字节数也不会被淘汰
+        self._sizes: dict[str, int] = {}
+        self._total_bytes = 0
+        self._lock = RLock()
+
+    @property
+    def total_bytes(self) -> int:
+        """当前缓存占用的字节数"""
+        return self._total_bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, path: str) -> bool:
+        key = self._key(path)
+        return key in self._entries or key in self._pinned
+
+    def __str__(self) -> str:
+        return (f"TemplateStore({len(self._entries)} templates, {len(self._pinned)} registered, "
+                f"{self._total_bytes}/{self.max_bytes} bytes)")
+
+    def get(self, path: str):
+        """获取模板的原图像
+
+        Args:
+            path (str): 模板图像的路径
+
+        Returns:
+            模板图像 (np.array): OpenCV格式的图像
+        """
+        return self._variant(path, "color", lambda: self._read(path))
+
+    def gray(self, path: str):
+        """获取模板的灰度图像
+
+        Args:
+            path (str): 模板图像的路径
+
+        Returns:
+            灰度图像 (np.array):
+        """
+        return self._variant(path, "gray", lambda: Images.grayscale(self.get(path)))
+
+    def pyramid(self, path: str, levels: int) -> list:
+        """获取模板的灰度图像金字塔
+
+        Args:
+            path (str): 模板图像的路径
+            levels (int): 金字塔层数(不含原图)
+
+        Returns:
+            list: [原灰度图, 第1层, ..., 第levels层]
+        """
+        gray = self.gray(path)
+        pyramid = self._variant(path, "pyramid", lambda: [])  # 不含原灰度图,避免重复计算占用
+        if len(pyramid) < levels:
+            pyramid = list(pyramid)
+            while len(pyramid) < levels:
+                pyramid.append(cv2.pyrDown(pyramid[-1] if pyramid else gray))
+            self._put(path, "pyramid", pyramid)
+        return [gray] + pyramid[:levels]
+
+    def preload(self, paths_or_dir: str | list[str], gray: bool = False, pyramid_levels: int = 0) -> int:
+        """预加载模板图像，使解码发生在启动阶段而不是运行过程中
+
+        Args:
+            paths_or_dir (str | list[str]): 模板图像路径或目录，目录会递归查找其中的图像
+            gray (bool, optional): 是否同时生成灰度图. Defaults to False.
+            pyramid_levels (int, optional): 同时生成的金字塔层数. Defaults to 0.
+
+        Returns:
+            int: 预加载的模板数量
+        """
+        if isinstance(paths_or_dir, str):
+            paths_or_dir = [paths_or_dir]
+        count = 0
+        for path in self._expand(paths_or_dir):
+            self.get(path)
+            if gray:
+                self.gray(path)
+            if pyramid_levels > 0:
+                self.pyramid(path, pyramid_levels)
+            count += 1
+        return count
+
+    def register(self, path: str, image, gray=None, pyramid: list = None):
+        """注册已解码的模板图像，注册的图像不计入缓存字节数也不会被淘汰，用于共享内存映射的模板包
+
+        Args:
+            path (str): 模板图像的路径，之后按该路径获取图像
+            image (np.array): 模板的原图像
+            gray (np.array, optional): 模板的灰度图像. Defaults to None,即按需生成.
+            pyramid (list, optional): 模板的金字塔(不含原灰度图). Defaults to None,即按需生成.
+        """
+        variants = {"color": image}
+        if gray is not None:
+            variants["gray"] = gray
+        if pyramid:
+            variants["pyramid"] = list(pyramid)
+        with self._lock:
+            self.remove(path)
+            self._pinned[self._key(path)] = variants
+
+    def remove(self, path: str):
+        """从缓存中移除模板图像"""
+        with self._lock:
+            key = self._key(path)
+            self._pinned.pop(key, None)
+            if key in self._entries:
+                del self._entries[key]
+                self._total_bytes -= self._sizes.pop(key)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._pinned.clear()
+            self._sizes.clear()
+            self._total_bytes = 0
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.abspath(path)
+
+    @staticmethod
+    def _read(path: str):
+        image = Images.read(path)
+        if image is None:
+            raise ValueError(f"Failed to decode template image: {path}")
+        return image
+
+    @staticmethod
+    def _expand(paths: list[str]):
+        for path in paths:
+            if os.path.isdir(path):
+                for root, _, files in os.walk(path):
+                    for file in sorted(files):
+                        if file.lower().endswith(IMAGE_EXTENSIONS):
+                            yield os.path.join(root, file)
+            else:
+                yield path
+
+    @staticmethod
+    def _nbytes(value) -> int:
+        if isinstance(value, list):
+            return sum(item.nbytes for item in value)
+        return value.nbytes
+
+    def _variant(self, path: str, name: str, build):
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if name in entry:
+                    return entry[name]
+            pinned = self._pinned.get(key)
+            if pinned is not None and name in pinned:
+                return pinned[name]
+        value = build()
+        self._put(path, name, value)
+        return value
+
+    def _put(self, path: str, name: str, value):
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.setdefault(key, {})
+            self._entries.move_to_end(key)
+            size = self._nbytes(value) - (self._nbytes(entry[name]) if name in entry else 0)
+            entry[name] = value
+            self._sizes[key] = self._sizes.get(key, 0) + size
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                evicted, _ = self._entries.popitem(last=False)
+                self._total_bytes -= self._sizes.pop(evicted)
+
+
+template_store = TemplateStore()  # 进程级共享的模板图像缓存
+
+
+class PyramidMatcher:
+    """由粗到细的图像金字塔匹配引擎
+
+    默认与Images.findImage的判定一致：从最粗层级开始逐层对整幅图像匹配，某一层级的最高得分超过阈值即视为找到，
+    找到的位置逐层放大，每一层只在位置附近的窗口内匹配，返回原分辨率下修正后的坐标。与findImage的工作量相同，
+    单个模板的匹配没有加速，收益来自find_all中同一区域的多个模板共享帧的灰度金字塔以及更精确的坐标。
+
+    early_reject为True时只在最粗层级上对整幅图像匹配，得分不低于放宽后阈值的候选位置逐层验证，候选均未找到时直接返回未找到，
+    未找到时的耗时约为默认的1/3~1/4(见benchmark的pyramid场景)。但粗层级得分低的高频纹理模板，
+    以及界面中有超过max_candidates个相似位置(如相同图标的网格)时可能漏掉目标，因此不作为默认行为
+    """
+
+    def __init__(self, coarse_margin: float = 0.2, max_candidates: int = 5, refine_margin: int = 2,
+                 early_reject: bool = False) -> None:
+        """初始化匹配引擎
+
+        Args:
+            coarse_margin (float, optional): early_reject时每个金字塔层级候选阈值相对匹配阈值的放宽量,层级越高放宽越多.
+                Defaults to 0.2.
+            max_candidates (int, optional): early_reject时逐层验证的最大候选数. Defaults to 5.
+            refine_margin (int, optional): 逐层放大时窗口向外扩展的像素数. Defaults to 2.
+            early_reject (bool, optional): 是否只验证最粗层级的候选,不在更细的层级上对整幅图像匹配. Defaults to False.
+        """
+        self.early_reject = early_reject
+        self.coarse_margin = coarse_margin
+        self.max_candidates = max_candidates
+        self.refine_margin = refine_margin
+
+    def match(self, image_pyramid: list, template_pyramid: list, threshold: float) -> list | None:
+        """在图像金字塔中查找模板
+
+        Args:
+            image_pyramid (list): 灰度图像金字塔[原图, 第1层, ...]
+            template_pyramid (list): 灰度模板金字塔，层数与图像金字塔相同
+            threshold (float): 匹配的相似度阈值
+
+        Returns:
+            list: 匹配区域[xMin, yMin, xMax, yMax]，坐标为原图像坐标系，未找到时返回None
+        """
+        height, width = template_pyramid[0].shape[:2]
+        if image_pyramid[0].shape[0] < height or image_pyramid[0].shape[1] < width:
+            return None
+        level = min(len(image_pyramid), len(template_pyramid)) - 1
+        if self.early_reject and level > 0:
+            location = self._match_candidates(image_pyramid, template_pyramid, level, threshold)
+        else:
+            location = self._match_levels(image_pyramid, template_pyramid, level, threshold)
+        if location is None:
+            return None
+        x, y = location
+        return [x, y, x + width, y + height]
+
+    def _match_levels(self, image_pyramid: list, template_pyramid: list, level: int,
+                      threshold: float) -> tuple[int, int] | None:
+        """与Images.findImage相同，从粗到细逐层对整幅图像匹配"""
+        for current in range(level, -1, -1):
+            res = cv2.matchTemplate(image_pyramid[current], template_pyramid[current], cv2.TM_CCOEFF_NORMED)
+            _, score, _, (x, y) = cv2.minMaxLoc(res)
+            if score > threshold:
+                return self._descend(image_pyramid, template_pyramid, current, x, y)
+        return None
+
+    def _match_candidates(self, image_pyramid: list, template_pyramid: list, level: int,
+                          threshold: float) -> tuple[int, int] | None:
+        """只验证最粗层级的候选位置，与_match_levels相同，取最粗的有得分超过阈值的层级上得分最高的候选"""
+        res = cv2.matchTemplate(image_pyramid[level], template_pyramid[level], cv2.TM_CCOEFF_NORMED)
+        coarse_threshold = threshold - self.coarse_margin * level
+        suppress_h, suppress_w = (max(1, s // 2) for s in template_pyramid[level].shape[:2])
+        candidates = []  # (各层级的得分[最粗, ..., 原图], 原图上的位置)
+        for i in range(self.max_candidates):
+            _, score, _, (cx, cy) = cv2.minMaxLoc(res)
+            if score < coarse_threshold:
+                break  # 剩余候选的得分更低
+            if i == 0 and score > threshold:
+                # 最粗层级的最高得分已超过阈值,与findImage相同直接返回该位置
+                return self._descend(image_pyramid, template_pyramid, level, cx, cy)
+            scores, x, y = [score], cx, cy
+            for current in range(level - 1, -1, -1):
+                score, x, y = self._refine(image_pyramid[current], template_pyramid[current], x * 2, y * 2)
+                scores.append(score)
+            candidates.append((scores, (x, y)))
+            res[max(0, cy - suppress_h):cy + suppress_h + 1, max(0, cx - suppress_w):cx + suppress_w + 1] = -1
+        if not candidates:
+            return None
+        for i in range(level + 1):
+            scores, location = max(candidates, key=lambda candidate: candidate[0][i])
+            if scores[i] > threshold:
+                return location
+        return None
+
+    def _descend(self, image_pyramid: list, template_pyramid: list, level: int, x: int, y: int) -> tuple[int, int]:
+        """将level层级上的位置逐层放大到原分辨率"""
+        for current in range(level - 1, -1, -1):
+            _, x, y = self._refine(image_pyramid[current], template_pyramid[current], x * 2, y * 2)
+        return x, y
+
+    def _refine(self, image, template, x: int, y: int) -> tuple[float, int, int]:
+        """在(x, y)附近的窗口内匹配，返回窗口内的最高得分及其位置"""
+        height, width = template.shape[:2]
+        x0 = min(max(0, x - self.refine_margin), image.shape[1] - width)
+        y0 = min(max(0, y - self.refine_margin), image.shape[0] - height)
+        x1 = min(image.shape[1], x + self.refine_margin + width)
+        y1 = min(image.shape[0], y + self.refine_margin + height)
+        res = cv2.matchTemplate(image[y0:y1, x0:x1], template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (dx, dy) = cv2.minMaxLoc(res)
+        return score, x0 + dx, y0 + dy
+
+
+pyramid_matcher = PyramidMatcher()  # ImageTemplate默认使用的匹配引擎
 
 
 class Template(ABC):
     """抽象模板类，用于定义模板的基本方法和属性"""
 
+    location_cache = None  # 匹配位置缓存(LocationCache)，设置后match_frame先在最近的匹配位置附近搜索
+
     @abstractmethod
     def __init__(self) -> None:
         """模板参数"""
@@ -16,6 +331,40 @@ class Template(ABC):
     def match(self, image):
         """匹配方法"""
 
+    def match_frame(self, frame):
+        """在屏幕帧上匹配，默认在帧的完整图像上调用match，子类可利用帧缓存的区域视图
+
+        Args:
+            frame (Frame): 屏幕帧
+
+        Returns:
+            匹配结果
+        """
+        return self.match(frame.image)
+
+    def scaled(self, sx: float, sy: float = None) -> "Template":
+        """获取按比例缩放的模板变体，用于在与模板制作分辨率不同的屏幕上匹配，每个比例只缩放一次
+
+        Args:
+            sx (float): 横向缩放比例(屏幕分辨率 / 模板制作分辨率)
+            sy (float, optional): 纵向缩放比例. Defaults to None,即与sx相同.
+
+        Returns:
+            Template: 缩放后的模板，比例为1时返回模板本身
+        """
+        key = (round(sx, 4), round(sx if sy is None else sy, 4))
+        if key == (1, 1):
+            return self
+        variants = self.__dict__.setdefault("_variants", {})
+        variant = variants.get(key)
+        if variant is None:
+            variant = variants[key] = self._scale(*key)
+        return variant
+
+    def _scale(self, sx: float, sy: float) -> "Template":
+        """创建缩放后的模板，自定义模板默认不缩放"""
+        return self
+
     @abstractmethod
     def __str__(self) -> str:
         """模板描述"""
@@ -37,10 +386,12 @@ class ImageTemplate(Template):
         """
         self.template_path = template_path
         self.describe = describe or template_path.split("/")[-1].split("\\")[-1].split('.')[0]
-        self.template = None
+        self._template = None
         self.threshold = threshold
         self.region = region
         self.level = level
+        self.matcher = pyramid_matcher
+        self._pyramid: list | None = None  # 手动设置模板图像时的金字塔缓存
 
     def match(self, image):
         """匹配图像与模板的相似度
@@ -51,16 +402,105 @@ class ImageTemplate(Template):
         Returns:
             bool: 是否找到匹配区域
         """
-        if self.template is None:
-            self.template = Images.read(self.template_path)
-        return Images.findImage(image, self.template, self.threshold, self.region, self.level)
+        x_min, y_min, x_max, y_max = self.region or (0, 0, image.shape[1], image.shape[0])
+        gray = Images.grayscale(image[y_min:y_max, x_min:x_max])
+        level = self._level(gray)
+        image_pyramid = [gray]
+        for _ in range(level):
+            image_pyramid.append(cv2.pyrDown(image_pyramid[-1]))
+        return self._offset(self.matcher.match(image_pyramid, self._template_pyramid(level), self.threshold),
+                            x_min, y_min)
+
+    def match_frame(self, frame):
+        """在屏幕帧上匹配，直接使用帧缓存的匹配区域灰度图像金字塔，结果坐标转换回全图坐标系
+
+        Args:
+            frame (Frame): 屏幕帧
+
+        Returns:
+            list: 匹配区域[xMin, yMin, xMax, yMax]
+        """
+        if self.location_cache is not None:
+            return self.location_cache.match(self, frame, self._search)
+        return self._search(frame, self.region)
+
+    def _search(self, frame, region: list | None):
+        """在帧的指定区域内匹配"""
+        return self._match_region(frame, region)
+
+    def _match_region(self, frame, region: list | None):
+        x_min, y_min = frame.clip(region)[0:2]
+        level = self._level(frame.gray(region))
+        return self._offset(self.matcher.match(frame.pyramid(region, level), self._template_pyramid(level),
+                                               self.threshold), x_min, y_min)
+
+    def _level(self, gray) -> int:
+        template = self._gray_template()
+        level = self.level if self.level is not None else select_pyramid_level(gray, template)
+        # 限制层级,保证模板(以及不小于模板的匹配区域)在最粗层级上至少有1个像素
+        return max(0, min(level, min(template.shape[:2]).bit_length() - 1))
+
+    @staticmethod
+    def _offset(result, x_min: int, y_min: int):
+        if result:
+            result = [result[0] + x_min, result[1] + y_min, result[2] + x_min, result[3] + y_min]
+        return result
+
+    def _gray_template(self):
+        if self._template is not None:
+            return Images.grayscale(self._template)
+        return template_store.gray(self.template_path)
+
+    def _template_pyramid(self, levels: int) -> list:
+        if self._template is None:
+            return template_store.pyramid(self.template_path, levels)
+        if self._pyramid is None or len(self._pyramid) <= levels:
+            pyramid = [Images.grayscale(self._template)]
+            for _ in range(levels):
+                pyramid.append(cv2.pyrDown(pyramid[-1]))
+            self._pyramid = pyramid
+        return self._pyramid[:levels + 1]
+
+    def _scale(self, sx: float, sy: float) -> "ImageTemplate":
+        template = self.template
+        height, width = template.shape[:2]
+        size = (max(1, round(width * sx)), max(1, round(height * sy)))
+        interpolation = cv2.INTER_AREA if sx * sy < 1 else cv2.INTER_LINEAR
+        variant = copy.copy(self)
+        variant._variants = {}
+        variant.region = scale_region(self.region, sx, sy)
+        variant.template = cv2.resize(template, size, interpolation=interpolation)
+        return variant
+
+    @property
+    def template(self):
+        """模板图像，未手动设置时从共享的模板图像缓存中获取"""
+        if self._template is not None:
+            return self._template
+        return template_store.get(self.template_path)
+
+    @template.setter
+    def template(self, image):
+        self._template = image
+        self._pyramid = None
 
     def __str__(self) -> str:
         return self.describe
 
 
 class ImageColorTemplate(ImageTemplate):
-    """图像颜色模板类，用于在图像中查找与模板颜色相似的区域"""
+    """图像颜色模板类，用于在图像中查找与模板颜色相似的区域
+
+    先进行灰度图像匹配，再比较匹配区域与模板的颜色签名(将图像按区域平均缩小为grid x grid的彩色图像)，
+    各通道的平均颜色差均不超过color_threshold时视为匹配。注意color_threshold的含义与早期版本不同: 早期版本为模板左上角
+    单个像素在匹配区域左上角10x10范围内找色的各通道容差，现在为grid x grid网格平均颜色的各通道平均绝对差的上限，
+    对整个模板的颜色变化更敏感，对单个像素的噪声不敏感。模板必须是BGR三通道图像。匹配前先按窗口平均颜色筛选候选位置，
+    没有候选位置时直接返回未找到，候选位置集中时只在其外接区域内进行灰度匹配
+    """
+
+    grid = 4  # 颜色签名的网格大小
+    prefilter_margin = 16  # 窗口平均颜色筛选的额外容差,补偿粗层级上的位置偏差
+    prefilter_ratio = 0.5  # 候选外接区域小于匹配区域的该比例时才缩小匹配区域
 
     def __init__(self, template_path: str, describe: str = None, threshold: float = 0.9, region: list = None,
                  level: int = None, color_threshold: int = 4) -> None:
@@ -72,10 +512,11 @@ class ImageColorTemplate(ImageTemplate):
             threshold (float, optional): 匹配的相似度阈值. Defaults to 0.9.
             region (list, optional): 匹配的区域范围. Defaults to None.
             level (int, optional): 图像金字塔的层级. Defaults to None.
-            color_threshold (int, optional): 颜色相似度的阈值. Defaults to 4.
+            color_threshold (int, optional): 颜色签名(grid x grid网格平均颜色)与匹配区域签名的各通道平均绝对差的上限. Defaults to 4.
         """
         super().__init__(template_path, describe, threshold, region, level)
         self.color_threshold = color_threshold
+        self._signature: tuple | None = None  # (模板图像, 颜色签名, 平均颜色)
 
     def match(self, image):
         """匹配图像与模板颜色的相似度
@@ -86,23 +527,88 @@ class ImageColorTemplate(ImageTemplate):
         Returns:
             bool: 是否找到匹配区域
         """
-        if self.template is None:
-            self.template = Images.read(self.template_path)
-        result = super().match(image)
+        return self.match_frame(Frame(image))
+
+    def _search(self, frame, region: list | None):
+        region = self._prefilter(frame, frame.clip(region))
+        if region is None:
+            return None
+        return self._verify_color(frame.image, self._match_region(frame, region))
+
+    def color_signature(self):
+        """模板的颜色签名与平均颜色，每个模板图像只计算一次
+
+        Returns:
+            tuple: (颜色签名 (np.array): grid x grid x 通道数, 平均颜色 (np.array))
+        """
+        template = self.template
+        if self._signature is None or self._signature[0] is not template:
+            signature = self._signature_of(template)
+            self._signature = (template, signature, template.reshape(-1, template.shape[2]).mean(axis=0))
+        return self._signature[1], self._signature[2]
+
+    @ImageTemplate.template.setter
+    def template(self, image):
+        if image is not None and (image.ndim != 3 or image.shape[2] != 3):
+            raise ValueError(f"ImageColorTemplate {self.describe} requires a BGR template, got shape {image.shape}")
+        ImageTemplate.template.fset(self, image)
+
+    def _signature_of(self, image):
+        size = (min(self.grid, image.shape[1]), min(self.grid, image.shape[0]))
+        return cv2.resize(image, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+    def _verify_color(self, image, result):
         if result:
-            color = Images.getPixel(self.template, 0, 0)
-            x_min, y_min = result[0:2]
-            region = [x_min, y_min, x_min + 10, y_min + 10]
-            if not Images.findColor(image, color, region, self.color_threshold):
+            x_min, y_min, x_max, y_max = result
+            signature, _ = self.color_signature()
+            window = self._signature_of(image[y_min:y_max, x_min:x_max])
+            if np.abs(window - signature).mean(axis=(0, 1)).max() > self.color_threshold:
                 result = None
         return result
 
+    def _prefilter(self, frame, region: list) -> list | None:
+        """按窗口平均颜色筛选候选位置
+
+        Returns:
+            list: 灰度匹配的区域，没有候选位置时返回None
+        """
+        template = self.template
+        height, width = template.shape[:2]
+        x_min, y_min, x_max, y_max = region
+        if x_max - x_min < width or y_max - y_min < height:
+            return None
+        _, mean = self.color_signature()
+        scale = 2 ** self._level(frame.gray(region))
+        image = frame.crop(region)
+        if scale > 1:
+            image = cv2.resize(image, ((x_max - x_min) // scale, (y_max - y_min) // scale),
+                               interpolation=cv2.INTER_AREA)
+        kw, kh = max(1, width // scale), max(1, height // scale)
+        # 窗口平均颜色: 均值滤波后取窗口左上角对应的位置
+        means = cv2.blur(image, (kw, kh))[kh // 2:kh // 2 + image.shape[0] - kh + 1,
+                                          kw // 2:kw // 2 + image.shape[1] - kw + 1]
+        tolerance = self.color_threshold + self.prefilter_margin
+        mask = cv2.inRange(means, np.clip(mean - tolerance, 0, 255), np.clip(mean + tolerance, 0, 255))
+        x, y, w, h = cv2.boundingRect(mask)
+        if w == 0:
+            return None
+        candidates = [max(x_min, x_min + (x - 1) * scale), max(y_min, y_min + (y - 1) * scale),
+                      min(x_max, x_min + (x + w) * scale + width), min(y_max, y_min + (y + h) * scale + height)]
+        area = (candidates[2] - candidates[0]) * (candidates[3] - candidates[1])
+        return candidates if area < self.prefilter_ratio * (x_max - x_min) * (y_max - y_min) else region
+
     def __str__(self) -> str:
         return self.describe
 
 
 class MultiColorsTemplate(Template):
-    """多点颜色模板类，用于在图像中查找与多个颜色点相似的区域"""
+    """多点颜色模板类，用于在图像中查找与多个颜色点相似的区域
+
+    颜色点在初始化时编译为numpy偏移与颜色数组：先用第一个点的颜色掩码找出候选点，再对候选点按偏移批量取色比较，
+    与Images.findMultiColors的判定一致(第一个点各通道差不超过阈值,其余点各通道差之和不超过阈值)，返回按行优先顺序的第一个匹配点
+    """
+
+    chunk_size = 4096  # 每批比较的候选点数,限制临时数组的大小
 
     def __init__(self, first_color: str, colors: list, describe: str = None, region: list | None = None,
                  threshold: int = 4) -> None:
@@ -115,11 +621,39 @@ class MultiColorsTemplate(Template):
             region (list, optional): 匹配的区域范围. Defaults to None.
             threshold (int, optional): 颜色相似度的阈值. Defaults to 4.
         """
-        self.first_color = first_color
-        self.colors = colors
+        self._first_color = first_color
+        self._colors = colors
         self.region = region
-        self.threshold = threshold
+        self._threshold = threshold
         self.describe = describe or first_color
+        self._compile()
+
+    @property
+    def first_color(self) -> str:
+        return self._first_color
+
+    @first_color.setter
+    def first_color(self, first_color: str):
+        self._first_color = first_color
+        self._compile()
+
+    @property
+    def colors(self) -> list:
+        return self._colors
+
+    @colors.setter
+    def colors(self, colors: list):
+        self._colors = colors
+        self._compile()
+
+    @property
+    def threshold(self) -> int:
+        return self._threshold
+
+    @threshold.setter
+    def threshold(self, threshold: int):
+        self._threshold = threshold
+        self._compile()
 
     def match(self, image):
         """匹配图像与模板多个颜色点的相似度
@@ -130,7 +664,100 @@ class MultiColorsTemplate(Template):
         Returns:
             bool: 是否找到匹配区域
         """
-        return Images.findMultiColors(image, self.first_color, self.colors, self.region, self.threshold)
+        area = self._search_area(image.shape[1], image.shape[0], self.region)
+        if area is None:
+            return None
+        x_min, y_min, x_max, y_max = area
+        mask = cv2.inRange(image[y_min:y_max, x_min:x_max], self._lower, self._upper)
+        return self._verify(image, mask, x_min, y_min)
+
+    def match_frame(self, frame):
+        """在屏幕帧上匹配，第一个点的颜色掩码由帧缓存，第一个点颜色相同的模板共享同一个掩码
+
+        Args:
+            frame (Frame): 屏幕帧
+
+        Returns:
+            tuple: 第一个点的坐标(x, y)
+        """
+        if self.location_cache is not None:
+            return self.location_cache.match(self, frame, self._search)
+        return self._search(frame, self.region)
+
+    def _search(self, frame, region: list | None):
+        """在帧的指定区域内匹配"""
+        area = self._search_area(frame.width, frame.height, frame.clip(region))
+        if area is None:
+            return None
+        return self._verify(frame.image, frame.color_mask(self._lower, self._upper, area), area[0], area[1])
+
+    def _scale(self, sx: float, sy: float) -> "MultiColorsTemplate":
+        colors = [(round(dx * sx), round(dy * sy), color) for dx, dy, color in self._colors]
+        return MultiColorsTemplate(self._first_color, colors, self.describe, scale_region(self.region, sx, sy),
+                                   self._threshold)
+
+    def _compile(self):
+        """将颜色点编译为numpy数组"""
+        first = self._bgr(self._first_color)
+        self._lower = np.clip(first - self._threshold, 0, 255).astype(np.uint8)
+        self._upper = np.clip(first + self._threshold, 0, 255).astype(np.uint8)
+        self._dx = np.array([point[0] for point in self._colors], dtype=np.intp)
+        self._dy = np.array([point[1] for point in self._colors], dtype=np.intp)
+        self._bgrs = np.array([self._bgr(point[2]) for point in self._colors], dtype=np.int16).reshape(-1, 3)
+        self._bounds = (min(self._dx.min(initial=0), 0), min(self._dy.min(initial=0), 0),
+                        max(self._dx.max(initial=0), 0), max(self._dy.max(initial=0), 0))
+
+    @staticmethod
+    def _bgr(color: str | int):
+        if isinstance(color, str):
+            color = int(color[1:], 16)
+        elif not isinstance(color, (int, np.integer)):
+            raise ValueError("Color Format Error")
+        return np.array([color & 0xFF, (color >> 8) & 0xFF, (color >> 16) & 0xFF], dtype=np.int16)
+
+    def _search_area(self, width: int, height: int, region: list | None) -> list | None:
+        """第一个点的搜索范围，排除偏移点超出图像的候选点"""
+        x_min, y_min, x_max, y_max = region or (0, 0, width, height)
+        min_dx, min_dy, max_dx, max_dy = self._bounds
+        area = [max(x_min, -min_dx), max(y_min, -min_dy), min(x_max, width - max_dx), min(y_max, height - max_dy)]
+        return area if area[0] < area[2] and area[1] < area[3] else None
+
+    def _verify(self, image, mask, x_min: int, y_min: int):
+        points = cv2.findNonZero(mask)  # 行优先顺序
+        if points is None:
+            return None
+        points = points.reshape(-1, 2).astype(np.intp)
+        for start in range(0, len(points), self.chunk_size):
+            x = points[start:start + self.chunk_size, 0] + x_min
+            y = points[start:start + self.chunk_size, 1] + y_min
+            for dx, dy, bgr in zip(self._dx, self._dy, self._bgrs):
+                diff = np.abs(image[y + dy, x + dx].astype(np.int16) - bgr).sum(axis=1)
+                keep = diff <= self._threshold
+                x, y = x[keep], y[keep]
+                if not len(x):
+                    break
+            if len(x):
+                return int(x[0]), int(y[0])
+        return None
 
     def __str__(self) -> str:
         return self.describe
+
+
+def match_multi_colors(image, templates: list[MultiColorsTemplate], scale: tuple[float, float] = None) -> list:
+    """一次遍历图像匹配多个多点颜色模板，第一个点颜色相同的模板共享同一个颜色掩码
+
+    Args:
+        image (): 需要匹配的图像，也可以是屏幕帧
+        templates (list[MultiColorsTemplate]): 多点颜色模板列表
+        scale (tuple[float, float], optional): 图像分辨率相对模板制作分辨率的缩放比例(sx, sy)，
+            模板按Template.scaled缩放后匹配，结果为图像坐标. Defaults to None,即不缩放.
+
+    Returns:
+        list: 与模板顺序一致的匹配结果
+    """
+    frame = image if isinstance(image, Frame) else Frame(image)
+    if scale is not None:
+        templates = [template.scaled(*scale) for template in templates]
+    frame.focus([template.region for template in templates])
+    return [template.match_frame(frame) for template in templates]
@@ -0,0 +1,213 @@
+import argparse
+import json
+import os
+import struct
+
+import cv2
+import numpy as np
+from minicv import Images
+
+from miniframework.template import TemplateStore, ImageTemplate, ImageColorTemplate, template_store
+
+MAGIC = b"MFPACK01"
+VERSION = 1
+_ALIGNMENT = 64  # 图像数据按64字节对齐
+_TEMPLATE_TYPES = {"ImageTemplate": ImageTemplate, "ImageColorTemplate": ImageColorTemplate}
+
+
+def build_template_pack(sources: str | list[str], output: str, pyramid_levels: int = 0,
+                        options: dict[str, dict] = None) -> int:
+    """将模板图像编译为一个模板包，图像以解码后的原始数组保存，加载时无需再次解码
+
+    文件格式: MAGIC + 头部长度(uint64,小端) + JSON头部 + 按64字节对齐的图像数据
+
+    Args:
+        sources (str | list[str]): 模板图像路径或目录，目录会递归查找其中的图像
+        output (str): 模板包的输出路径
+        pyramid_levels (int, optional): 同时保存的灰度金字塔层数. Defaults to 0.
+        options (dict[str, dict], optional): 模板路径 -> 模板参数，可包含type("ImageTemplate"或"ImageColorTemplate")、
+            describe、threshold、region、level、color_threshold. Defaults to None.
+
+    Returns:
+        int: 打包的模板数量
+    """
+    if isinstance(sources, str):
+        sources = [sources]
+    options = {_normalize(path): value for path, value in (options or {}).items()}
+    entries = []
+    blobs = []
+    offset = 0
+    for path in TemplateStore._expand(sources):
+        name = _normalize(path)
+        image = TemplateStore._read(path)
+        gray = Images.grayscale(image)
+        pyramid = []
+        for _ in range(pyramid_levels):
+            pyramid.append(cv2.pyrDown(pyramid[-1] if pyramid else gray))
+        arrays = {}
+        for key, array in [("color", image), ("gray", gray)] + [(f"pyramid{i + 1}", p) for i, p in enumerate(pyramid)]:
+            array = np.ascontiguousarray(array)
+            arrays[key] = {"offset": offset, "shape": list(array.shape), "dtype": array.dtype.str}
+            blobs.append((offset, array))
+            offset += _aligned(array.nbytes)
+        entry = {"path": name, "type": "ImageTemplate", "pyramid_levels": pyramid_levels, "arrays": arrays}
+        entry.update(options.get(name, {}))
+        if entry["type"] not in _TEMPLATE_TYPES:
+            raise ValueError(f"Unsupported template type: {entry['type']}")
+        entries.append(entry)
+
+    header = json.dumps({"version": VERSION, "templates": entries}, ensure_ascii=False).encode("utf-8")
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+    tmp_path = output + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for blob_offset, array in blobs:
+            f.seek(data_start + blob_offset)
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, output)
+    return len(entries)
+
+
+class TemplatePack:
+    """内存映射的模板包，多个进程加载同一个模板包时共享图像数据的内存页"""
+
+    def __init__(self, path: str) -> None:
+        """加载模板包，只读取头部，图像数据按需从内存映射中读取
+
+        Args:
+            path (str): 模板包的路径
+
+        Raises:
+            ValueError: 文件不是模板包或版本不支持
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a template pack: {path}")
+            (header_size,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_size).decode("utf-8"))
+        if header.get("version") != VERSION:
+            raise ValueError(f"Unsupported template pack version: {header.get('version')}")
+        self._data_start = _aligned(len(MAGIC) + 8 + header_size)
+        self._mmap = np.memmap(path, dtype=np.uint8, mode="r")
+        self._entries: dict[str, dict] = {entry["path"]: entry for entry in header["templates"]}
+
+    @property
+    def paths(self) -> list[str]:
+        """模板包中所有模板的路径"""
+        return list(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, path: str) -> bool:
+        return _normalize(path) in self._entries
+
+    def __str__(self) -> str:
+        return f"TemplatePack({self.path}, {len(self._entries)} templates)"
+
+    def image(self, path: str, variant: str = "color"):
+        """获取模板图像的只读内存映射视图
+
+        Args:
+            path (str): 模板路径
+            variant (str, optional): "color"、"gray"或"pyramid<n>". Defaults to "color".
+
+        Returns:
+            图像 (np.array): 只读的图像视图
+        """
+        info = self._entries[_normalize(path)]["arrays"][variant]
+        dtype = np.dtype(info["dtype"])
+        start = self._data_start + info["offset"]
+        count = int(np.prod(info["shape"]))
+        return self._mmap[start:start + count * dtype.itemsize].view(dtype).reshape(info["shape"])
+
+    def register(self, store: TemplateStore = template_store, root: str = None) -> int:
+        """将模板包中的图像注册到模板图像缓存，之后按原路径创建的ImageTemplate直接使用内存映射的图像
+
+        Args:
+            store (TemplateStore, optional): 模板图像缓存. Defaults to template_store.
+            root (str, optional): 模板路径的根目录. Defaults to None,即当前工作目录.
+
+        Returns:
+            int: 注册的模板数量
+        """
+        for path, entry in self._entries.items():
+            pyramid = [self.image(path, f"pyramid{i + 1}") for i in range(entry.get("pyramid_levels", 0))]
+            store.register(self._resolve(path, root), self.image(path), self.image(path, "gray"), pyramid)
+        return len(self._entries)
+
+    def template(self, path: str, root: str = None) -> ImageTemplate:
+        """按打包时的模板参数创建模板，需先调用register
+
+        Args:
+            path (str): 模板路径
+            root (str, optional): 模板路径的根目录. Defaults to None,即当前工作目录.
+
+        Returns:
+            ImageTemplate: ImageTemplate或ImageColorTemplate
+        """
+        entry = self._entries[_normalize(path)]
+        kwargs = {key: entry[key] for key in ("describe", "threshold", "region", "level") if key in entry}
+        template_type = _TEMPLATE_TYPES[entry["type"]]
+        if template_type is ImageColorTemplate and "color_threshold" in entry:
+            kwargs["color_threshold"] = entry["color_threshold"]
+        return template_type(self._resolve(path, root), **kwargs)
+
+    def templates(self, root: str = None) -> dict[str, ImageTemplate]:
+        """创建模板包中的所有模板
+
+        Returns:
+            dict[str, ImageTemplate]: 模板路径 -> 模板
+        """
+        return {path: self.template(path, root) for path in self._entries}
+
+    @staticmethod
+    def _resolve(path: str, root: str | None) -> str:
+        return os.path.join(root, path) if root is not None else path
+
+
+def load_template_pack(path: str, store: TemplateStore = template_store, root: str = None) -> TemplatePack:
+    """加载模板包并注册到模板图像缓存
+
+    Args:
+        path (str): 模板包的路径
+        store (TemplateStore, optional): 模板图像缓存. Defaults to template_store.
+        root (str, optional): 模板路径的根目录. Defaults to None,即当前工作目录.
+
+    Returns:
+        TemplatePack: 模板包
+    """
+    pack = TemplatePack(path)
+    pack.register(store, root)
+    return pack
+
+
+def _normalize(path: str) -> str:
+    return os.path.normpath(path).replace("\\", "/")
+
+
+def _aligned(size: int) -> int:
+    return (size + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def main():
+    parser = argparse.ArgumentParser(description="将模板图像编译为模板包")
+    parser.add_argument("sources", nargs="+", help="模板图像路径或目录")
+    parser.add_argument("-o", "--output", required=True, help="模板包的输出路径")
+    parser.add_argument("--pyramid-levels", type=int, default=0, help="同时保存的灰度金字塔层数")
+    parser.add_argument("--options", help="模板参数的JSON文件,格式为{模板路径: {参数: 值}}")
+    args = parser.parse_args()
+    options = None
+    if args.options:
+        with open(args.options, encoding="utf-8") as f:
+            options = json.load(f)
+    count = build_template_pack(args.sources, args.output, args.pyramid_levels, options)
+    print(f"Packed {count} templates into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
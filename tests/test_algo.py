@@ -0,0 +1,55 @@
+import threading
+from statistics import NormalDist
+
+import numpy as np
+
+from miniframework.algo import CurveGenerate, PointSampler, _normal_ppf
+
+
+def test_truncated_normal_stays_in_bounds_and_matches_distribution():
+    samples = PointSampler(seed=0).truncated_normal(50, 10, 40, 80, 20000)
+    assert samples.min() >= 40 and samples.max() <= 80
+    # 截断在均值以下1个标准差处,截断正态分布的均值约为50 + 10 * 0.2876
+    assert abs(samples.mean() - 52.9) < 0.3
+
+
+def test_normal_ppf_matches_inverse_cdf():
+    p = np.concatenate([np.logspace(-300, -2, 500), np.linspace(0.01, 0.99, 1000), 1 - np.logspace(-12, -2, 200)])
+    expected = np.array([NormalDist().inv_cdf(value) for value in p])
+    assert np.allclose(_normal_ppf(p), expected, rtol=2e-9, atol=0)
+
+
+def test_truncated_normal_far_tail_bounds():
+    sampler = PointSampler(seed=0)
+    upper = sampler.truncated_normal(0, 1, 6, 9, 1000)
+    assert upper.min() >= 6 and upper.max() <= 9 and np.mean(upper == 6) > 0.9
+    lower = sampler.truncated_normal(0, 1, -1000, -900, 10)
+    assert np.all(lower == -900)
+
+
+def test_sampler_is_reproducible():
+    first, second = PointSampler(seed=3), PointSampler(seed=3)
+    assert [first.point([0, 0, 100, 50]) for _ in range(10)] == [second.point([0, 0, 100, 50]) for _ in range(10)]
+    assert np.array_equal(CurveGenerate.bezier_curves([(0, 0)], [(300, 300)], 300, rng=PointSampler(seed=1)),
+                          CurveGenerate.bezier_curves([(0, 0)], [(300, 300)], 300, rng=PointSampler(seed=1)))
+
+
+def test_shared_sampler_across_threads():
+    sampler = PointSampler(seed=0, batch_size=16)
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(200):
+                x, y = sampler.point([10, 10, 60, 40])
+                assert 10 <= x <= 60 and 10 <= y <= 40
+                CurveGenerate.bezier_curves([(0, 0)], [(100, 100)], 100, rng=sampler)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
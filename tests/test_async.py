@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import time
+
+import cv2
+
+from miniframework import AsyncInstance, AsyncTaskScheduler, Instance
+from miniframework.benchmark import FakeDevice, synthetic_frame
+from miniframework.metrics import Metrics
+from miniframework.task import Task, TaskStatus
+from miniframework.task_queue import TaskQueue
+from miniframework.template import ImageTemplate
+
+
+class _RunTask(Task):
+    def __init__(self) -> None:
+        super().__init__()
+        self.runs = 0
+        self._status = TaskStatus.PENDING
+
+    @staticmethod
+    def name() -> str:
+        return "RunTask"
+
+    @property
+    def status(self) -> TaskStatus:
+        return self._status
+
+    def __str__(self) -> str:
+        return f"RunTask({self.runs})"
+
+    def task(self):
+        self.runs += 1
+
+    def execute(self):
+        self.task()
+        self._status = TaskStatus.COMPLETED
+
+    def reset(self):
+        self._status = TaskStatus.PENDING
+
+
+class _AsyncRunTask(_RunTask):
+    async def execute(self):
+        await asyncio.sleep(0)
+        super().execute()
+
+
+def test_async_find_is_instrumented(tmp_path):
+    image = synthetic_frame(180, 320, seed=5)
+    path = str(tmp_path / "button.png")
+    cv2.imwrite(path, image[40:80, 60:120])
+    template = ImageTemplate(path, describe="button", threshold=0.8)
+    metrics = Metrics(enabled=True)
+    instance = AsyncInstance(Instance(device=FakeDevice(frames=[image]), metrics=metrics))
+
+    async def main():
+        return await instance.find(template), await instance.find_all([template]), await instance.find_any([template])
+
+    found, report, first = asyncio.run(main())
+    assert found == [60, 40, 120, 80]
+    assert report[template] == found and first.hit is template
+    snapshot = metrics.snapshot()
+    for name in ("find", "find_all", "find_any", "match[button]"):
+        assert snapshot[name]["count"] >= 1, name
+    assert snapshot["match[button]"]["count"] == 3
+
+
+def test_scheduler_does_not_block_event_loop_on_queue_lock():
+    task_queue, task = TaskQueue(), _RunTask()
+
+    async def main():
+        scheduler = AsyncTaskScheduler(sleep_time=0)
+        scheduler.task_queue = task_queue
+        scheduler.start()
+        task_queue.add_task(task, run_at=time.time() + 0.1)  # 调度器在持有锁期间到期,获取任务时等待队列的锁
+        await asyncio.sleep(0.05)
+        held = threading.Event()
+
+        def hold_lock():
+            with task_queue._lock:
+                held.set()
+                time.sleep(0.3)
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        held.wait(1)
+        worst = 0.0
+        for _ in range(10):  # 持有锁期间事件循环仍能及时调度其他协程
+            start = time.monotonic()
+            await asyncio.sleep(0.01)
+            worst = max(worst, time.monotonic() - start)
+        holder.join()
+        deadline = time.monotonic() + 5
+        while task.runs < 1 and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        await scheduler.stop()
+        return worst
+
+    assert asyncio.run(main()) < 0.15
+    assert task.runs == 1
+
+
+def test_scheduler_runs_sync_and_async_tasks():
+    task_queue, sync_task, async_task = TaskQueue(), _RunTask(), _AsyncRunTask()
+    task_queue.add_task(sync_task)
+    task_queue.add_task(async_task)
+
+    async def main():
+        scheduler = AsyncTaskScheduler(sleep_time=0)
+        scheduler.task_queue = task_queue
+        scheduler.start()
+        deadline = time.monotonic() + 5
+        while (sync_task.runs < 1 or async_task.runs < 1) and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        await scheduler.stop()
+
+    asyncio.run(main())
+    assert sync_task.runs == 1 and async_task.runs == 1
+    assert sync_task.status == TaskStatus.PENDING and async_task.status == TaskStatus.PENDING  # stop重置所有任务
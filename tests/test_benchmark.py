@@ -0,0 +1,71 @@
+import json
+import os
+import subprocess
+import sys
+
+import cv2
+import numpy as np
+
+from miniframework.benchmark import FakeDevice, compare, run_benchmarks, synthetic_frame
+
+
+def _cli(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, "-m", "miniframework.benchmark", *args],
+                          capture_output=True, text=True, timeout=120, env=dict(os.environ))
+
+
+def test_fake_device_replays_recorded_frames(tmp_path):
+    first, second = synthetic_frame(90, 160, seed=1), synthetic_frame(90, 160, seed=2)
+    cv2.imwrite(str(tmp_path / "0.png"), first)
+    np.save(str(tmp_path / "1.npy"), second)
+    (tmp_path / "notes.txt").write_text("ignored")
+    device = FakeDevice(str(tmp_path))
+    assert device.frame_count == 2
+    decoded = [cv2.imdecode(np.frombuffer(device.screenshot_raw(), np.uint8), cv2.IMREAD_COLOR) for _ in range(3)]
+    assert np.array_equal(decoded[0], first) and np.array_equal(decoded[1], second)
+    assert np.array_equal(decoded[2], first)  # 循环回放
+    device.click(1, 2, 50)
+    assert device.touches == [("click", 1, 2, 50)]
+
+
+def test_report_is_json_serialisable():
+    report = run_benchmarks(["decode", "task_queue"], iterations=5, template_count=5)
+    report = json.loads(json.dumps(report))
+    assert report["config"]["iterations"] == 5 and report["config"]["frame_count"] == 1
+    scenarios = {result["scenario"]: result for result in report["results"]}
+    assert set(scenarios) == {"decode", "task_queue.add_task", "task_queue.next_task"}
+    assert scenarios["decode"]["ops"] == 5 and scenarios["decode"]["ops_per_sec"] > 0
+    assert scenarios["decode"]["p50_ms"] <= scenarios["decode"]["p99_ms"] <= scenarios["decode"]["max_ms"]
+
+
+def test_compare_reports_regressions():
+    baseline = {"results": [{"scenario": "find", "ops_per_sec": 100.0},
+                            {"scenario": "decode", "ops_per_sec": 100.0},
+                            {"scenario": "match", "ops_per_sec": 0.0}]}
+    current = {"results": [{"scenario": "find", "ops_per_sec": 70.0},
+                           {"scenario": "decode", "ops_per_sec": 85.0},
+                           {"scenario": "match", "ops_per_sec": 1.0},
+                           {"scenario": "new", "ops_per_sec": 1.0}]}
+    assert compare(current, baseline) == [{"scenario": "find", "ops_per_sec": 70.0,
+                                           "baseline_ops_per_sec": 100.0, "ratio": 0.7}]
+    assert [r["scenario"] for r in compare(current, baseline, tolerance=0.1)] == ["find", "decode"]
+
+
+def test_cli_writes_json_and_compares_with_baseline(tmp_path):
+    output = tmp_path / "result.json"
+    process = _cli("--scenario", "decode", "--iterations", "3", "-o", str(output))
+    assert process.returncode == 0, process.stderr
+    report = json.loads(output.read_text(encoding="utf-8"))
+    assert [result["scenario"] for result in report["results"]] == ["decode"]
+
+    baseline = tmp_path / "baseline.json"
+    report["results"][0]["ops_per_sec"] *= 1000
+    baseline.write_text(json.dumps(report), encoding="utf-8")
+    process = _cli("--scenario", "decode", "--iterations", "3", "--baseline", str(baseline))
+    assert process.returncode == 1
+    assert [r["scenario"] for r in json.loads(process.stdout)["regressions"]] == ["decode"]
+
+    report["results"][0]["ops_per_sec"] /= 1e6
+    baseline.write_text(json.dumps(report), encoding="utf-8")
+    process = _cli("--scenario", "decode", "--iterations", "3", "--baseline", str(baseline))
+    assert process.returncode == 0 and json.loads(process.stdout)["regressions"] == []
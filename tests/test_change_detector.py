@@ -0,0 +1,37 @@
+import cv2
+
+from miniframework.benchmark import synthetic_frame
+from miniframework.change_detector import ChangeDetector
+from miniframework.frame import Frame
+from miniframework.template import Template
+
+
+class _CountingTemplate(Template):
+    def __init__(self) -> None:
+        self.region = None
+        self.calls = 0
+
+    def match(self, image):
+        self.calls += 1
+        return self.calls
+
+    def __str__(self) -> str:
+        return "counting"
+
+
+def test_small_change_in_large_region_is_detected():
+    image = synthetic_frame(1080, 1920, 0)
+    template, detector = _CountingTemplate(), ChangeDetector()
+    assert detector.match(template, Frame(image)) == 1
+    assert detector.match(template, Frame(image.copy())) == 1  # 未变化,复用上一次的结果
+
+    changed = image.copy()
+    cv2.rectangle(changed, (905, 505), (914, 514), (255, 255, 255), -1)  # 新出现的10x10图标
+    assert detector.match(template, Frame(changed)) == 2
+
+
+def test_fixed_size_signature():
+    frame = Frame(synthetic_frame(720, 1280, 0))
+    assert ChangeDetector(16, cell=None).signature(frame).shape == (16, 16)
+    assert ChangeDetector().signature(frame).shape == (45, 80)
+    assert ChangeDetector().signature(frame, [0, 0, 100, 50]).shape == (16, 16)
@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import pytest
+
+from miniframework.cron import CronSchedule
+
+
+def _next(expression: str, after: datetime) -> datetime:
+    return CronSchedule(expression).next(after)
+
+
+def test_step_and_list_fields():
+    assert _next("*/15 * * * *", datetime(2024, 5, 1, 10, 7, 30)) == datetime(2024, 5, 1, 10, 15)
+    assert _next("*/15 * * * *", datetime(2024, 5, 1, 10, 45)) == datetime(2024, 5, 1, 11, 0)
+    assert _next("5,35 8-9 * * *", datetime(2024, 5, 1, 9, 40)) == datetime(2024, 5, 2, 8, 5)
+    assert _next("0 0 * * *", datetime(2024, 12, 31, 23, 59)) == datetime(2025, 1, 1, 0, 0)
+
+
+def test_weekday_range():
+    # 2024-05-03为周五，周一至周五的9:30
+    assert _next("30 9 * * 1-5", datetime(2024, 5, 3, 9, 30)) == datetime(2024, 5, 6, 9, 30)
+    assert _next("30 9 * * 1-5", datetime(2024, 5, 6, 8, 0)) == datetime(2024, 5, 6, 9, 30)
+    # 周的0和7均表示周日
+    assert _next("0 12 * * 7", datetime(2024, 5, 1)) == datetime(2024, 5, 5, 12, 0)
+    assert _next("0 12 * * 5-7", datetime(2024, 5, 5, 12, 0)) == datetime(2024, 5, 10, 12, 0)
+
+
+def test_day_of_month_skips_short_months_and_leap_day():
+    assert _next("0 0 31 * *", datetime(2024, 4, 1)) == datetime(2024, 5, 31, 0, 0)
+    assert _next("0 0 29 2 *", datetime(2024, 3, 1)) == datetime(2028, 2, 29, 0, 0)
+    assert _next("0 0 29 2 *", datetime(2024, 2, 28, 12, 0)) == datetime(2024, 2, 29, 0, 0)
+
+
+def test_day_of_month_or_day_of_week():
+    # 日和周都有限制时满足其一即可: 每月13日或每个周五, 2024-05-03为周五
+    schedule = CronSchedule("0 0 13 * 5")
+    assert schedule.next(datetime(2024, 5, 1)) == datetime(2024, 5, 3, 0, 0)
+    assert schedule.next(datetime(2024, 5, 10, 1, 0)) == datetime(2024, 5, 13, 0, 0)
+    # 只限制其中之一时按该字段匹配
+    assert _next("0 0 13 * *", datetime(2024, 5, 1)) == datetime(2024, 5, 13, 0, 0)
+    assert _next("0 0 * * 5", datetime(2024, 5, 4)) == datetime(2024, 5, 10, 0, 0)
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "* 24 * * *", "* * 0 * *", "*/0 * * * *",
+                                        "5-1 * * * *", "* * * 13 *"])
+def test_invalid_expression(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+def test_never_matching_expression():
+    with pytest.raises(ValueError):
+        _next("0 0 30 2 *", datetime(2024, 1, 1))
@@ -0,0 +1,68 @@
+import numpy as np
+
+from miniframework import Instance
+from miniframework.benchmark import FakeDevice
+from miniframework.debug_recorder import DebugRecorder
+
+
+def _screenshot(seed: int = 0):
+    return np.random.default_rng(seed).integers(0, 256, (360, 640, 3), dtype=np.uint8)
+
+
+def test_bounded_by_items_and_bytes():
+    screenshot = _screenshot()
+    recorder = DebugRecorder(max_items=3)
+    for i in range(5):
+        recorder.record(f"t{i}", [0, 0, 10, 10], _screenshot(i))
+    assert [record["template"] for record in recorder] == ["t2", "t3", "t4"]
+
+    recorder = DebugRecorder(max_bytes=2 * screenshot.nbytes)
+    for i in range(5):
+        recorder.record(f"t{i}", [0, 0, 10, 10], _screenshot(i))
+    assert len(recorder) == 2 and recorder.total_bytes == 2 * screenshot.nbytes
+
+
+def test_shared_frame_is_counted_once():
+    screenshot = _screenshot()
+    recorder = DebugRecorder(max_bytes=screenshot.nbytes)
+    for i in range(4):  # find_all在同一帧上的多条记录
+        recorder.record(f"t{i}", [0, 0, 10, 10], screenshot)
+    assert len(recorder) == 4 and recorder.total_bytes == screenshot.nbytes
+    recorder.clear()
+    assert recorder.total_bytes == 0
+
+
+def test_crop_mode_bounds_point_results():
+    recorder = DebugRecorder(mode="crop", crop_margin=8, thumbnail_width=64)
+    screenshot = _screenshot()
+    recorder.record("region", [10, 20, 50, 40], screenshot)
+    recorder.record("point", (100, 5), screenshot)
+    recorder.record("other", True, screenshot)
+    region, point, other = (record["screenshot"] for record in recorder)
+    assert region.shape == (20, 40, 3)
+    assert point.shape == (14, 17, 3)  # 窗口在图像上边缘被截断
+    assert np.array_equal(point, screenshot[0:14, 92:109])
+    assert other.shape == (36, 64, 3)
+
+
+def test_spill_and_replay(tmp_path):
+    spill_path = str(tmp_path / "debug" / "records")
+    recorder = DebugRecorder(mode="crop", spill_path=spill_path)
+    screenshot = _screenshot()
+    recorder.record("button", [10, 20, 50, 40], screenshot)
+    recorder.record("dot", (np.int64(100), np.int64(50)), screenshot)
+    recorder.close()
+    records = list(DebugRecorder.replay(spill_path))
+    assert [(record["template"], record["result"]) for record in records] == \
+           [("button", [10, 20, 50, 40]), ("dot", [100, 50])]
+    assert np.array_equal(records[0]["screenshot"], screenshot[20:40, 10:50])
+    recorder.record("after_close", [0, 0, 1, 1], screenshot)  # 关闭后只保存在内存中
+    assert len(list(DebugRecorder.replay(spill_path))) == 2
+
+
+def test_instance_close_stops_spill_thread(tmp_path):
+    recorder = DebugRecorder(spill_path=str(tmp_path / "records"))
+    with Instance(device=FakeDevice(size=(90, 160)), debug_recorder=recorder, match_workers=2) as instance:
+        assert instance.match_executor is not None
+    assert recorder._spill_thread is None
+    assert instance.match_executor is None
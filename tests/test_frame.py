@@ -0,0 +1,45 @@
+import time
+
+import numpy as np
+import pytest
+
+from miniframework.frame import FrameStream
+
+
+class _FlakyCapture:
+    def __init__(self, failures: int) -> None:
+        self.failures = failures
+        self.calls = []
+
+    def __call__(self):
+        self.calls.append(time.monotonic())
+        if len(self.calls) <= self.failures:
+            raise ConnectionError("device offline")
+        return np.zeros((4, 4, 3), np.uint8)
+
+
+def test_stream_stops_after_consecutive_failures():
+    capture = _FlakyCapture(failures=1000)
+    stream = FrameStream(capture, fps=1000, decode=lambda raw: raw, max_failures=4, max_backoff=0.2)
+    stream.start()
+    with pytest.raises(RuntimeError) as info:
+        stream.latest(timeout=5)
+    assert isinstance(info.value.__cause__, ConnectionError)
+    assert len(capture.calls) == 4
+    assert not stream.running
+    stream.stop()
+    # 重试间隔按指数增长,而非按fps全速重试
+    gaps = np.diff(capture.calls)
+    assert gaps[0] >= 0.04 and gaps[1] >= 0.09 and gaps[2] >= 0.19
+
+
+def test_stream_recovers_after_transient_failures():
+    capture = _FlakyCapture(failures=2)
+    stream = FrameStream(capture, fps=1000, decode=lambda raw: raw, max_failures=4, max_backoff=0.02)
+    stream.start()
+    try:
+        frame = stream.latest(timeout=5)
+    finally:
+        stream.stop()
+    assert frame.seq == 1
+    assert stream.failures == 0 and stream.error is None
@@ -0,0 +1,87 @@
+import threading
+import time
+
+import cv2
+import pytest
+
+from miniframework import Instance
+from miniframework.benchmark import FakeDevice, synthetic_frame
+from miniframework.template import ImageTemplate
+
+
+class _GatedDevice(FakeDevice):
+    """第一次截图等待gate被设置后返回，用于模拟截图期间发生的触控"""
+
+    def __init__(self) -> None:
+        super().__init__(size=(90, 160))
+        self.gate = threading.Event()
+        self.capturing = threading.Event()
+        self.captures = 0
+
+    def screenshot_raw(self) -> bytes:
+        self.captures += 1
+        if self.captures == 1:
+            self.capturing.set()
+            self.gate.wait(5)
+        return super().screenshot_raw()
+
+
+def _touch_during_first_capture(instance: Instance, device: _GatedDevice, capture):
+    thread = threading.Thread(target=capture)
+    thread.start()
+    assert device.capturing.wait(5)
+    toucher = threading.Thread(target=instance.click, args=(1, 1, 10))
+    toucher.start()
+    deadline = time.monotonic() + 5
+    while instance.last_touch == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    device.gate.set()
+    thread.join(5)
+    toucher.join(5)
+
+
+def test_screenshot_started_before_touch_is_not_cached():
+    device = _GatedDevice()
+    instance = Instance(device=device, frame_max_age=10_000)
+    _touch_during_first_capture(instance, device, instance.screenshot)
+    frame = instance.frame()
+    assert device.captures == 2
+    assert frame.timestamp >= instance.last_touch
+
+
+def test_frame_recaptures_when_touched_during_capture():
+    device = _GatedDevice()
+    instance = Instance(device=device, frame_max_age=10_000)
+    frames = []
+    _touch_during_first_capture(instance, device, lambda: frames.append(instance.frame()))
+    assert device.captures == 2
+    assert frames[0].timestamp >= instance.last_touch
+
+
+@pytest.mark.parametrize("resolution_mode", ["template", "frame"])
+def test_find_all_with_reference_resolution(tmp_path, resolution_mode):
+    reference = synthetic_frame(360, 640, seed=3)
+    regions = [[40, 30, 240, 150], [380, 200, 600, 340]]
+    templates = []
+    for index, (x_min, y_min, x_max, y_max) in enumerate(regions):
+        path = str(tmp_path / f"t{index}.png")
+        cv2.imwrite(path, reference[y_min + 40:y_min + 80, x_min + 50:x_min + 110])
+        templates.append(ImageTemplate(path, threshold=0.8, region=[x_min, y_min, x_max, y_max]))
+    device_frame = cv2.resize(reference, (1280, 720), interpolation=cv2.INTER_LINEAR)
+    instance = Instance(device=FakeDevice(frames=[device_frame]), reference_resolution=(640, 360),
+                        resolution_mode=resolution_mode, match_workers=0)
+
+    frame = instance.frame()
+    report = instance.find_all_in_frame(frame, templates)
+    for template, (x_min, y_min, _, _) in zip(templates, regions):
+        result = report[template]
+        assert result is not None
+        assert abs(result[0] - 2 * (x_min + 50)) <= 2 and abs(result[1] - 2 * (y_min + 40)) <= 2
+    assert dict(instance.find_all(templates)) == dict(report)
+
+    if resolution_mode == "template":
+        assert frame._roi == [80, 60, 1200, 680]
+    else:  # 聚焦实际匹配的缩放后的帧，区域并集的灰度图只转换一次
+        resized = frame.resized((640, 360))
+        assert resized._roi == [40, 30, 600, 340]
+        assert [area for area, _ in resized._gray_views] == [[40, 30, 600, 340]]
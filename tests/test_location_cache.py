@@ -0,0 +1,41 @@
+import numpy as np
+
+from miniframework.frame import Frame
+from miniframework.location_cache import LocationCache
+from miniframework.template import ImageTemplate
+
+
+def _frame():
+    return Frame(np.random.default_rng(4).integers(0, 256, (360, 640, 3), dtype=np.uint8))
+
+
+def _template(frame, x, y, region=None, threshold=0.9):
+    template = ImageTemplate("button.png", region=region, threshold=threshold)
+    template.template = frame.image[y:y + 40, x:x + 60].copy()
+    return template
+
+
+def test_keys_distinguish_templates_sharing_a_name():
+    frame, cache = _frame(), LocationCache()
+    first, second = _template(frame, 100, 50), _template(frame, 400, 200)
+    assert str(first) == str(second)
+    keys = {cache._key(first, frame), cache._key(second, frame),
+            cache._key(_template(frame, 100, 50, region=[0, 0, 300, 200]), frame),
+            cache._key(_template(frame, 100, 50, threshold=0.8), frame)}
+    assert len(keys) == 4
+    assert cache._key(first, frame) == cache._key(_template(frame, 100, 50), frame)
+
+
+def test_cached_locations_survive_restart(tmp_path):
+    frame, path = _frame(), str(tmp_path / "locations.json")
+    template = _template(frame, 100, 50)
+    template.location_cache = LocationCache(path)
+    assert template.match_frame(frame) == [100, 50, 160, 90]
+    template.location_cache.save()
+
+    template.location_cache = LocationCache(path)
+    other = _template(frame, 400, 200)
+    other.location_cache = template.location_cache
+    assert template.match_frame(frame) == [100, 50, 160, 90]
+    assert other.match_frame(frame) == [400, 200, 460, 240]
+    assert template.location_cache.hits == 1 and template.location_cache.misses == 0
@@ -0,0 +1,81 @@
+import threading
+import time
+
+from miniframework import Instance
+from miniframework.benchmark import FakeDevice
+from miniframework.metrics import Histogram, Metrics
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics()
+    with metrics.span("find") as span:
+        pass
+    assert span.elapsed_ns == 0 and metrics.snapshot() == {}
+
+
+def test_nested_spans_subtract_child_time():
+    metrics = Metrics(enabled=True)
+    with metrics.span("find"):
+        time.sleep(0.02)
+        with metrics.span("match", "button"):
+            time.sleep(0.03)
+    snapshot = metrics.snapshot()
+    find, match = snapshot["find"], snapshot["match[button]"]
+    assert find["count"] == 1 and match["count"] == 1
+    assert find["total_ms"] >= find["self_ms"] + match["total_ms"] - 0.5
+    assert 15 <= find["self_ms"] < find["total_ms"]
+    assert match["self_ms"] == match["total_ms"]
+
+
+def test_span_stacks_are_per_thread():
+    metrics = Metrics(enabled=True)
+    entered, release = threading.Event(), threading.Event()
+
+    def worker():
+        with metrics.span("capture"):
+            entered.set()
+            release.wait(1)
+
+    thread = threading.Thread(target=worker)
+    with metrics.span("find"):
+        thread.start()
+        entered.wait(1)
+        release.set()
+        thread.join()
+    snapshot = metrics.snapshot()
+    assert snapshot["find"]["self_ms"] == snapshot["find"]["total_ms"]  # 其他线程的操作不是子操作
+
+
+def test_histogram_percentiles():
+    histogram = Histogram(reservoir_size=100)
+    for value in range(1, 201):
+        histogram.observe(value)
+    assert histogram.count == 200 and histogram.max_ns == 200
+    assert histogram.percentiles(0.5, 0.99) == [151, 200]  # 只保留最近的100个采样
+
+
+def test_prometheus_export(tmp_path):
+    metrics = Metrics(enabled=True)
+    metrics.observe("find", 2_000_000)
+    metrics.observe("match", 1_000_000, 500_000, label='say "hi"')
+    text = metrics.to_prometheus()
+    assert "# TYPE miniframework_operation_seconds summary" in text
+    assert 'miniframework_operation_seconds{operation="find",quantile="0.5"} 0.002000000' in text
+    assert 'miniframework_operation_seconds_count{operation="find"} 1' in text
+    assert 'miniframework_operation_self_seconds_total{operation="match",label="say \\"hi\\""} 0.000500000' in text
+    path = tmp_path / "miniframework.prom"
+    metrics.write_prometheus(str(path), prefix="bot")
+    assert path.read_text(encoding="utf-8").startswith("# HELP bot_operation_seconds")
+    assert not (tmp_path / "miniframework.prom.tmp").exists()
+
+
+def test_instance_records_nested_operations():
+    metrics = Metrics(enabled=True)
+    instance = Instance(device=FakeDevice(size=(90, 160)), metrics=metrics)
+    instance.screenshot()
+    instance.click(10, 10, 5)
+    snapshot = metrics.snapshot()
+    for name in ("screenshot", "capture", "decode", "click"):
+        assert snapshot[name]["count"] == 1, name
+    screenshot = snapshot["screenshot"]
+    assert screenshot["self_ms"] <= screenshot["total_ms"] - snapshot["capture"]["total_ms"] + 0.5
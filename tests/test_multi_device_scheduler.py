@@ -0,0 +1,102 @@
+import threading
+import time
+
+from miniframework import Instance, MultiDeviceScheduler
+from miniframework.benchmark import FakeDevice
+from miniframework.task import Task, TaskStatus
+
+
+class _ProbeTask(Task):
+    """执行times次后完成的任务，记录同一设备上同时执行的任务数"""
+
+    def __init__(self, device: str, probe: dict, times: int = 20, duration: float = 0.002) -> None:
+        super().__init__()
+        self.device = device
+        self.probe = probe
+        self.times = times
+        self.duration = duration
+        self.executed = 0
+        self._status = TaskStatus.PENDING
+
+    @staticmethod
+    def name() -> str:
+        return "ProbeTask"
+
+    @property
+    def status(self) -> TaskStatus:
+        return self._status
+
+    def __str__(self) -> str:
+        return f"ProbeTask({self.device}, {self.executed}/{self.times})"
+
+    def task(self):
+        with self.probe["lock"]:
+            running = self.probe["running"].get(self.device, 0) + 1
+            self.probe["running"][self.device] = running
+            self.probe["peak"][self.device] = max(self.probe["peak"].get(self.device, 0), running)
+        time.sleep(self.duration)
+        with self.probe["lock"]:
+            self.probe["running"][self.device] -= 1
+
+    def execute(self):
+        self.task()
+        self.executed += 1
+        if self.executed >= self.times:
+            self._status = TaskStatus.COMPLETED
+
+    def reset(self):
+        self.executed = 0
+        self._status = TaskStatus.PENDING
+
+
+def _probe() -> dict:
+    return {"lock": threading.Lock(), "running": {}, "peak": {}}
+
+
+def _wait(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+def _instance() -> Instance:
+    return Instance(device=FakeDevice(size=(90, 160)))
+
+
+def test_tasks_on_one_device_never_overlap():
+    probe, tasks = _probe(), []
+    scheduler = MultiDeviceScheduler(io_workers=16, match_workers=1)
+    for name in ("a", "b", "c"):
+        task_queue = scheduler.add_device(name, _instance())
+        for _ in range(3):
+            tasks.append(_ProbeTask(name, probe))
+            task_queue.add_task(tasks[-1])
+    scheduler.start()
+    try:
+        _wait(lambda: all(task.status == TaskStatus.COMPLETED for task in tasks))
+    finally:
+        scheduler.shutdown()
+    assert probe["peak"] == {"a": 1, "b": 1, "c": 1}
+    assert all(not device.busy for device in scheduler.devices.values())
+
+
+def test_removed_device_gets_no_more_tasks():
+    probe = _probe()
+    scheduler = MultiDeviceScheduler(io_workers=4, match_workers=1)
+    removed_task = _ProbeTask("removed", probe, times=1000, duration=0.005)
+    kept_task = _ProbeTask("kept", probe, times=20)
+    scheduler.add_device("removed", _instance()).add_task(removed_task)
+    scheduler.add_device("kept", _instance()).add_task(kept_task)
+    scheduler.start()
+    try:
+        _wait(lambda: removed_task.executed > 0)
+        device = scheduler.remove_device("removed")
+        _wait(lambda: not device.busy)
+        executed = removed_task.executed
+        _wait(lambda: kept_task.status == TaskStatus.COMPLETED)
+        time.sleep(0.05)
+        assert removed_task.executed == executed
+    finally:
+        scheduler.shutdown()
+    assert device.instance.match_executor is None
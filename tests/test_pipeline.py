@@ -0,0 +1,32 @@
+import threading
+
+from miniframework import Instance
+from miniframework.benchmark import FakeDevice, synthetic_frame
+from miniframework.template import ImageTemplate
+
+
+def _template(frame):
+    template = ImageTemplate("pipeline.png")
+    template.template = frame[300:380, 500:640].copy()
+    return template
+
+
+def test_run_joins_stage_threads_when_action_stops():
+    frame = synthetic_frame(720, 1280, 1)
+    pipeline = Instance(device=FakeDevice(frames=[frame])).pipeline([_template(frame)], action=lambda *_: False)
+    assert pipeline.run(timeout=10) == 1
+    threads = [thread for thread in threading.enumerate() if thread.name.startswith("Pipeline-")]
+    assert not threads
+    assert not pipeline.running
+
+
+class _BrokenDevice(FakeDevice):
+    def screenshot_raw(self) -> bytes:
+        raise ConnectionError("device offline")
+
+
+def test_capture_failures_back_off():
+    frame = synthetic_frame(720, 1280, 1)
+    pipeline = Instance(device=_BrokenDevice(frames=[frame])).pipeline([_template(frame)])
+    assert pipeline.run(timeout=0.5) == 0
+    assert 1 <= pipeline.stats["errors"] <= 6
@@ -0,0 +1,123 @@
+import cv2
+import numpy as np
+
+from miniframework import Instance, Screen, ScreenClassifier
+from miniframework.frame import Frame
+from miniframework.benchmark import FakeDevice, synthetic_frame
+from miniframework.template import ImageTemplate, MultiColorsTemplate, match_multi_colors
+
+REFERENCE = (1280, 720)
+
+
+def _hex(pixel) -> str:
+    b, g, r = (int(v) for v in pixel)
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def _screens():
+    frames, screens = [], []
+    for seed in range(3):
+        frame = synthetic_frame(REFERENCE[1], REFERENCE[0], seed)
+        frame[100:160, 100:300] = (30 * seed, 200, 60)
+        confirm = ImageTemplate(f"screen{seed}.png", region=[800, 250, 1150, 500])
+        confirm.template = frame[300:380, 900:1040].copy()
+        probe = MultiColorsTemplate(_hex(frame[110, 110]), [(120, 20, _hex(frame[130, 230]))], region=[80, 80, 320, 180])
+        frames.append(frame)
+        screens.append(Screen(f"screen{seed}", confirm, [probe]))
+    return frames, screens
+
+
+def test_classify_at_non_reference_resolution():
+    frames, screens = _screens()
+    for mode in ("template", "frame"):
+        for size in [(1920, 1080), (960, 540)]:
+            for index, frame in enumerate(frames):
+                device = FakeDevice(frames=[cv2.resize(frame, size, interpolation=cv2.INTER_AREA)])
+                instance = Instance(device=device, reference_resolution=REFERENCE, resolution_mode=mode)
+                screen = instance.classify(ScreenClassifier(screens))
+                assert screen is not None and screen.name == f"screen{index}", (mode, size, index)
+
+
+def test_classify_without_instance_ignores_reference_resolution():
+    frames, screens = _screens()
+    image = cv2.resize(frames[0], (1920, 1080), interpolation=cv2.INTER_AREA)
+    assert ScreenClassifier(screens).classify(image) is None
+
+
+def test_match_multi_colors_with_scale():
+    frames, screens = _screens()
+    probe = screens[0].probes[0]
+    image = cv2.resize(frames[0], (1920, 1080), interpolation=cv2.INTER_AREA)
+    x, y = match_multi_colors(image, [probe], scale=(1.5, 1.5))[0]
+    assert 120 <= x < 480 and 120 <= y < 270  # 缩放后的探针区域
+    assert np.all(image[y, x] == frames[0][110, 110])
+
+
+class _Probe:
+    """按名称查表返回匹配结果的模板"""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class _Scripted:
+    """匹配函数，结果由当前的界面决定，并记录调用的模板"""
+
+    def __init__(self, results: dict) -> None:
+        self.results = results  # 界面名称 -> {模板名称: 结果}
+        self.screen = None
+        self.calls: list[str] = []
+
+    def __call__(self, template, frame):
+        self.calls.append(template.name)
+        return self.results[self.screen].get(template.name, False)
+
+
+def test_probe_order_learns_rejection_rate():
+    cheap, selective = _Probe("cheap"), _Probe("selective")
+    screen = Screen("target", _Probe("confirm"), [cheap, selective])
+    classifier = ScreenClassifier([screen])
+    image = np.zeros((10, 10, 3), np.uint8)
+    match = _Scripted({"other": {"cheap": True}, "target": {"cheap": True, "selective": True, "confirm": True}})
+    match.screen = "other"
+    assert classifier.classify(image, match) is None
+    assert match.calls == ["cheap", "selective"]  # 未学习时按添加顺序
+    assert screen.ordered_probes() == [selective, cheap]
+
+    match.calls.clear()
+    for _ in range(5):
+        assert classifier.classify(image, match) is None
+    assert match.calls == ["selective"] * 5  # 最常排除界面的探针先执行,之后的探针不再执行
+
+    match.screen, match.calls = "target", []
+    assert classifier.classify(image, match) is screen
+    assert match.calls == ["selective", "cheap", "confirm"]
+    assert screen.ordered_probes() == [selective, cheap]
+
+
+def test_candidates_follow_learned_transitions():
+    screens = {name: Screen(name, _Probe(name)) for name in ("home", "battle", "reward")}
+    classifier = ScreenClassifier(list(screens.values()))
+    image = np.zeros((10, 10, 3), np.uint8)
+    match = _Scripted({name: {name: True} for name in screens})
+    for name in ["home", "battle", "reward", "home", "battle", "reward", "home"]:
+        match.screen = name
+        assert classifier.classify(image, match) is screens[name]
+    # 当前为home,之后出现过battle
+    assert [screen.name for screen in classifier.candidates(Frame(image))][0] == "battle"
+    match.screen, match.calls = "battle", []
+    classifier.classify(image, match)
+    assert match.calls == ["battle"]  # 第一个候选即命中
+    assert [screen.name for screen in classifier.candidates(Frame(image))][0] == "reward"
+
+
+def test_reference_signature_ranks_and_excludes_screens():
+    frames = [synthetic_frame(180, 320, seed) for seed in range(2)]
+    frames.append(np.full((180, 320, 3), 255, np.uint8))
+    screens = [Screen(f"screen{i}", _Probe(f"screen{i}"), reference=frame) for i, frame in enumerate(frames)]
+    classifier = ScreenClassifier(screens, max_distance=10)
+    names = [screen.name for screen in classifier.candidates(Frame(frames[1]))]
+    assert names[0] == "screen1" and "screen2" not in names  # 与白屏差异过大的界面被排除
@@ -0,0 +1,241 @@
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from miniframework.task import Task, TaskStatus, BeforeTaskProxy
+from miniframework.task_queue import TaskQueue
+from miniframework.task_scheduler import TaskScheduler
+
+
+class _OnceTask(Task):
+    def __init__(self) -> None:
+        super().__init__()
+        self.runs = 0
+        self._status = TaskStatus.PENDING
+
+    @staticmethod
+    def name() -> str:
+        return "OnceTask"
+
+    @property
+    def status(self) -> TaskStatus:
+        return self._status
+
+    def __str__(self) -> str:
+        return f"OnceTask({self.runs})"
+
+    def task(self):
+        self.runs += 1
+
+    def execute(self):
+        self.task()
+        self._status = TaskStatus.COMPLETED
+
+    def reset(self):
+        self._status = TaskStatus.PENDING
+
+
+class _Before(BeforeTaskProxy):
+    @staticmethod
+    def name() -> str:
+        return "Before"
+
+    def task(self):
+        self.proxy_status = TaskStatus.COMPLETED
+
+    def reset_proxy_task(self):
+        self.proxy_status = TaskStatus.PENDING
+
+
+def _complete(task_queue: TaskQueue, task: Task):
+    assert task_queue.next_task is task
+    task.execute()
+    assert task_queue.next_task is None  # 已完成的任务移入已完成索引
+
+
+def test_direct_reset_reschedules_completed_task():
+    task_queue, task = TaskQueue(), _OnceTask()
+    task_queue.add_task(task)
+    _complete(task_queue, task)
+    task.reset()
+    assert task_queue.next_task is task
+
+
+def test_direct_reset_of_proxied_task():
+    task_queue, inner = TaskQueue(), _OnceTask()
+    proxy = _Before(inner)
+    task_queue.add_task(proxy)
+    proxy.execute()
+    _complete(task_queue, proxy)
+    inner.reset()
+    assert task_queue.next_task is proxy
+
+
+def test_reset_task_and_removed_task():
+    task_queue, task = TaskQueue(), _OnceTask()
+    task_queue.add_task(task)
+    _complete(task_queue, task)
+    task_queue.reset_task(task.uuid)
+    assert task_queue.next_task is task
+    _complete(task_queue, task)
+    task_queue.remove_task(task.uuid)
+    task.reset()
+    assert task_queue.next_task is None and len(task_queue) == 0
+
+
+def test_recurring_task_reset_does_not_deadlock():
+    task_queue, task = TaskQueue(), _OnceTask()
+    task_queue.add_task(task, every=0.01)
+    _complete(task_queue, task)
+    time.sleep(0.02)
+    assert task_queue.next_task is task
+
+
+def test_scheduler_wakes_on_direct_reset():
+    task_queue, task = TaskQueue(), _OnceTask()
+    task_queue.add_task(task)
+    scheduler = TaskScheduler()
+    scheduler.task_queue = task_queue
+    scheduler.start()
+    try:
+        deadline = time.monotonic() + 2
+        while task.runs < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        threading.Thread(target=task.reset).start()
+        while task.runs < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert task.runs == 2
+    finally:
+        scheduler.stop()
+
+
+class _ReentrantTask(_OnceTask):
+    """reset中调用队列方法的周期任务"""
+
+    def __init__(self, task_queue: TaskQueue, fail: bool = False) -> None:
+        super().__init__()
+        self.task_queue = task_queue
+        self.fail = fail
+
+    def reset(self):
+        self.task_queue.ready_tasks()
+        if self.fail:
+            self.fail = False
+            raise RuntimeError("reset failed")
+        super().reset()
+
+
+def _next_task_in_thread(task_queue: TaskQueue):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(task_queue.next_task), daemon=True)
+    thread.start()
+    thread.join(2)
+    assert not thread.is_alive(), "next_task deadlocked"
+    return result[0]
+
+
+def test_recurring_reset_may_call_queue_methods():
+    task_queue = TaskQueue()
+    task = _ReentrantTask(task_queue)
+    task_queue.add_task(task, every=0.01)
+    assert task_queue.next_task is task
+    task.execute()
+    assert _next_task_in_thread(task_queue) is None
+    time.sleep(0.02)
+    assert task_queue.next_task is task
+
+
+def test_recurring_task_stays_scheduled_when_reset_raises():
+    task_queue = TaskQueue()
+    task = _ReentrantTask(task_queue, fail=True)
+    task_queue.add_task(task, every=0.01)
+    assert task_queue.next_task is task
+    task.execute()
+    assert _next_task_in_thread(task_queue) is None
+    assert task_queue.next_due() is not None  # 重置失败的任务仍在下一个周期到期
+    time.sleep(0.02)
+    assert task_queue.next_task is None  # 到期时仍为已完成状态,再次重置
+    time.sleep(0.02)
+    assert task_queue.next_task is task
+
+
+def test_ready_tasks_limit_and_order():
+    task_queue = TaskQueue()
+    tasks = [_OnceTask() for _ in range(50)]
+    for i, task in enumerate(tasks):
+        task_queue.add_task(task, priority=i % 5)
+    for task in tasks[::3]:
+        task_queue.remove_task(task.uuid)  # 堆中留下失效元素
+    live = [task for task in tasks if task not in tasks[::3]]
+    expected = sorted(live, key=lambda task: -(tasks.index(task) % 5))  # 同优先级先进先出(稳定排序)
+    assert task_queue.ready_tasks(7) == expected[:7]
+    assert task_queue.ready_tasks() == expected
+
+
+def test_every_task_rearms_after_completion():
+    task_queue, task = TaskQueue(), _OnceTask()
+    task_queue.add_task(task, every=0.05)
+    for runs in (1, 2):
+        assert task_queue.wait_for_task(timeout=1)
+        assert task_queue.next_task is task
+        task.execute()
+        task_queue.on_executed(task)
+        assert task.runs == runs
+        assert task_queue.next_task is None  # 完成后等待下一个周期
+        assert 0 < task_queue.next_due() <= 0.05
+    assert len(task_queue) == 1
+
+
+def test_cron_task_rearms_after_completion():
+    task_queue, task = TaskQueue(), _OnceTask()
+    task_queue.add_task(task, cron="* * * * *")
+    assert task_queue.next_task is None  # cron任务在第一个触发时间到期
+    assert 0 < task_queue.next_due() <= 60
+    task_queue.defer(task.uuid, 0)
+    assert task_queue.next_task is task
+    task.execute()
+    assert task_queue.next_task is None
+    assert task.status == TaskStatus.PENDING  # 周期任务完成后立即重置
+    assert 0 < task_queue.next_due() <= 60
+
+
+def test_run_at_delays_task():
+    task_queue, later, soon = TaskQueue(), _OnceTask(), _OnceTask()
+    task_queue.add_task(later, run_at=datetime.now() + timedelta(hours=1))
+    task_queue.add_task(soon, run_at=time.time() + 0.05)
+    assert task_queue.next_task is None
+    assert 0 < task_queue.next_due() <= 0.05
+    assert task_queue.wait_for_task(timeout=1)
+    assert task_queue.next_task is soon
+    soon.execute()
+    assert task_queue.next_task is None
+    assert 3500 < task_queue.next_due() <= 3600
+
+
+def test_jitter_postpones_due_time(monkeypatch):
+    monkeypatch.setattr(random, "uniform", lambda low, high: high)
+    task_queue, task = TaskQueue(), _OnceTask()
+    task_queue.add_task(task, every=1, jitter=2)
+    assert task_queue.next_task is task  # 第一次立即执行
+    task.execute()
+    assert task_queue.next_task is None
+    assert 2.9 < task_queue.next_due() <= 3
+
+
+def test_cooldown_defers_unfinished_task():
+    task_queue, task, other = TaskQueue(), _OnceTask(), _OnceTask()
+    task.cooldown = 0.05
+    task.execute = task.task  # 执行后仍未完成
+    task_queue.add_task(task, priority=1)
+    task_queue.add_task(other)
+    assert task_queue.next_task is task
+    task.execute()
+    task_queue.on_executed(task)
+    assert task_queue.next_task is other  # 冷却期间执行其他任务
+    other.execute()
+    assert task_queue.wait_for_task(timeout=1)
+    assert task_queue.next_task is task
+    task._status = TaskStatus.COMPLETED
+    task_queue.on_executed(task)  # 已完成的任务不再冷却
+    assert task_queue.next_task is None and task_queue.next_due() is None
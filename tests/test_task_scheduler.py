@@ -0,0 +1,108 @@
+import threading
+import time
+
+from miniframework.task import Task, TaskStatus
+from miniframework.task_queue import TaskQueue
+from miniframework.task_scheduler import TaskScheduler
+
+
+class _TimedTask(Task):
+    """记录执行时间段的任务，gate不为None时等待gate被设置后结束"""
+
+    def __init__(self, label: str, resources: tuple[str, ...], log: dict, duration: float = 0.15,
+                 gate: threading.Event = None) -> None:
+        super().__init__()
+        self.label = label
+        self.resources = resources
+        self.log = log
+        self.duration = duration
+        self.gate = gate
+        self._status = TaskStatus.PENDING
+
+    @staticmethod
+    def name() -> str:
+        return "TimedTask"
+
+    @property
+    def status(self) -> TaskStatus:
+        return self._status
+
+    def __str__(self) -> str:
+        return self.label
+
+    def task(self):
+        if self.gate is not None:
+            self.gate.wait(5)
+        else:
+            time.sleep(self.duration)
+
+    def execute(self):
+        start = time.monotonic()
+        self.log[self.label] = (start, None)
+        self.task()
+        self.log[self.label] = (start, time.monotonic())
+        self._status = TaskStatus.COMPLETED
+
+    def reset(self):
+        self._status = TaskStatus.PENDING
+
+
+def _wait(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+def _scheduler(task_queue: TaskQueue, workers: int = 4) -> TaskScheduler:
+    scheduler = TaskScheduler(workers=workers)
+    scheduler.task_queue = task_queue
+    return scheduler
+
+
+def _overlap(a: tuple, b: tuple) -> bool:
+    return a[0] < b[1] and b[0] < a[1]
+
+
+def test_conflicting_tasks_serialise_and_others_run_in_parallel():
+    log, task_queue = {}, TaskQueue()
+    for label, resources in (("devA1", ("device:A",)), ("devA2", ("device:A",)), ("cpu", ("cpu",))):
+        task_queue.add_task(_TimedTask(label, resources, log))
+    scheduler = _scheduler(task_queue)
+    scheduler.start()
+    try:
+        _wait(lambda: len(log) == 3 and all(end is not None for _, end in log.values()))
+    finally:
+        scheduler.stop()
+    assert not _overlap(log["devA1"], log["devA2"])
+    assert _overlap(log["cpu"], log["devA1"]) or _overlap(log["cpu"], log["devA2"])
+
+
+def test_blocked_high_priority_task_reserves_its_resources():
+    log, task_queue, gate = {}, TaskQueue(), threading.Event()
+    task_queue.add_task(_TimedTask("blocker", ("device:A",), log, gate=gate), priority=100)
+    scheduler = _scheduler(task_queue)
+    scheduler.start()
+    try:
+        _wait(lambda: "blocker" in log)
+        task_queue.add_task(_TimedTask("high", ("device:A", "device:B"), log, duration=0.05), priority=10)
+        task_queue.add_task(_TimedTask("low", ("device:B",), log, duration=0.05), priority=1)
+        time.sleep(0.2)
+        assert "low" not in log  # device:B被等待device:A的高优先级任务预留
+        gate.set()
+        _wait(lambda: "low" in log and log["low"][1] is not None)
+    finally:
+        scheduler.stop()
+    assert log["high"][1] <= log["low"][0]
+
+
+def test_stop_shuts_down_worker_threads():
+    log, task_queue = {}, TaskQueue()
+    for i in range(8):
+        task_queue.add_task(_TimedTask(f"task{i}", (f"device:{i}",), log, duration=0.05))
+    scheduler = _scheduler(task_queue)
+    scheduler.start()
+    _wait(lambda: len(log) == 8)
+    scheduler.stop()
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith("TaskWorker")]
+    assert all(end is not None for _, end in log.values())
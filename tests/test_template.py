@@ -0,0 +1,79 @@
+import cv2
+import numpy as np
+
+from miniframework.template import PyramidMatcher
+
+
+def _pyramid(image, levels):
+    pyramid = [image]
+    for _ in range(levels):
+        pyramid.append(cv2.pyrDown(pyramid[-1]))
+    return pyramid
+
+
+def test_pyramid_matcher_finds_exact_crop_below_coarse_cutoff():
+    image = np.random.default_rng(0).integers(0, 256, (300, 400), dtype=np.uint8)
+    template = image[51:111, 101:146].copy()
+    threshold, level = 0.85, 1
+    image_pyramid, template_pyramid = _pyramid(image, level), _pyramid(template, level)
+    coarse_score = cv2.matchTemplate(image_pyramid[level], template_pyramid[level], cv2.TM_CCOEFF_NORMED).max()
+    assert coarse_score < threshold - PyramidMatcher().coarse_margin * level
+
+    assert PyramidMatcher().match(image_pyramid, template_pyramid, threshold) == [101, 51, 146, 111]
+    assert PyramidMatcher(early_reject=True).match(image_pyramid, template_pyramid, threshold) is None
+
+
+def test_pyramid_matcher_rejects_absent_template():
+    rng = np.random.default_rng(1)
+    image = rng.integers(0, 256, (300, 400), dtype=np.uint8)
+    template = rng.integers(0, 256, (60, 45), dtype=np.uint8)
+    assert PyramidMatcher().match(_pyramid(image, 2), _pyramid(template, 2), 0.85) is None
+
+
+def _icon_grid():
+    """相同图标的网格,只有编号不同"""
+    image = np.full((720, 1280), 30, np.uint8)
+    positions = []
+    for i in range(60):
+        x, y = 40 + i % 10 * 120, 40 + i // 10 * 110
+        cv2.rectangle(image, (x, y), (x + 90, y + 80), 180, -1)
+        cv2.circle(image, (x + 45, y + 30), 18, 60, -1)
+        cv2.putText(image, f"{i % 10}{i // 10}", (x + 30, y + 72), cv2.FONT_HERSHEY_SIMPLEX, 0.5, 0, 1)
+        positions.append((x - 2, y - 2))
+    return image, positions
+
+
+def test_pyramid_matcher_picks_best_of_similar_candidates():
+    image, positions = _icon_grid()
+    image_pyramid = _pyramid(image, 2)
+    for index in (7, 33, 59):
+        x, y = positions[index]
+        template = image[y:y + 86, x:x + 96].copy()
+        template_pyramid = _pyramid(template, 2)
+        expected = [x, y, x + 96, y + 86]
+        assert PyramidMatcher().match(image_pyramid, template_pyramid, 0.95) == expected
+        # 候选足够多时early_reject取得分最高的候选,而不是第一个超过阈值的候选
+        assert PyramidMatcher(early_reject=True, max_candidates=60).match(
+            image_pyramid, template_pyramid, 0.95) == expected
+
+
+def _color_frame():
+    return np.random.default_rng(2).integers(0, 256, (720, 1280, 3), dtype=np.uint8)
+
+
+def test_image_color_template_large_level_small_region():
+    from miniframework.template import ImageColorTemplate
+
+    frame = _color_frame()
+    template = ImageColorTemplate("color.png", region=[395, 295, 460, 350], level=6)
+    template.template = frame[300:340, 400:450].copy()
+    assert template.match(frame) == [400, 300, 450, 340]
+
+
+def test_image_color_template_rejects_grayscale_template():
+    import pytest
+    from miniframework.template import ImageColorTemplate
+
+    template = ImageColorTemplate("gray.png")
+    with pytest.raises(ValueError):
+        template.template = cv2.cvtColor(_color_frame()[0:40, 0:40], cv2.COLOR_BGR2GRAY)
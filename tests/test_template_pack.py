@@ -0,0 +1,87 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from miniframework import template_pack
+from miniframework.benchmark import synthetic_frame
+from miniframework.template import ImageColorTemplate, TemplateStore, template_store
+from miniframework.template_pack import TemplatePack, build_template_pack, load_template_pack
+
+
+@pytest.fixture
+def template_dir(tmp_path):
+    screen = synthetic_frame(360, 640, seed=7)
+    os.makedirs(tmp_path / "icons" / "sub")
+    images = {
+        (tmp_path / "icons" / "start.png").as_posix(): screen[40:100, 60:140],
+        (tmp_path / "icons" / "sub" / "close.png").as_posix(): screen[200:236, 300:336],
+    }
+    for path, image in images.items():
+        cv2.imwrite(path, image)
+    return tmp_path, screen, images
+
+
+def test_round_trip_through_memmap(template_dir):
+    tmp_path, _, images = template_dir
+    output = str(tmp_path / "icons.pack")
+    assert build_template_pack(str(tmp_path / "icons"), output, pyramid_levels=2) == 2
+    pack = TemplatePack(output)
+    assert len(pack) == 2 and sorted(pack.paths) == sorted(images)
+    for path, image in images.items():
+        color = pack.image(path)
+        assert np.shares_memory(color, pack._mmap) and not color.flags.writeable
+        assert np.array_equal(color, image)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        assert np.array_equal(pack.image(path, "gray"), gray)
+        assert np.array_equal(pack.image(path, "pyramid2"), cv2.pyrDown(cv2.pyrDown(gray)))
+        for info in pack._entries[path]["arrays"].values():
+            assert info["offset"] % 64 == 0
+
+    store = TemplateStore()
+    assert pack.register(store) == 2
+    for path in images:
+        assert np.shares_memory(store.get(path), pack._mmap)
+        assert np.shares_memory(store.pyramid(path, 2)[2], pack._mmap)
+
+
+def test_templates_use_packed_options(template_dir):
+    tmp_path, screen, images = template_dir
+    start, close = list(images)
+    output = str(tmp_path / "icons.pack")
+    options = {start: {"describe": "start", "threshold": 0.8, "region": [0, 0, 320, 180]},
+               close: {"type": "ImageColorTemplate", "color_threshold": 30}}
+    build_template_pack(list(images), output, options=options)
+    pack = load_template_pack(output)
+    try:
+        templates = pack.templates()
+        assert str(templates[start]) == "start" and templates[start].threshold == 0.8
+        assert templates[start].region == [0, 0, 320, 180]
+        assert isinstance(templates[close], ImageColorTemplate)
+        assert templates[start].match(screen) == [60, 40, 140, 100]
+    finally:
+        for path in images:
+            template_store.remove(path)
+
+
+def test_rejects_unknown_type(template_dir):
+    tmp_path, _, images = template_dir
+    path = next(iter(images))
+    with pytest.raises(ValueError):
+        build_template_pack(path, str(tmp_path / "bad.pack"), options={path: {"type": "Unknown"}})
+
+
+def test_rejects_bad_magic_and_version(template_dir, monkeypatch):
+    tmp_path, _, images = template_dir
+    junk = tmp_path / "junk.pack"
+    junk.write_bytes(b"NOTAPACK" + bytes(64))
+    with pytest.raises(ValueError, match="Not a template pack"):
+        TemplatePack(str(junk))
+
+    future = str(tmp_path / "future.pack")
+    monkeypatch.setattr(template_pack, "VERSION", 2)
+    build_template_pack(list(images), future)
+    monkeypatch.undo()
+    with pytest.raises(ValueError, match="version"):
+        TemplatePack(future)